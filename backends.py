@@ -0,0 +1,302 @@
+"""Pick the fastest simulation engine per workload from a cached calibration.
+
+Two engines run the same rules:
+
+* ``reference``: engine.Simulation, one object-based run at a time. Its
+  cost per replicate does not depend on how many replicates a task runs.
+* ``bitboard``: bitboard.BitboardBatch, every replicate of a task advanced
+  together (3 <= grid_size < 64). Its fixed Python cost per agent index is
+  shared by the batch, but the batch keeps stepping until its slowest
+  replicate has finished.
+
+Which one is faster depends on the rules (reproduction makes runs long),
+the ratio and density of a pair, the batch size and the machine.
+calibrate() times whole runs of both engines under a sweep's own rules and
+batch size, on a small grid of (ratio, density) shapes, and stores the
+seconds per replicate in CALIBRATION_PATH under that (rules, batch size)
+key. A bitboard batch that has already cost CALIBRATION_CAP times what the
+reference engine needs for the same replicates is stopped early; its
+time is then a lower bound, which is enough to rank the engines. The file
+also holds a fingerprint of the machine, the Python and NumPy versions and
+the engines' source, and a change to any of them discards every entry.
+dispatch_sweep() then chooses an engine for every pair of a sweep plan.
+It interpolates the log costs over log ratio and density, and returns the
+choices with a metadata record, which save_metadata() writes next to the
+sweep's outputs.
+
+Rules(synchronous=True) is a different model with a single engine,
+synchronous.SynchronousBatch, so dispatch_sweep() never calibrates or
+chooses for it. The same holds for a rule_table.RuleTable, which only
+rule_table.TableBatch runs, and for rules that only one engine supports.
+
+    python backends.py [phase|reproduction] [batch_size]   # calibrate if needed, print
+    python backends.py ... --force                          # recalibrate
+"""
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+import engine
+import bitboard
+from sweep import agent_counts
+from synchronous import SynchronousBatch
+from spatial import run_simulation_spatial, run_batch_spatial
+from rule_table import RuleTable, TableBatch, initial_counts, outcome_labels, as_dict
+
+REFERENCE = "reference"
+BITBOARD = "bitboard"
+SYNCHRONOUS = "synchronous"  # The only engine for Rules(synchronous=True)
+TABLE = "table"  # The only engine for a RuleTable
+AUTO = "auto"
+BACKENDS = (REFERENCE, BITBOARD)  # Calibrated engines of the sequential rules
+
+# Calibration shapes and effort
+CALIBRATION_RATIOS = (0.5, 2.5, 8.0)
+CALIBRATION_DENSITIES = (0.05, 0.3, 0.7)
+CALIBRATION_RUNS = 8  # Reference runs timed per shape
+CALIBRATION_CAP = 2.0  # Bitboard batches stop at this multiple of the reference cost
+CALIBRATION_PATH = os.path.join(os.path.expanduser("~"), ".cache", "predator_prey",
+                                "backends.json")
+
+MAX_BATCH = 64  # Replicates per pool task in batched sweeps
+
+
+def supports(backend, rules):
+    if isinstance(rules, RuleTable) or backend == TABLE:
+        return isinstance(rules, RuleTable) and backend == TABLE
+    if backend == SYNCHRONOUS:
+        return rules.synchronous
+    if rules.synchronous:
+        return False
+    if backend == BITBOARD:
+        return 3 <= rules.grid_size < 64 and not rules.grass_regrowth
+    return backend == REFERENCE
+
+
+def fingerprint():
+    """What a calibration is valid for: machine, interpreter, NumPy and engine code."""
+    code = hashlib.sha1()
+    for module in (engine, bitboard):
+        with open(module.__file__, 'rb') as f:
+            code.update(f.read())
+    return {'machine': platform.node(), 'processor': platform.machine(),
+            'cpus': os.cpu_count(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'engines': code.hexdigest()}
+
+
+def calibration_key(rules, batch_size):
+    return json.dumps({'rules': rules._asdict(), 'batch_size': batch_size}, sort_keys=True)
+
+
+def _time_shape(rules, ratio, density, batch_size, rng):
+    """Seconds per replicate of whole runs of each engine at one (ratio, density).
+
+    Set-up is included, as in a sweep task. The bitboard batch stops once it
+    has cost CALIBRATION_CAP times the reference engine's time for
+    batch_size replicates.
+    """
+    pair = agent_counts(ratio, density, rules.grid_size ** 2)
+    start = time.perf_counter()
+    for _ in range(CALIBRATION_RUNS):
+        engine.run_simulation_timed(pair, rules, rng)
+    reference = (time.perf_counter() - start) / CALIBRATION_RUNS
+
+    budget = CALIBRATION_CAP * reference * batch_size
+    start = time.perf_counter()
+    batch = bitboard.BitboardBatch(*pair, rules, rng, batch_size)
+    while not batch.done.all() and time.perf_counter() - start < budget:
+        batch.step()
+    return {REFERENCE: reference, BITBOARD: (time.perf_counter() - start) / batch_size}
+
+
+def _read(path):
+    """The calibration file's entries if they match this machine and code, else {}."""
+    if os.path.exists(path):
+        with open(path) as f:
+            calibration = json.load(f)
+        if calibration.get('fingerprint') == fingerprint():
+            return calibration.get('entries', {})
+    return {}
+
+
+def calibrate(rules, batch_size, path=CALIBRATION_PATH, verbose=True):
+    """Time both engines on every calibration shape under rules and cache the entry at path."""
+    rng = np.random.default_rng(0)
+    warm_up = rules._replace(max_steps=2)  # Imports, lookup tables, caches
+    engine.run_simulation_timed((10, 5), warm_up, rng)
+    bitboard.BitboardBatch(10, 5, warm_up, rng, 2).run()
+    seconds = {name: np.zeros((len(CALIBRATION_RATIOS), len(CALIBRATION_DENSITIES)))
+               for name in BACKENDS}
+    for i, ratio in enumerate(CALIBRATION_RATIOS):
+        for j, density in enumerate(CALIBRATION_DENSITIES):
+            for name, value in _time_shape(rules, ratio, density, batch_size, rng).items():
+                seconds[name][i, j] = value
+        if verbose:
+            print(f"calibrated ratio {ratio} at batch size {batch_size}")
+    entry = {'created': time.time(), 'ratios': CALIBRATION_RATIOS,
+             'densities': CALIBRATION_DENSITIES,
+             'seconds': {name: table.tolist() for name, table in seconds.items()}}
+    entries = _read(path)
+    entries[calibration_key(rules, batch_size)] = entry
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'fingerprint': fingerprint(), 'entries': entries}, f)
+    os.replace(tmp, path)
+    return entry
+
+
+def load_calibration(rules, batch_size, path=CALIBRATION_PATH, force=False, verbose=True):
+    """Cached calibration of (rules, batch_size); a fresh one when missing, stale or forced."""
+    entry = None if force else _read(path).get(calibration_key(rules, batch_size))
+    return entry or calibrate(rules, batch_size, path, verbose)
+
+
+def estimate(calibration, backend, ratio, density):
+    """Estimated seconds per replicate, interpolated over log ratio and density.
+
+    Log costs are bilinear between calibrated shapes and flat beyond them.
+    """
+    table = np.log(np.maximum(np.array(calibration['seconds'][backend]), 1e-9))
+    by_ratio = [np.interp(density, calibration['densities'], row) for row in table]
+    return float(np.exp(np.interp(np.log(ratio), np.log(calibration['ratios']), by_ratio)))
+
+
+class Dispatch(NamedTuple):
+    """Engine per pair of a sweep plan, and the record of how it was chosen."""
+    backends: list
+    batch_size: int
+    metadata: dict
+
+
+def dispatch_sweep(rules, plan, num_simulations, backend=AUTO, batch_size=MAX_BATCH,
+                   reason=None, path=CALIBRATION_PATH):
+    """Choose the engine for every pair of plan.
+
+    ``backend`` forces one engine unless it is AUTO; ``reason`` records why
+    a caller forced it. Replicates run in tasks of up to ``batch_size``.
+    Synchronous rules and rule tables always run on their own engine.
+    """
+    batch_size = max(min(batch_size, num_simulations), 1)
+    cells = rules.grid_size ** 2
+    metadata = {'requested': backend, 'batch_size': batch_size}
+    if isinstance(rules, RuleTable):
+        backends = [TABLE] * len(plan.pairs)
+        metadata['reason'] = "rule table"
+    elif rules.synchronous:
+        backends = [SYNCHRONOUS] * len(plan.pairs)
+        metadata['reason'] = "synchronous rules"
+    elif backend != AUTO:
+        if not supports(backend, rules):
+            raise ValueError(f"{backend} engine does not support these rules "
+                             f"(grid_size {rules.grid_size})")
+        backends = [backend] * len(plan.pairs)
+        metadata['reason'] = reason or "requested"
+    else:
+        candidates = [name for name in BACKENDS if supports(name, rules)]
+        if len(candidates) == 1:
+            backends = candidates * len(plan.pairs)
+            metadata['reason'] = "only engine for these rules"
+        else:
+            calibration = load_calibration(rules, batch_size, path)
+            shapes = [(num_prey / max(num_predators, 1), (num_prey + num_predators) / cells)
+                      for num_prey, num_predators in plan.pairs]
+            seconds = np.array([[estimate(calibration, name, *shape) for name in candidates]
+                                for shape in shapes]).reshape(-1, len(candidates))
+            backends = [candidates[i] for i in np.argmin(seconds, axis=1)]
+            # Estimated sweep time on each engine alone and with the choices made
+            total = seconds.sum(axis=0) * num_simulations
+            chosen = seconds.min(axis=1).sum() * num_simulations
+            metadata.update(reason="calibration", calibration_path=path,
+                            calibration_created=calibration['created'],
+                            fingerprint=fingerprint(),
+                            estimated_seconds={**{name: float(t) for name, t in
+                                                  zip(candidates, total)},
+                                               'chosen': float(chosen)})
+    names, counts = np.unique(backends, return_counts=True)
+    metadata['pairs_per_backend'] = {str(name): int(count) for name, count in zip(names, counts)}
+    return Dispatch(backends, batch_size, metadata)
+
+
+def save_metadata(path, rules, num_simulations, dispatch):
+    """Record the rules, replicate count and engine choices of a sweep as JSON."""
+    with open(path, 'w') as f:
+        json.dump({'rules': as_dict(rules), 'num_simulations': num_simulations,
+                   'backend': dispatch.metadata}, f, indent=2)
+
+
+class BatchSimulator:
+    """Picklable ``simulate_batch(pair, n, seed, backend)`` for sweep.batch_sweep.
+
+    Returns per-replicate outcome codes and final steps, and a list of
+    SpatialSummary per replicate when ``spatial_interval`` is set (else
+    None). ``outcome_codes`` maps engine outcome codes to the caller's.
+    A RuleTable runs on TableBatch, with rule_table's outcome codes and
+    without spatial sampling.
+    """
+
+    def __init__(self, rules=engine.PHASE_DIAGRAM_RULES, spatial_interval=0,
+                 outcome_codes=None):
+        if isinstance(rules, RuleTable) and spatial_interval:
+            raise ValueError("spatial sampling needs the two-species engines")
+        self.rules = rules
+        self.spatial_interval = spatial_interval
+        num_outcomes = len(outcome_labels(rules) if isinstance(rules, RuleTable)
+                           else engine.OUTCOME_LABELS)
+        self.codes = None if outcome_codes is None else \
+            np.array([outcome_codes[i] for i in range(num_outcomes)])
+
+    def __call__(self, pair, n, seed=None, backend=REFERENCE):
+        rng = np.random.default_rng(seed)
+        summaries = None
+        if backend == BITBOARD:
+            outcomes, steps, summaries = self._run_batch(
+                bitboard.BitboardBatch(*pair, self.rules, rng, n))
+        elif backend == SYNCHRONOUS:
+            outcomes, steps, summaries = self._run_batch(SynchronousBatch(*pair, self.rules, rng, n))
+        elif backend == TABLE:
+            outcomes, steps, summaries = self._run_batch(
+                TableBatch(initial_counts(self.rules, pair), self.rules, rng, n))
+        elif self.spatial_interval:
+            runs = [run_simulation_spatial(pair, self.rules, rng, interval=self.spatial_interval)
+                    for _ in range(n)]
+            outcomes, steps, summaries = (np.array([run[0] for run in runs]),
+                                          np.array([run[1] for run in runs]),
+                                          [run[2] for run in runs])
+        else:
+            runs = [engine.run_simulation_timed(pair, self.rules, rng) for _ in range(n)]
+            outcomes, steps = np.array(runs).reshape(-1, 2).T
+        if self.codes is not None:
+            outcomes = self.codes[outcomes]
+        return outcomes, steps, summaries
+
+    def _run_batch(self, batch):
+        if not self.spatial_interval:
+            return batch.run(), batch.step_count.copy(), None
+        return run_batch_spatial(batch, self.spatial_interval)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    rules = engine.REPRODUCTION_RULES if args and args[0] == "reproduction" \
+        else engine.PHASE_DIAGRAM_RULES
+    batch_size = int(args[1]) if len(args) > 1 else MAX_BATCH
+    calibration = load_calibration(rules, batch_size, force='--force' in sys.argv)
+    print(f"Calibration at {CALIBRATION_PATH} ({time.ctime(calibration['created'])})")
+    print(f"milliseconds per replicate, whole runs at batch size {batch_size}; "
+          f"* marks the faster engine")
+    print(f"{'ratio':>6} {'density':>8} " + " ".join(f"{b:>10}" for b in BACKENDS))
+    for ratio in calibration['ratios']:
+        for density in calibration['densities']:
+            values = [estimate(calibration, b, ratio, density) for b in BACKENDS]
+            best = int(np.argmin(values))
+            cells = [f"{v * 1e3:9.2f}{'*' if i == best else ' '}" for i, v in enumerate(values)]
+            print(f"{ratio:>6} {density:>8.2f} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
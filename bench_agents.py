@@ -0,0 +1,82 @@
+"""Benchmark __slots__ agents against the original __dict__ agents.
+
+Runs the same seeded high-density reproduction simulations with both agent
+layouts and reports run time, peak traced memory, per-agent size and the
+number of garbage collections triggered.
+
+    python bench_agents.py [num_runs]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+import engine
+
+
+# Original agent classes, with a per-instance __dict__
+class DictPrey:
+    def __init__(self, x, y, energy=0):
+        self.x = x
+        self.y = y
+        self.energy = energy
+
+
+class DictPredator:
+    def __init__(self, x, y, energy):
+        self.x = x
+        self.y = y
+        self.energy = energy
+
+
+def agent_size(agent):
+    size = sys.getsizeof(agent)
+    if hasattr(agent, '__dict__'):
+        size += sys.getsizeof(agent.__dict__)
+    return size
+
+
+def measure(prey_class, predator_class, num_runs, pair, rules):
+    engine.Prey, engine.Predator = prey_class, predator_class
+    # Timing and collector activity, without tracing overhead
+    collections_before = sum(stat['collections'] for stat in gc.get_stats())
+    start = time.perf_counter()
+    for seed in range(num_runs):
+        engine.run_simulation(pair, rules, seed)
+    elapsed = time.perf_counter() - start
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections_before
+    # Peak memory of a single traced run
+    tracemalloc.start()
+    engine.run_simulation(pair, rules, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, collections
+
+
+def main():
+    num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    # High density with reproduction: many agents created and discarded per run
+    pair = (150, 20)
+    rules = engine.REPRODUCTION_RULES
+    slots_classes = (engine.Prey, engine.Predator)
+    try:
+        results = {
+            '__dict__': measure(DictPrey, DictPredator, num_runs, pair, rules),
+            '__slots__': measure(*slots_classes, num_runs, pair, rules),
+        }
+    finally:
+        engine.Prey, engine.Predator = slots_classes
+    sizes = {
+        '__dict__': (agent_size(DictPrey(0, 0)), agent_size(DictPredator(0, 0, 0))),
+        '__slots__': (agent_size(slots_classes[0](0, 0)), agent_size(slots_classes[1](0, 0, 0))),
+    }
+
+    print(f"{num_runs} runs of {pair[0]} prey / {pair[1]} predators, reproduction rules")
+    print(f"{'layout':<10} {'time (s)':>9} {'peak (KiB)':>11} {'gc runs':>8} {'prey B':>7} {'pred B':>7}")
+    for name, (elapsed, peak, collections) in results.items():
+        prey_size, predator_size = sizes[name]
+        print(f"{name:<10} {elapsed:>9.2f} {peak / 1024:>11.1f} {collections:>8} "
+              f"{prey_size:>7} {predator_size:>7}")
+
+
+if __name__ == "__main__":
+    main()
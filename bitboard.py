@@ -0,0 +1,318 @@
+"""Bitboard engine for small lattices, vectorized across replicates.
+
+Each lattice row is one 64-bit word, so the prey and predator occupancy of
+a 20x20 grid is 20 words per replicate. For every agent, the 8-neighbor
+"empty" and "prey" sets are 8-bit masks built from the three rows around
+it with toroidal rotations, shifts and ANDs. The agent picks the r-th set
+bit of a mask, where r is uniform below the mask's popcount; both
+popcount and bit selection are 256-entry lookup tables.
+
+The update rules and the sequential order are the reference rules in
+engine.py. Prey move in list order and predators in a fresh random order
+every step. One Python-level iteration handles agent k of every replicate
+at once, so the per-step cost is spread over the whole batch.
+
+    python bitboard.py [num_replicates]   # compare with the reference engine
+"""
+import sys
+import time
+import numpy as np
+import engine
+from engine import PHASE_DIAGRAM_RULES, ALL_PREY_DIED, ALL_PREDATORS_DIED, COEXISTENCE
+
+# Cell codes returned by BitboardBatch.grid (same as gpu_phase_diagram.py)
+EMPTY = 0
+PREY = 1
+PREDATOR = 2
+
+# Neighbor mask bit b -> (dx, dy): three cells above, left/right, three below
+DX = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+DY = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+
+# POPCOUNT[m] is the number of set bits in m; SELECT[m, r] is the index of the r-th set bit
+POPCOUNT = np.array([bin(m).count("1") for m in range(256)], dtype=np.int64)
+SELECT = np.zeros((256, 8), dtype=np.int64)
+for _m in range(256):
+    _bits = [b for b in range(8) if _m >> b & 1]
+    SELECT[_m, :len(_bits)] = _bits
+
+_ONE = np.uint64(1)
+_SEVEN = np.uint64(7)
+
+
+class BitboardBatch:
+    """A batch of independent runs advanced one step at a time."""
+
+    def __init__(self, num_prey, num_predators, rules=PHASE_DIAGRAM_RULES, rng=None,
+                 num_replicates=None):
+        G = rules.grid_size
+        if not 3 <= G < 64:
+            raise ValueError(f"bitboard engine needs 3 <= grid_size < 64, got {G}")
+        if rules.synchronous:
+            raise ValueError("synchronous rules run on synchronous.SynchronousBatch")
+        if rules.grass_regrowth:
+            raise ValueError("the bitboard engine has no grass layer; use engine.Simulation")
+        self.rules = rules
+        self.rng = np.random.default_rng(rng)
+        num_prey = np.asarray(num_prey, dtype=np.int64)
+        num_predators = np.asarray(num_predators, dtype=np.int64)
+        if num_replicates is None:
+            num_replicates = int(np.broadcast(num_prey, num_predators).size)
+        num_prey = np.broadcast_to(num_prey, (num_replicates,))
+        num_predators = np.broadcast_to(num_predators, (num_replicates,))
+        cells = G * G
+        if (num_prey > cells).any() or (num_predators > cells).any() or (num_prey < 0).any() \
+                or (num_predators < 0).any():
+            raise ValueError(f"agent counts must be between 0 and {cells}")
+
+        R = num_replicates
+        self.G = G
+        self._G = np.uint64(G)
+        self.prey_bits = np.zeros((R, G), dtype=np.uint64)
+        self.predator_bits = np.zeros((R, G), dtype=np.uint64)
+
+        # Prey slots are kept in list order; births are appended, deaths leave holes
+        self.prey_capacity = 2 * cells
+        self.prey_x = np.zeros((R, self.prey_capacity), dtype=np.int64)
+        self.prey_y = np.zeros((R, self.prey_capacity), dtype=np.int64)
+        self.prey_alive = np.zeros((R, self.prey_capacity), dtype=bool)
+        self.prey_slots = np.zeros(R, dtype=np.int64)
+        self.prey_at = np.full((R, cells), -1, dtype=np.int64)  # Cell -> prey slot
+        Q = max(int(num_predators.max(initial=0)), 1)
+        self.predator_x = np.zeros((R, Q), dtype=np.int64)
+        self.predator_y = np.zeros((R, Q), dtype=np.int64)
+        self.predator_alive = np.zeros((R, Q), dtype=bool)
+        self.energy = np.zeros((R, Q), dtype=np.int64)
+        self._buffer = np.empty(3 * R * self.prey_capacity)  # Per-step uniform draws
+
+        # Placement: prefixes of one random permutation of the cells per species
+        # and replicate; a predator placed on a prey cell replaces that prey
+        rows = np.arange(R)[:, None]
+        prey_perm = np.argsort(self.rng.random((R, cells)), axis=1)
+        predator_perm = np.argsort(self.rng.random((R, cells)), axis=1)
+        taken = np.zeros((R, cells), dtype=bool)
+        taken[rows, predator_perm] = np.arange(cells) < num_predators[:, None]
+        prey_cells = prey_perm
+        keep = (np.arange(cells) < num_prey[:, None]) & ~taken[rows, prey_cells]
+        order = np.argsort(~keep, axis=1, kind="stable")  # Surviving prey first, in order
+        prey_cells = np.take_along_axis(prey_cells, order, axis=1)
+        self.prey_slots = keep.sum(axis=1)
+        alive = np.arange(cells) < self.prey_slots[:, None]
+        self.prey_alive[:, :cells] = alive
+        self.prey_y[:, :cells], self.prey_x[:, :cells] = np.divmod(prey_cells, G)
+        rr, ss = np.nonzero(alive)
+        self.prey_at[rr, prey_cells[rr, ss]] = ss
+        self._set_bits(self.prey_bits, rr, self.prey_x[rr, ss], self.prey_y[rr, ss])
+
+        self.predator_alive[:] = np.arange(Q) < num_predators[:, None]
+        self.predator_y[:], self.predator_x[:] = np.divmod(predator_perm[:, :Q], G)
+        self.energy[self.predator_alive] = rules.initial_energy
+        rr, qq = np.nonzero(self.predator_alive)
+        self._set_bits(self.predator_bits, rr, self.predator_x[rr, qq], self.predator_y[rr, qq])
+
+        self.num_prey = self.prey_alive.sum(axis=1)
+        self.num_predators = self.predator_alive.sum(axis=1)
+        self.step_count = np.zeros(R, dtype=np.int64)
+        self.done = np.zeros(R, dtype=bool)
+        self._update_done()
+
+    # Bit helpers
+
+    @staticmethod
+    def _set_bits(board, r, x, y):
+        np.bitwise_or.at(board, (r, y), _ONE << x.astype(np.uint64))
+
+    @staticmethod
+    def _clear_bits(board, r, x, y):
+        board[r, y] &= ~(_ONE << x.astype(np.uint64))
+
+    def _window(self, rows, x):
+        # Bits x-1, x, x+1 of each row (toroidal) as bits 0, 1, 2
+        s = ((x - 1) % self.G).astype(np.uint64)
+        return ((rows >> s) | (rows << (self._G - s))) & _SEVEN
+
+    def _neighbors(self, board, r, x, y):
+        """8-bit neighbor mask of (x, y) in each replicate r of board."""
+        G = self.G
+        up = self._window(board[r, (y - 1) % G], x)
+        mid = self._window(board[r, y], x)
+        down = self._window(board[r, (y + 1) % G], x)
+        mid = (mid & _ONE) | ((mid >> np.uint64(2)) << _ONE)
+        return (up | (mid << np.uint64(3)) | (down << np.uint64(5))).astype(np.int64)
+
+    def _draw(self, shape):
+        # One block of uniforms in the preallocated buffer (valid until the next draw)
+        return self.rng.random(out=self._buffer[:int(np.prod(shape))]).reshape(shape)
+
+    def _pick(self, mask, u):
+        """Uniformly chosen set bit of each mask (mask must be non-zero)."""
+        return SELECT[mask, (u * POPCOUNT[mask]).astype(np.int64)]
+
+    # Stepping
+
+    def _update_done(self):
+        self.done |= ((self.step_count >= self.rules.max_steps)
+                      | (self.num_prey == 0) | (self.num_predators == 0))
+
+    def _compact_prey(self):
+        # Close the holes left by eaten prey, keeping list order
+        order = np.argsort(~self.prey_alive, axis=1, kind="stable")
+        for column in (self.prey_x, self.prey_y, self.prey_alive):
+            column[:] = np.take_along_axis(column, order, axis=1)
+        self.prey_slots = self.prey_alive.sum(axis=1)
+        rr, ss = np.nonzero(self.prey_alive)
+        self.prey_at[rr, self.prey_y[rr, ss] * self.G + self.prey_x[rr, ss]] = ss
+
+    def step(self):
+        """Advance every unfinished replicate by one step."""
+        if self.done.all():
+            return
+        rules = self.rules
+        G = self.G
+        running = ~self.done
+        if rules.prey_reproduce and (self.prey_slots + self.num_prey).max() > self.prey_capacity:
+            self._compact_prey()
+
+        # Move prey in list order; prey born during this step do not move yet
+        n_start = np.where(running, self.prey_slots, 0)
+        K = int(n_start.max(initial=0))
+        draws = self._draw((3, len(self.done), K))
+        for k in range(K):
+            r = np.nonzero((k < n_start) & self.prey_alive[:, k])[0]
+            if r.size == 0:
+                continue
+            x, y = self.prey_x[r, k], self.prey_y[r, k]
+            occupied = self.prey_bits | self.predator_bits
+            empty = ~self._neighbors(occupied, r, x, y) & 0xFF
+            movers = POPCOUNT[empty] > 0
+            if movers.any():
+                rm, xm, ym = r[movers], x[movers], y[movers]
+                b = self._pick(empty[movers], draws[0, rm, k])
+                nx, ny = (xm + DX[b]) % G, (ym + DY[b]) % G
+                self._clear_bits(self.prey_bits, rm, xm, ym)
+                self._set_bits(self.prey_bits, rm, nx, ny)
+                self.prey_at[rm, ny * G + nx] = k
+                self.prey_x[rm, k], self.prey_y[rm, k] = nx, ny
+            if rules.prey_reproduce:
+                # Offspring go to an empty neighbor of the cell the parent started in
+                breed = draws[1, r, k] < rules.prey_reproduce
+                if breed.any():
+                    rb, xb, yb = r[breed], x[breed], y[breed]
+                    occupied = self.prey_bits | self.predator_bits
+                    empty = ~self._neighbors(occupied, rb, xb, yb) & 0xFF
+                    ok = POPCOUNT[empty] > 0
+                    rb, xb, yb = rb[ok], xb[ok], yb[ok]
+                    b = self._pick(empty[ok], draws[2, rb, k])
+                    nx, ny = (xb + DX[b]) % G, (yb + DY[b]) % G
+                    slot = self.prey_slots[rb]
+                    self.prey_x[rb, slot], self.prey_y[rb, slot] = nx, ny
+                    self.prey_alive[rb, slot] = True
+                    self.prey_at[rb, ny * G + nx] = slot
+                    self._set_bits(self.prey_bits, rb, nx, ny)
+                    self.prey_slots[rb] += 1
+                    self.num_prey[rb] += 1
+
+        # Move predators in a fresh random order
+        n_start = np.where(running, self.num_predators, 0)
+        K = int(n_start.max(initial=0))
+        keys = np.where(self.predator_alive, self._draw(self.predator_alive.shape), 2.0)
+        order = np.argsort(keys, axis=1)
+        draws = self._draw((len(self.done), K))
+        for k in range(K):
+            r = np.nonzero(k < n_start)[0]
+            q = order[r, k]
+            x, y = self.predator_x[r, q], self.predator_y[r, q]
+            prey = self._neighbors(self.prey_bits, r, x, y)
+            empty = ~self._neighbors(self.prey_bits | self.predator_bits, r, x, y) & 0xFF
+            eats = POPCOUNT[prey] > 0
+            moves = ~eats & (POPCOUNT[empty] > 0)
+            target = np.where(eats, prey, empty)
+            goes = eats | moves
+            rg, qg, xg, yg = r[goes], q[goes], x[goes], y[goes]
+            b = self._pick(target[goes], draws[rg, k])
+            nx, ny = (xg + DX[b]) % G, (yg + DY[b]) % G
+            eaten = eats[goes]
+            if eaten.any():
+                re, cell = rg[eaten], ny[eaten] * G + nx[eaten]
+                self.prey_alive[re, self.prey_at[re, cell]] = False
+                self._clear_bits(self.prey_bits, re, nx[eaten], ny[eaten])
+                self.num_prey[re] -= 1
+            self._clear_bits(self.predator_bits, rg, xg, yg)
+            self._set_bits(self.predator_bits, rg, nx, ny)
+            self.predator_x[rg, qg], self.predator_y[rg, qg] = nx, ny
+            # +gain for eating, -cost for moving, -2 * cost when stuck
+            self.energy[r, q] += np.where(eats, rules.gain_from_food,
+                                          np.where(moves, -rules.move_cost, -2 * rules.move_cost))
+            dies = self.energy[r, q] <= 0
+            if dies.any():
+                rd, qd = r[dies], q[dies]
+                self._clear_bits(self.predator_bits, rd, self.predator_x[rd, qd], self.predator_y[rd, qd])
+                self.predator_alive[rd, qd] = False
+                self.num_predators[rd] -= 1
+
+        self.step_count[running] += 1
+        self._update_done()
+
+    def run(self):
+        while not self.done.all():
+            self.step()
+        return self.outcomes()
+
+    def outcomes(self):
+        return np.where(self.num_prey == 0, ALL_PREY_DIED,
+                        np.where(self.num_predators == 0, ALL_PREDATORS_DIED, COEXISTENCE))
+
+    def save_snapshot(self, path):
+        """Write the batch state to path with engine.write_snapshot."""
+        arrays = {name: value for name, value in vars(self).items()
+                  if isinstance(value, np.ndarray) and name != '_buffer'}
+        meta = {'rules': self.rules._asdict(), 'prey_capacity': self.prey_capacity}
+        engine.write_snapshot(path, meta, self.rng, **arrays)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Rebuild a batch saved with save_snapshot; it continues bit for bit."""
+        meta, rng, arrays = engine.read_snapshot(path)
+        batch = cls.__new__(cls)
+        batch.__dict__.update(arrays)
+        batch.rules = engine.Rules(**meta['rules'])
+        batch.rng = rng
+        batch.G = batch.rules.grid_size
+        batch._G = np.uint64(batch.G)
+        batch.prey_capacity = meta['prey_capacity']
+        batch._buffer = np.empty(3 * len(batch.done) * batch.prey_capacity)
+        return batch
+
+    def grid(self, r):
+        """Int-coded grid (EMPTY, PREY, PREDATOR) of replicate r."""
+        columns = np.arange(self.G, dtype=np.uint64)
+        prey = (self.prey_bits[r][:, None] >> columns) & _ONE
+        predators = (self.predator_bits[r][:, None] >> columns) & _ONE
+        return (prey * PREY + predators * PREDATOR).astype(np.int8)
+
+
+def run_batch(num_prey, num_predators, rules=PHASE_DIAGRAM_RULES, rng=None, num_replicates=None):
+    """Outcome code of every replicate; counts may be scalars or per-replicate arrays."""
+    return BitboardBatch(num_prey, num_predators, rules, rng, num_replicates).run()
+
+
+def main():
+    num_replicates = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for name, rules, pair in [("phase diagram", engine.PHASE_DIAGRAM_RULES, (120, 40)),
+                              ("reproduction", engine.REPRODUCTION_RULES, (150, 20))]:
+        start = time.perf_counter()
+        fast = run_batch(*pair, rules, np.random.default_rng(0), num_replicates)
+        fast_time = time.perf_counter() - start
+        reference_runs = max(num_replicates // 10, 1)
+        start = time.perf_counter()
+        reference = [engine.run_simulation(pair, rules, seed)
+                     for seed in range(reference_runs)]
+        reference_time = (time.perf_counter() - start) * num_replicates / reference_runs
+        print(f"{name} {pair}, {num_replicates} replicates")
+        print(f"  bitboard  {fast_time:7.2f} s  outcomes {np.bincount(fast, minlength=3) / len(fast)}")
+        print(f"  reference {reference_time:7.2f} s* outcomes "
+              f"{np.bincount(reference, minlength=3) / len(reference)}  (*extrapolated from {reference_runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Locate phase boundaries by bisection instead of a uniform scan.
+
+Each line holds the ratio fixed and walks the density values (or holds the
+density fixed and walks the ratios). A probe simulates one grid point in
+batches of replicates until a Wilson interval on the share of the target
+outcome excludes 1/2. It stops early at ``max_replicates`` if the point
+stays undecided. The ends of the line fix the target (the majority outcome
+at the low end), and bisection then narrows the gap between the last point
+confidently on each side. Undecided points lie in the transition zone, and
+the gaps on both sides of them are bisected as well. A line therefore
+costs O(log n) probes instead of n, with most replicates spent next to the
+flip. The returned interval spans the confidently classified neighbors of
+the boundary. A line with a target point beyond a non-target one has no
+single flip; its bisection stops and it is reported as non-monotone.
+
+    python boundary.py [num_lines]
+"""
+import functools
+import sys
+from typing import NamedTuple, Optional
+import numpy as np
+import matplotlib.pyplot as plt
+import multiprocessing as mp
+import engine
+from sweep import agent_counts
+
+DENSITY = "density"
+RATIO = "ratio"
+
+SYNCHRONOUS = False  # Synchronous-update variant of the rules (see synchronous.py)
+RULES = engine.PHASE_DIAGRAM_RULES._replace(synchronous=SYNCHRONOUS)  # Rules for python boundary.py
+
+# Probe outcomes
+ABOVE, BELOW, UNDECIDED = 1, -1, 0
+
+
+class Boundary(NamedTuple):
+    """Where the majority outcome along one line stops being ``target``."""
+    fixed: float  # The ratio (density line) or density (ratio line) held fixed
+    # estimate, low and high are None when the whole line has one majority or
+    # the line is non-monotone; low and high are a confidence interval on it
+    estimate: Optional[float]
+    low: Optional[float]
+    high: Optional[float]
+    target: int  # Majority outcome at the low end of the line
+    simulations: int
+    monotone: bool = True  # False when a target point lies beyond a non-target one
+
+
+def wilson_interval(successes, n, z=1.96):
+    """Wilson score interval for a binomial proportion."""
+    p = successes / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return centre - half, centre + half
+
+
+class BoundaryLine:
+    """Bisection state for one line; probes are requested one at a time."""
+
+    def __init__(self, fixed, values, axis, total_grid_cells, target=None):
+        self.fixed = fixed
+        self.values = values
+        self.axis = axis
+        self.total_grid_cells = total_grid_cells
+        self.target = target
+        self.lo = None  # Highest index confidently holding the target
+        self.hi = None  # Lowest index confidently not holding it
+        self.undecided = []
+        self.probes = {}  # index -> (target count, replicates)
+
+    def pair(self, index):
+        value = self.values[index]
+        if self.axis == DENSITY:
+            return agent_counts(self.fixed, value, self.total_grid_cells)
+        return agent_counts(value, self.fixed, self.total_grid_cells)
+
+    def next_index(self):
+        """Index of the next grid point to classify, or None when done."""
+        last = len(self.values) - 1
+        if 0 not in self.probes:
+            return 0
+        if last not in self.probes:
+            return last
+        if self.lo is None or self.hi is None:
+            return None  # No flip between the ends
+        if self.hi < self.lo:
+            return None  # Non-monotone line: bisection has no single flip to find
+        # Undecided points outside (lo, hi) are noise beyond the confident points
+        inside = sorted(i for i in self.undecided if self.lo < i < self.hi)
+        gaps = [self.lo] + inside + [self.hi]
+        for left, right in zip(gaps, gaps[1:]):
+            # The gaps between undecided points are inside the transition zone
+            index = (left + right) // 2
+            if right - left > 1 and (left == self.lo or right == self.hi) \
+                    and index not in self.probes:
+                return index
+        return None
+
+    def record(self, index, counts, max_replicates, z):
+        """Store a probe's outcome counts; returns ABOVE, BELOW or UNDECIDED."""
+        if self.target is None:
+            self.target = int(np.argmax(counts))
+        hits, n = counts[self.target], counts.sum()
+        low, high = wilson_interval(hits, n, z)
+        if low > 0.5:
+            side = ABOVE
+        elif high < 0.5:
+            side = BELOW
+        elif n < max_replicates:
+            return None  # More replicates needed
+        else:
+            side = UNDECIDED
+        self.probes[index] = (hits, n)
+        if side == ABOVE:
+            self.lo = index if self.lo is None else max(self.lo, index)
+        elif side == BELOW:
+            self.hi = index if self.hi is None else min(self.hi, index)
+        else:
+            self.undecided.append(index)
+        return side
+
+    def result(self):
+        simulations = sum(n for _, n in self.probes.values())
+        if self.lo is None or self.hi is None or self.hi < self.lo:
+            monotone = self.lo is None or self.hi is None
+            return Boundary(self.fixed, None, None, None, self.target, simulations, monotone)
+        inside = [i for i in self.undecided if self.lo < i < self.hi]
+        if inside:
+            # The undecided point whose target share is closest to 1/2
+            index = min(inside,
+                        key=lambda i: abs(self.probes[i][0] / self.probes[i][1] - 0.5))
+            estimate = self.values[index]
+        else:
+            estimate = (self.values[self.lo] + self.values[self.hi]) / 2
+        low, high = sorted((self.values[self.lo], self.values[self.hi]))
+        return Boundary(self.fixed, float(estimate), float(low), float(high), self.target,
+                        simulations)
+
+
+def _run_seeded(simulate, task):
+    pair, seed = task
+    return pair, simulate(pair, seed)
+
+
+def locate_boundaries(pool, simulate, fixed_values, values, axis=DENSITY,
+                      total_grid_cells=400, num_outcomes=3, target=None, batch=8,
+                      max_replicates=64, z=1.96, seed=None):
+    """Bisect every line in parallel; returns one Boundary per fixed value.
+
+    ``simulate(pair, seed)`` returns an outcome code and must be picklable.
+    Lines advance together, so every round sends one batch of replicates
+    per pending probe to the pool. Replicates are cached per pair, and the
+    seed of replicate r of a pair is [seed, num_prey, num_predators, r].
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    lines = [BoundaryLine(f, values, axis, total_grid_cells, target) for f in fixed_values]
+    counts = {}  # pair -> outcome counts
+    worker = functools.partial(_run_seeded, simulate)
+    pending = {id(line): line.next_index() for line in lines}
+
+    while any(index is not None for index in pending.values()):
+        wanted = {line.pair(index) for line in lines
+                  if (index := pending[id(line)]) is not None}
+        tasks = []
+        for pair in wanted:
+            done = int(counts.setdefault(pair, np.zeros(num_outcomes, dtype=np.int64)).sum())
+            tasks += [(pair, [seed, pair[0], pair[1], r]) for r in range(done, done + batch)]
+        for pair, outcome in pool.imap_unordered(worker, tasks, chunksize=batch):
+            counts[pair][outcome] += 1
+        for line in lines:
+            index = pending[id(line)]
+            if index is None:
+                continue
+            if line.record(index, counts[line.pair(index)], max_replicates, z) is not None:
+                pending[id(line)] = line.next_index()
+    return [line.result() for line in lines]
+
+
+def run_simulation(args, seed=None):
+    return engine.run_simulation(args, RULES, seed)
+
+
+def main():
+    num_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # Density lines over the grid of phase_diagram_ratio.py
+    ratio_values = np.linspace(0.1, 9.9, num_lines)
+    density_values = np.arange(0.01, 1, 0.01)
+
+    with mp.Pool() as pool:
+        boundaries = locate_boundaries(pool, run_simulation, ratio_values, density_values,
+                                       DENSITY, RULES.grid_size ** 2)
+
+    uniform = len(density_values) * 500  # 99-point scan at NUM_SIMULATIONS per point
+    print(f"{'ratio':>6} {'boundary':>9} {'interval':>15} {'from':>20} {'sims':>6}")
+    for b in boundaries:
+        if b.estimate is None:
+            found = 'none' if b.monotone else 'non-monotone'
+            print(f"{b.fixed:>6.2f} {found:>9} {'':>15} {engine.OUTCOME_LABELS[b.target]:>20} "
+                  f"{b.simulations:>6}")
+        else:
+            print(f"{b.fixed:>6.2f} {b.estimate:>9.2f} {f'[{b.low:.2f}, {b.high:.2f}]':>15} "
+                  f"{engine.OUTCOME_LABELS[b.target]:>20} {b.simulations:>6}")
+    total = sum(b.simulations for b in boundaries)
+    print(f"{total} simulations for {num_lines} lines "
+          f"({total / num_lines:.0f} per line, uniform scan: {uniform})")
+
+    found = [b for b in boundaries if b.estimate is not None]
+    plt.figure(figsize=(10, 8))
+    plt.errorbar([b.fixed for b in found], [b.estimate for b in found],
+                 yerr=[[b.estimate - b.low for b in found], [b.high - b.estimate for b in found]],
+                 fmt='o-', capsize=3)
+    plt.xlabel('Ratio (Prey / Predator)')
+    plt.ylabel('Density (Agents per Grid Cell)')
+    plt.title('Phase Boundary by Bisection')
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Space-filling sweeps over any number of model parameters.
+
+A Cartesian grid over d parameters costs n**d points. A Latin hypercube or
+Sobol design covers the same box with a few hundred points, so the rule
+parameters of reproduction.py (food gain, initial energy, move cost,
+reproduction probability) can be explored together with the initial
+ratio and density. Every design point is simulated ``replicates`` times.
+The result is a columnar table: one array per parameter, the agent counts,
+and the fraction of runs ending in each outcome. It is saved as ``.npz``
+and ``.csv``.
+
+Dimensions are Rules fields (integer fields are rounded) plus ``ratio``
+and ``density``, which map to agent counts as in the 2-D sweeps.
+
+    python design_sweep.py [lhs|sobol] [num_points]
+"""
+import csv
+import functools
+import os
+import sys
+import numpy as np
+import multiprocessing as mp
+from tqdm import tqdm
+import engine
+from sweep import agent_counts
+
+LATIN_HYPERCUBE = "lhs"
+SOBOL = "sobol"
+
+# Parameter ranges for python design_sweep.py: name -> (low, high)
+DIMENSIONS = {
+    'ratio': (0.1, 10.0),
+    'density': (0.01, 0.99),
+    'gain_from_food': (1, 10),
+    'initial_energy': (1, 20),
+    'move_cost': (1, 3),
+    'prey_reproduce': (0.0, 0.3),
+}
+SYNCHRONOUS = False  # Synchronous-update variant of the rules (see synchronous.py)
+BASE_RULES = engine.REPRODUCTION_RULES._replace(synchronous=SYNCHRONOUS)  # Values of the parameters not swept
+REPLICATES = 20
+OUTPUT_PATH = "plots2/design_sweep"
+
+# Sobol direction numbers (Joe & Kuo): degree s, coefficients a, initial m_i
+# for dimensions 2 onwards; dimension 1 is the van der Corput sequence
+SOBOL_DIRECTIONS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+]
+SOBOL_BITS = 30
+
+
+def latin_hypercube(num_points, num_dimensions, rng=None):
+    """One point in each of num_points equal strata of every dimension."""
+    rng = np.random.default_rng(rng)
+    strata = np.argsort(rng.random((num_dimensions, num_points)), axis=1).T
+    return (strata + rng.random((num_points, num_dimensions))) / num_points
+
+
+def sobol(num_points, num_dimensions, rng=None):
+    """Sobol points in [0, 1)^d, randomized by a digital shift when rng is given."""
+    if num_dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError(f"Sobol design supports up to {len(SOBOL_DIRECTIONS) + 1} dimensions")
+    directions = np.zeros((num_dimensions, SOBOL_BITS), dtype=np.uint64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+    for d, (s, a, m) in enumerate(SOBOL_DIRECTIONS[:num_dimensions - 1], start=1):
+        m = list(m)
+        for i in range(s, SOBOL_BITS):
+            value = m[i - s] ^ (m[i - s] << s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= m[i - k] << k
+            m.append(value)
+        directions[d] = [m[i] << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+
+    # Gray-code order: point i flips the direction of the lowest zero bit of i - 1
+    points = np.zeros((num_points, num_dimensions), dtype=np.uint64)
+    current = np.zeros(num_dimensions, dtype=np.uint64)
+    for i in range(1, num_points):
+        c = (~(i - 1) & i).bit_length() - 1  # Lowest zero bit of i - 1
+        current ^= directions[:, c]
+        points[i] = current
+    if rng is not None:
+        shift = np.random.default_rng(rng).integers(0, 1 << SOBOL_BITS, num_dimensions,
+                                                    dtype=np.uint64)
+        points ^= shift
+    return points / float(1 << SOBOL_BITS)
+
+
+def design_points(dimensions, num_points, design=SOBOL, rng=None):
+    """Scale a unit design to the parameter ranges; returns name -> column."""
+    unit = {LATIN_HYPERCUBE: latin_hypercube, SOBOL: sobol}[design](
+        num_points, len(dimensions), rng)
+    columns = {}
+    for column, (name, (low, high)) in zip(unit.T, dimensions.items()):
+        if isinstance(engine.Rules._field_defaults.get(name), int):
+            # Equal-width bins over the integers low..high
+            columns[name] = np.floor(low + column * (high - low + 1)).astype(np.int64)
+        else:
+            columns[name] = low + column * (high - low)
+    return columns
+
+
+def point_setup(columns, index, base_rules, pair, total_grid_cells):
+    """Rules and (num_prey, num_predators) for one design point."""
+    fields = {name: column[index].item() for name, column in columns.items()
+              if name in engine.Rules._fields}
+    rules = base_rules._replace(**fields)
+    if 'ratio' in columns or 'density' in columns:
+        ratio = columns['ratio'][index] if 'ratio' in columns else 1.0
+        density = columns['density'][index] if 'density' in columns else 0.2
+        pair = agent_counts(float(ratio), float(density), total_grid_cells)
+    return rules, pair
+
+
+def _simulate_point(num_outcomes, task):
+    index, pair, rules, replicates, seed = task
+    counts = np.zeros(num_outcomes, dtype=np.int64)
+    for r in range(replicates):
+        counts[engine.run_simulation(pair, rules, [seed, index, r])] += 1
+    return index, counts
+
+
+def design_sweep(pool, dimensions, num_points, design=SOBOL, replicates=REPLICATES,
+                 base_rules=BASE_RULES, pair=(100, 20), seed=None):
+    """Simulate every design point; returns the columnar result table.
+
+    ``pair`` gives the agent counts when neither ratio nor density is swept.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    columns = design_points(dimensions, num_points, design, seed)
+    total_grid_cells = base_rules.grid_size ** 2
+    tasks = []
+    num_prey = np.zeros(num_points, dtype=np.int64)
+    num_predators = np.zeros(num_points, dtype=np.int64)
+    for index in range(num_points):
+        rules, point_pair = point_setup(columns, index, base_rules, pair, total_grid_cells)
+        num_prey[index], num_predators[index] = point_pair
+        tasks.append((index, point_pair, rules, replicates, seed))
+
+    counts = np.zeros((num_points, len(engine.OUTCOME_LABELS)), dtype=np.int64)
+    worker = functools.partial(_simulate_point, len(engine.OUTCOME_LABELS))
+    for index, point_counts in tqdm(pool.imap_unordered(worker, tasks), total=num_points,
+                                    desc="Design points"):
+        counts[index] = point_counts
+
+    table = dict(columns)
+    table['num_prey'] = num_prey
+    table['num_predators'] = num_predators
+    table['replicates'] = np.full(num_points, replicates, dtype=np.int64)
+    for code, label in enumerate(engine.OUTCOME_LABELS):
+        table[label.lower().replace(' ', '_')] = counts[:, code] / replicates
+    return table
+
+
+def save_table(table, path):
+    """Write the table as <path>.npz (columnar) and <path>.csv."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez(f"{path}.npz", **table)
+    with open(f"{path}.csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(table)
+        writer.writerows(zip(*(column.tolist() for column in table.values())))
+
+
+def main():
+    design = sys.argv[1] if len(sys.argv) > 1 else SOBOL
+    num_points = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    with mp.Pool() as pool:
+        table = design_sweep(pool, DIMENSIONS, num_points, design)
+    save_table(table, OUTPUT_PATH)
+    grid_points = 99 ** len(DIMENSIONS)
+    print(f"{num_points} {design} points x {REPLICATES} replicates over {len(DIMENSIONS)} "
+          f"parameters (a 99-point grid per parameter would need {grid_points:.2e} points)")
+    print(f"Table written to {OUTPUT_PATH}.npz and {OUTPUT_PATH}.csv")
+
+
+if __name__ == "__main__":
+    main()
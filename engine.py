@@ -0,0 +1,368 @@
+import functools
+import itertools
+import json
+import os
+from typing import NamedTuple
+import numpy as np
+
+# Outcome codes (same order as phase_diagram_ratio.py)
+ALL_PREY_DIED = 0
+ALL_PREDATORS_DIED = 1
+COEXISTENCE = 2
+OUTCOME_LABELS = ['All Prey Died', 'All Predators Died', 'Coexistence']
+
+
+class Rules(NamedTuple):
+    """Model parameters for a single simulation run."""
+    grid_size: int = 20
+    max_steps: int = 1000
+    initial_energy: int = 5  # Initial energy for predators
+    gain_from_food: int = 5  # Energy gained by predators from eating prey
+    move_cost: int = 1  # Energy cost per step for predators
+    prey_reproduce: float = 0.0  # Probability of prey reproducing each step
+    synchronous: bool = False  # Update all agents at once instead of in turn (synchronous.py)
+    # Grass layer (wolf-sheep-grass): prey spend energy each step and eat the
+    # grass of the cell they reach; an eaten cell regrows after grass_regrowth
+    # steps. 0 turns the layer off, and prey then need no food
+    grass_regrowth: int = 0
+    prey_initial_energy: int = 4
+    prey_gain_from_food: int = 4  # Energy gained by prey from eating grass
+    prey_move_cost: int = 1  # Energy cost per step for prey
+
+
+# Rules used by phase_diagram_ratio.py and reproduction.py respectively
+PHASE_DIAGRAM_RULES = Rules()
+REPRODUCTION_RULES = Rules(max_steps=300, initial_energy=10, prey_reproduce=0.15)
+
+
+# Agent classes
+class Prey:
+    __slots__ = ('x', 'y', 'energy')
+
+    def __init__(self, x, y, energy=0):
+        self.x = x
+        self.y = y
+        self.energy = energy  # Only used with a grass layer
+
+
+class Predator:
+    __slots__ = ('x', 'y', 'energy')
+
+    def __init__(self, x, y, energy):
+        self.x = x
+        self.y = y
+        self.energy = energy
+
+
+class Simulation:
+    """Pure-Python reference engine: one run, advanced one step at a time.
+
+    ``rng`` is a NumPy Generator or anything ``np.random.default_rng``
+    accepts (e.g. an integer seed). Random numbers are drawn in one block
+    per phase of each step into a buffer preallocated for the run.
+
+    With ``aligned=True`` every block has a fixed, grid-sized length, so
+    draw i always belongs to list position i whatever the population. Runs
+    of neighboring sweep cells that share a seed (common random numbers)
+    then consume their streams in step and stay correlated for longer.
+    """
+
+    def __init__(self, num_prey, num_predators, rules=PHASE_DIAGRAM_RULES, rng=None,
+                 aligned=False):
+        if rules.synchronous:
+            raise ValueError("synchronous rules run on synchronous.SynchronousBatch")
+        self.rules = rules
+        self.aligned = aligned
+        self.rng = np.random.default_rng(rng)
+        size = rules.grid_size
+        self.grid = [[None for _ in range(size)] for _ in range(size)]
+        self.prey_list = []
+        self.predator_list = []
+        self.step_count = 0
+        self._buffer = np.empty(3 * size * size)  # Up to 3 draws per agent and phase
+        self.grass = None  # Steps until each cell's grass regrows (0: grown), with a grass layer
+
+        # Initialize agents; a predator placed on a prey cell replaces that prey
+        prey_cells, predator_cells = random_placement(num_prey, num_predators, size, self.rng)
+        for cell in prey_cells:
+            y, x = divmod(int(cell), size)
+            prey = Prey(x, y, rules.prey_initial_energy if rules.grass_regrowth else 0)
+            self.grid[y][x] = prey
+            self.prey_list.append(prey)
+        for cell in predator_cells:
+            y, x = divmod(int(cell), size)
+            predator = Predator(x, y, rules.initial_energy)
+            self.grid[y][x] = predator
+            self.predator_list.append(predator)
+        if rules.grass_regrowth:
+            self.grass = initial_grass(rules, self.rng)
+
+    @property
+    def done(self):
+        return not (self.step_count < self.rules.max_steps and self.prey_list and self.predator_list)
+
+    def step(self):
+        self.step_count += 1
+        move_prey(self.grid, self.prey_list, self.rules, self.rng, self._buffer, self.aligned,
+                  self.grass)
+        move_predators(self.grid, self.prey_list, self.predator_list, self.rules, self.rng,
+                       self._buffer, self.aligned)
+        if self.grass is not None:
+            regrow(self.grass)
+
+    def save_snapshot(self, path):
+        """Write the full run state to path (see write_snapshot).
+
+        Agents are stored in list order, because the list order decides who
+        moves first, so that a restored run continues bit for bit.
+        """
+        prey = np.array([(p.x, p.y, p.energy) for p in self.prey_list],
+                        dtype=np.int32).reshape(-1, 3)
+        predators = np.array([(p.x, p.y, p.energy) for p in self.predator_list],
+                             dtype=np.int32).reshape(-1, 3)
+        meta = {'rules': self.rules._asdict(), 'step_count': self.step_count,
+                'aligned': self.aligned}
+        grass = {} if self.grass is None else {'grass': self.grass}
+        write_snapshot(path, meta, self.rng, prey=prey, predators=predators, **grass)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Rebuild a Simulation saved with save_snapshot."""
+        meta, rng, arrays = read_snapshot(path)
+        sim = cls(0, 0, Rules(**meta['rules']), aligned=meta['aligned'])
+        sim.rng = rng  # Placement above drew from a throwaway generator
+        sim.step_count = meta['step_count']
+        sim.grass = arrays.get('grass')
+        for x, y, *energy in arrays['prey'].tolist():  # Older snapshots have no prey energy
+            prey = Prey(x, y, *energy)
+            sim.grid[y][x] = prey
+            sim.prey_list.append(prey)
+        for x, y, energy in arrays['predators'].tolist():
+            predator = Predator(x, y, energy)
+            sim.grid[y][x] = predator
+            sim.predator_list.append(predator)
+        return sim
+
+    def outcome(self):
+        if not self.prey_list:
+            return ALL_PREY_DIED
+        elif not self.predator_list:
+            return ALL_PREDATORS_DIED
+        else:
+            return COEXISTENCE
+
+
+def random_placement(num_prey, num_predators, grid_size, rng=None):
+    """Sample initial cells as flat indices (y * grid_size + x).
+
+    Prey take distinct cells. Predators take distinct cells anywhere on the
+    grid, so a predator can land on a prey; that prey is dropped rather than
+    left in the prey list without a cell. Each species is one random
+    permutation of the cells, so this runs in O(cells) and always terminates.
+    """
+    cells = grid_size * grid_size
+    if not (0 <= num_prey <= cells and 0 <= num_predators <= cells):
+        raise ValueError(f"cannot place {num_prey} prey and {num_predators} predators on {cells} cells")
+    rng = np.random.default_rng(rng)
+    prey_cells = rng.permutation(cells)[:num_prey]
+    predator_cells = rng.permutation(cells)[:num_predators]
+    prey_cells = prey_cells[~np.isin(prey_cells, predator_cells)]
+    return prey_cells, predator_cells
+
+
+def run_simulation(args, rules=PHASE_DIAGRAM_RULES, rng=None, aligned=False):
+    return run_simulation_timed(args, rules, rng, aligned)[0]
+
+
+def run_simulation_resumable(args, rules=PHASE_DIAGRAM_RULES, rng=None, aligned=False,
+                             path=None, snapshot_every=100):
+    """run_simulation that snapshots to path every snapshot_every steps.
+
+    If path holds a snapshot, the run continues from it (args, rules and
+    rng are then ignored) and reaches the outcome the uninterrupted run
+    would have. The snapshot is removed once the run is over.
+    """
+    if rules.synchronous:
+        import synchronous  # Imports this module, so it is loaded on first use
+        return synchronous.run_simulation_resumable(args, rules, rng, path, snapshot_every)
+    if path is not None and os.path.exists(path):
+        sim = Simulation.load_snapshot(path)
+    else:
+        sim = Simulation(*args, rules, rng, aligned)
+    while not sim.done:
+        sim.step()
+        if path is not None and sim.step_count % snapshot_every == 0 and not sim.done:
+            sim.save_snapshot(path)
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+    return sim.outcome()
+
+
+def write_snapshot(path, meta, rng, **arrays):
+    """Atomically write an engine snapshot as an uncompressed .npz archive.
+
+    ``meta`` (JSON-serializable) and the state of the NumPy Generator
+    ``rng`` are stored as JSON bytes next to the state arrays. The data is
+    written to a temporary file in the same directory, flushed to disk and
+    renamed over path, so a kill mid-write leaves the previous snapshot.
+    """
+    meta = dict(meta, rng=rng.bit_generator.state)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(path):
+    """(meta, rng, arrays) of a snapshot written by write_snapshot."""
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(arrays.pop('meta').tobytes())
+    state = meta.pop('rng')
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return meta, np.random.Generator(bit_generator), arrays
+
+
+def initial_grass(rules, rng):
+    """Grass countdowns at step 0: half the cells grown, the rest part way to regrowing."""
+    size = rules.grid_size
+    grown = rng.random((size, size)) < 0.5
+    countdown = rng.integers(1, rules.grass_regrowth + 1, (size, size))
+    return np.where(grown, 0, countdown).astype(np.int32)
+
+
+def regrow(grass):
+    """Advance every cell's regrowth countdown by one step, in place."""
+    np.subtract(grass, 1, out=grass, where=grass > 0)
+
+
+def run_simulation_timed(args, rules=PHASE_DIAGRAM_RULES, rng=None, aligned=False):
+    """Outcome code and the step it was reached at (max_steps for coexistence).
+
+    Synchronous rules run on synchronous.SynchronousBatch (``aligned`` has
+    no effect there: every step draws the same number of uniforms).
+    """
+    if rules.synchronous:
+        import synchronous  # Imports this module, so it is loaded on first use
+        return synchronous.run_simulation_timed(args, rules, rng)
+    num_prey, num_predators = args
+    sim = Simulation(num_prey, num_predators, rules, rng, aligned)
+    while not sim.done:
+        sim.step()
+    return sim.outcome(), sim.step_count
+
+
+def move_prey(grid, prey_list, rules, rng, buffer, aligned=False, grass=None):
+    # Three uniforms per prey: move order, reproduction test, offspring order
+    draws = rng.random(out=buffer if aligned else buffer[:3 * len(prey_list)]).tolist()
+    table = neighbor_table(rules.grid_size)
+    orders = direction_permutations()
+    num_orders = len(orders)
+    for i, prey in enumerate(prey_list[:]):
+        x, y = prey.x, prey.y
+        neighbors = table[y][x]
+        # A uniformly chosen ordering of the 8 directions is a shuffle
+        for d in orders[int(draws[3 * i] * num_orders)]:
+            nx, ny = neighbors[d]
+            if grid[ny][nx] is None:
+                grid[y][x] = None
+                prey.x, prey.y = nx, ny
+                grid[ny][nx] = prey
+                break
+        if grass is not None:
+            # Pay for the step, eat the grass of the cell reached, starve at energy <= 0
+            prey.energy -= rules.prey_move_cost
+            if grass[prey.y, prey.x] == 0:
+                prey.energy += rules.prey_gain_from_food
+                grass[prey.y, prey.x] = rules.grass_regrowth
+            if prey.energy <= 0:
+                grid[prey.y][prey.x] = None
+                prey_list.remove(prey)
+                continue
+        # Reproduction logic for prey; with grass a parent needs energy to give a newborn 1
+        if rules.prey_reproduce and draws[3 * i + 1] < rules.prey_reproduce \
+                and (grass is None or prey.energy >= 2):
+            for d in orders[int(draws[3 * i + 2] * num_orders)]:
+                nx, ny = neighbors[d]
+                if grid[ny][nx] is None:
+                    new_prey = Prey(nx, ny)
+                    if grass is not None:  # The offspring takes half the parent's energy
+                        new_prey.energy = prey.energy // 2
+                        prey.energy -= new_prey.energy
+                    prey_list.append(new_prey)
+                    grid[ny][nx] = new_prey
+                    break
+
+
+def move_predators(grid, prey_list, predator_list, rules, rng, buffer, aligned=False):
+    n = len(predator_list)
+    if aligned:
+        cells = rules.grid_size * rules.grid_size
+        order = np.argsort(rng.random(out=buffer[:cells])[:n])
+        draws = rng.random(out=buffer[:cells])[:n].tolist()
+    else:
+        order = rng.permutation(n)
+        draws = rng.random(out=buffer[:n]).tolist()
+    predator_list[:] = [predator_list[i] for i in order.tolist()]
+    table = neighbor_table(rules.grid_size)
+    for predator, u in zip(predator_list[:], draws):
+        x, y = predator.x, predator.y
+        prey_neighbors = []
+        empty_neighbors = []
+        for nx, ny in table[y][x]:
+            if isinstance(grid[ny][nx], Prey):
+                prey_neighbors.append((nx, ny))
+            elif grid[ny][nx] is None:
+                empty_neighbors.append((nx, ny))
+        moved = False
+        if prey_neighbors:
+            nx, ny = prey_neighbors[int(u * len(prey_neighbors))]
+            grid[y][x] = None
+            prey = grid[ny][nx]
+            prey_list.remove(prey)
+            grid[ny][nx] = predator
+            predator.x, predator.y = nx, ny
+            predator.energy += rules.gain_from_food
+            moved = True
+        elif empty_neighbors:
+            nx, ny = empty_neighbors[int(u * len(empty_neighbors))]
+            grid[y][x] = None
+            grid[ny][nx] = predator
+            predator.x, predator.y = nx, ny
+            predator.energy -= rules.move_cost
+            moved = True
+        else:
+            predator.energy -= rules.move_cost
+        if not moved:
+            predator.energy -= rules.move_cost
+        if predator.energy <= 0:
+            grid[predator.y][predator.x] = None
+            predator_list.remove(predator)
+
+
+def get_neighbors(x, y, grid_size):
+    neighbors = []
+    for dx in [-1, 0, 1]:
+        for dy in [-1, 0, 1]:
+            if dx == 0 and dy == 0:
+                continue
+            nx = (x + dx) % grid_size
+            ny = (y + dy) % grid_size
+            neighbors.append((nx, ny))
+    return neighbors
+
+
+@functools.lru_cache(maxsize=None)
+def neighbor_table(grid_size):
+    """table[y][x] is the tuple of the 8 toroidal neighbors of (x, y)."""
+    return tuple(tuple(tuple(get_neighbors(x, y, grid_size)) for x in range(grid_size))
+                 for y in range(grid_size))
+
+
+@functools.lru_cache(maxsize=None)
+def direction_permutations():
+    """All 8! orderings of the neighbor directions."""
+    return tuple(itertools.permutations(range(8)))
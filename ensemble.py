@@ -0,0 +1,91 @@
+"""Many replicates of one starting configuration, for the GUI's ensemble view.
+
+A single trajectory says little about outcome probabilities. An Ensemble
+advances N replicates of the same initial counts together on the bitboard
+engine. It records every replicate's populations at every step, so the view
+can plot the mean with a percentile band, count the outcomes reached so
+far, and draw a thumbnail of each replicate's grid framed by its outcome.
+
+The history arrays are preallocated and only ever appended to. A reader
+that holds a length taken after a step can use the first ``length`` rows
+while a worker thread keeps stepping.
+"""
+import math
+import numpy as np
+from bitboard import BitboardBatch
+from engine import PHASE_DIAGRAM_RULES, OUTCOME_LABELS
+from frames import GREEN_BACKGROUND, PREY_COLOR, PREDATOR_COLOR
+
+RUNNING = len(OUTCOME_LABELS)  # Outcome slot of replicates that have not finished
+ENSEMBLE_LABELS = OUTCOME_LABELS + ['Running']
+# Thumbnail frame and histogram bar color per outcome slot (RUNNING last)
+OUTCOME_COLORS = [(200, 60, 60), (60, 60, 200), (230, 180, 0), (150, 150, 150)]
+PALETTE = np.array([GREEN_BACKGROUND, PREY_COLOR, PREDATOR_COLOR], dtype=np.uint8)
+
+
+class Ensemble:
+    """num_replicates bitboard runs of (num_prey, num_predators) with their histories."""
+
+    def __init__(self, num_prey, num_predators, num_replicates, rules=PHASE_DIAGRAM_RULES,
+                 rng=None):
+        self.rules = rules
+        self.num_replicates = num_replicates
+        self.batch = BitboardBatch(num_prey, num_predators, rules, rng, num_replicates)
+        shape = (rules.max_steps + 1, num_replicates)
+        self.prey = np.zeros(shape, dtype=np.int32)
+        self.predators = np.zeros(shape, dtype=np.int32)
+        self.prey[0] = self.batch.num_prey
+        self.predators[0] = self.batch.num_predators
+        self.length = 1  # Recorded steps, including step 0
+
+    @property
+    def done(self):
+        return bool(self.batch.done.all())
+
+    def step(self):
+        """Advance the unfinished replicates; finished ones keep their final counts."""
+        if self.done:
+            return
+        self.batch.step()
+        self.prey[self.length] = self.batch.num_prey
+        self.predators[self.length] = self.batch.num_predators
+        self.length += 1
+
+    def band(self, history, length, low=10, high=90):
+        """Mean and the low/high percentiles of a history over its first length steps."""
+        values = history[:length]
+        return (values.mean(axis=1),) + tuple(np.percentile(values, [low, high], axis=1))
+
+    def outcome_counts(self):
+        """Replicates per slot of ENSEMBLE_LABELS."""
+        slots = np.where(self.batch.done, self.batch.outcomes(), RUNNING)
+        return np.bincount(slots, minlength=len(ENSEMBLE_LABELS))
+
+    def grids(self):
+        """Int-coded grids of all replicates, shape (num_replicates, G, G)."""
+        G = self.batch.G
+        shape = (self.num_replicates, G, 8)
+        # Bit x of a row word is column x; unpack the words' bytes least significant first
+        prey = np.unpackbits(self.batch.prey_bits.astype('<u8').view(np.uint8).reshape(shape),
+                             axis=-1, bitorder='little')[:, :, :G]
+        predators = np.unpackbits(self.batch.predator_bits.astype('<u8').view(np.uint8).reshape(shape),
+                                  axis=-1, bitorder='little')[:, :, :G]
+        return prey + 2 * predators
+
+    def mosaic(self, size):
+        """RGB image of at most size x size pixels tiling every replicate's grid.
+
+        Each thumbnail has a one-pixel frame in its outcome color.
+        """
+        R, G = self.num_replicates, self.batch.G
+        columns = math.ceil(math.sqrt(R))
+        rows = math.ceil(R / columns)
+        cell = max((size // columns - 2) // G, 1)
+        tile = cell * G + 2
+        slots = np.where(self.batch.done, self.batch.outcomes(), RUNNING)
+        tiles = np.full((rows * columns, tile, tile, 3), 255, dtype=np.uint8)
+        tiles[:R] = np.array(OUTCOME_COLORS, dtype=np.uint8)[slots][:, None, None]
+        thumbnails = np.take(PALETTE, self.grids(), axis=0).repeat(cell, axis=1).repeat(cell, axis=2)
+        tiles[:R, 1:-1, 1:-1] = thumbnails
+        return tiles.reshape(rows, columns, tile, tile, 3).transpose(0, 2, 1, 3, 4).reshape(
+            rows * tile, columns * tile, 3)
@@ -0,0 +1,64 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from sweep import plan_sweep, LivePhaseMap, batch_sweep, ExtinctionTimes
+from warm_pool import get_pool
+from backends import dispatch_sweep, save_metadata, BatchSimulator
+from rule_table import FOOD_CHAIN, outcome_labels
+
+# Simulation parameters
+GRID_SIZE = 20
+MAX_STEPS = 300
+NUM_SIMULATIONS = 50
+
+# Live output: memory-mapped .npy files and a PNG preview refreshed while running
+LIVE_MAP_PATH = f"plots2/ratio_density_{NUM_SIMULATIONS}_food_chain_live"
+LIVE_REFRESH_SECONDS = 60  # Minimum seconds between preview refreshes
+
+# Extinction times, exported to <LIVE_MAP_PATH>_survival.npz
+EXTINCTION_BINS = 50
+
+# Species and rules (see rule_table.py): grass, sheep that eat it and wolves
+# that eat sheep. The sweep varies sheep and wolves; grass starts at its density
+TABLE = FOOD_CHAIN._replace(grid_size=GRID_SIZE, max_steps=MAX_STEPS)
+LABELS = outcome_labels(TABLE)
+SWEPT = [TABLE.species[i].name for i in TABLE.swept]
+
+# Up to dispatch.batch_size replicates of one pair per call, on the rule-table engine
+run_batch = BatchSimulator(TABLE)
+
+# Define the ranges for ratio and density
+ratio_values = np.arange(0.1, 10, 0.02)
+density_values = np.arange(0.01, 1, 0.01)
+
+# Each unique (sheep, wolves) pair is simulated only once
+plan = plan_sweep(ratio_values, density_values, GRID_SIZE * GRID_SIZE)
+print(plan.report(NUM_SIMULATIONS))
+
+live_map = LivePhaseMap(plan, ratio_values, density_values, LABELS,
+                        path=LIVE_MAP_PATH, refresh_interval=LIVE_REFRESH_SECONDS)
+extinction = ExtinctionTimes(plan, MAX_STEPS, len(LABELS), len(LABELS) - 1,
+                             EXTINCTION_BINS, path=f"{LIVE_MAP_PATH}_extinction")
+
+dispatch = dispatch_sweep(TABLE, plan, NUM_SIMULATIONS)
+save_metadata(f"{LIVE_MAP_PATH}_meta.json", TABLE, NUM_SIMULATIONS, dispatch)
+print(f"Engines: {dispatch.metadata['pairs_per_backend']}")
+pool = get_pool()  # Kept warm for later sweeps in this interpreter (see warm_pool.py)
+Z = batch_sweep(pool, run_batch, plan, NUM_SIMULATIONS, live_map, dispatch.backends,
+                dispatch.batch_size, extinction=extinction)
+extinction.export_survival(f"{LIVE_MAP_PATH}_survival")
+
+# Create a smooth plot using imshow
+plt.figure(figsize=(10, 8))
+Z_masked = np.ma.masked_invalid(Z)
+extent = [ratio_values.min(), ratio_values.max(), density_values.min(), density_values.max()]
+plt.imshow(Z_masked, extent=extent, origin='lower', aspect='auto', cmap='viridis',
+           vmin=0, vmax=len(LABELS) - 1)
+cbar = plt.colorbar(ticks=range(len(LABELS)))
+cbar.ax.set_yticklabels(LABELS)
+
+plt.xlabel(f'Ratio ({SWEPT[0]} / {SWEPT[1]})')
+plt.ylabel(f'Density ({SWEPT[0]} and {SWEPT[1]} per Grid Cell)')
+plt.title('Phase Diagram of the Grass-Sheep-Wolf Food Chain (Majority Outcome)')
+plt.grid(False)
+plt.savefig(f"plots2/ratio_density_{NUM_SIMULATIONS}_food_chain.png")
+plt.show()
@@ -0,0 +1,173 @@
+"""Headless rendering of runs to RGB frames, PNG sequences and video.
+
+Frames follow the drawing rules of main.py's _draw_grid: a green board,
+black grid lines on the top and left edge of every cell, and prey (white)
+and predators (red) filling their cells, or sprites in their place. The
+energy labels are left out. A frame is built without pygame's display.
+Each cell code picks a prebuilt cell_size x cell_size tile, so a frame is
+a single fancy-indexing operation on the int-coded grid.
+
+    python frames.py frames/            # PNG sequence
+    python frames.py run.mp4 --fps 30   # piped to ffmpeg
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image  # Installed with matplotlib
+import engine
+from spatial import EMPTY, PREY, PREDATOR, occupancy
+
+# Colors shared with main.py
+GREEN_BACKGROUND = (100, 200, 100)
+GRID_LINE_COLOR = (0, 0, 0)
+PREY_COLOR = (255, 255, 255)
+PREDATOR_COLOR = (255, 0, 0)
+
+
+def load_sprite(path, cell_size):
+    """RGBA array of an image scaled to one cell, or None if it cannot be loaded."""
+    try:
+        import pygame  # Only needed for sprites; no display is opened
+        image = pygame.transform.smoothscale(pygame.image.load(path), (cell_size, cell_size))
+    except (ImportError, FileNotFoundError, OSError):
+        return None
+    rgb = np.transpose(pygame.surfarray.pixels3d(image), (1, 0, 2))
+    if image.get_flags() & pygame.SRCALPHA:
+        alpha = np.transpose(pygame.surfarray.pixels_alpha(image), (1, 0))
+    else:
+        alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+    return np.dstack([rgb, alpha]).astype(np.uint8)
+
+
+def cell_tiles(cell_size, prey_sprite=None, predator_sprite=None):
+    """Tiles indexed by cell code, shape (3, cell_size, cell_size, 3)."""
+    empty = np.empty((cell_size, cell_size, 3), dtype=np.uint8)
+    empty[:] = GREEN_BACKGROUND
+    empty[0, :] = GRID_LINE_COLOR
+    empty[:, 0] = GRID_LINE_COLOR
+    tiles = np.empty((3, cell_size, cell_size, 3), dtype=np.uint8)
+    tiles[EMPTY] = empty
+    for code, color, sprite in ((PREY, PREY_COLOR, prey_sprite),
+                                (PREDATOR, PREDATOR_COLOR, predator_sprite)):
+        if sprite is None:
+            tiles[code] = color
+        else:
+            # Alpha-blend the sprite over the empty cell, as a pygame blit does
+            alpha = sprite[..., 3:].astype(np.float64) / 255
+            tiles[code] = np.rint(alpha * sprite[..., :3] + (1 - alpha) * empty).astype(np.uint8)
+    return tiles
+
+
+def render_frame(grid, tiles):
+    """RGB frame (G * cell_size, G * cell_size, 3) of an int-coded grid."""
+    size = grid.shape[0]
+    cell_size = tiles.shape[1]
+    return tiles[grid].transpose(0, 2, 1, 3, 4).reshape(size * cell_size, size * cell_size, 3)
+
+
+class PNGWriter:
+    """Writes frames as <directory>/frame_00000.png, ...
+
+    PNG compression dominates the cost of a frame. Pillow releases the GIL
+    while it compresses, so frames are encoded on a thread pool, with at
+    most ``2 * threads`` frames in flight.
+    """
+
+    def __init__(self, directory, threads=None):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+        threads = threads or os.cpu_count()
+        self.pool = ThreadPoolExecutor(threads)
+        self.pending = deque()
+        self.max_pending = 2 * threads
+
+    def write(self, frame):
+        path = os.path.join(self.directory, f"frame_{self.count:05d}.png")
+        self.pending.append(self.pool.submit(_save_png, path, frame.copy()))
+        if len(self.pending) > self.max_pending:
+            self.pending.popleft().result()
+        self.count += 1
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().result()
+        self.pool.shutdown()
+
+
+def _save_png(path, frame):
+    Image.fromarray(frame).save(path, compress_level=1)
+
+
+class EncoderWriter:
+    """Pipes raw RGB frames to a local ffmpeg process."""
+
+    def __init__(self, path, width, height, fps=30, encoder='ffmpeg'):
+        if shutil.which(encoder) is None:
+            raise RuntimeError(f"{encoder} not found; write a PNG sequence instead")
+        self.count = 0
+        self.process = subprocess.Popen(
+            [encoder, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', f"{width}x{height}", '-r', str(fps), '-i', '-', '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        self.count += 1
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"encoder exited with code {self.process.returncode}")
+
+
+def export_run(writer, num_prey, num_predators, rules=engine.PHASE_DIAGRAM_RULES, rng=None,
+               cell_size=30, sprites=False, every=1):
+    """Render one reference-engine run (every ``every`` steps); returns its outcome."""
+    prey_sprite = load_sprite('rabbit.png', cell_size) if sprites else None
+    predator_sprite = load_sprite('fox.png', cell_size) if sprites else None
+    tiles = cell_tiles(cell_size, prey_sprite, predator_sprite)
+    sim = engine.Simulation(num_prey, num_predators, rules, rng)
+    writer.write(render_frame(occupancy(sim), tiles))
+    while not sim.done:
+        sim.step()
+        if sim.step_count % every == 0 or sim.done:
+            writer.write(render_frame(occupancy(sim), tiles))
+    writer.close()
+    return sim.outcome()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a simulation run as frames or video")
+    parser.add_argument('output', help="directory for a PNG sequence, or a video file name")
+    parser.add_argument('--prey', type=int, default=50)
+    parser.add_argument('--predators', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--cell-size', type=int, default=30)
+    parser.add_argument('--every', type=int, default=1, help="render every n-th step")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--sprites', action='store_true', help="use rabbit.png and fox.png")
+    args = parser.parse_args()
+
+    rules = engine.PHASE_DIAGRAM_RULES
+    side = rules.grid_size * args.cell_size
+    if os.path.splitext(args.output)[1]:
+        writer = EncoderWriter(args.output, side, side, args.fps)
+    else:
+        writer = PNGWriter(args.output)
+    start = time.perf_counter()
+    outcome = export_run(writer, args.prey, args.predators, rules, args.seed, args.cell_size,
+                         args.sprites, args.every)
+    elapsed = time.perf_counter() - start
+    print(f"{writer.count} frames in {elapsed:.1f} s ({writer.count / elapsed:.0f} frames/s, "
+          f"{writer.count / elapsed / args.fps:.0f}x real time at {args.fps} fps): "
+          f"{engine.OUTCOME_LABELS[outcome]}")
+
+
+if __name__ == "__main__":
+    main()
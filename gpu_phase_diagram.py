@@ -15,6 +15,21 @@ EMPTY = 0
 PREY = 1
 PREDATOR = 2
 
+@cuda.jit(device=True)
+def place_agents(grid, energy_grid, cells, count, state, energy, rng):
+    # Partial Fisher-Yates shuffle of the cell indices: O(cells) and always
+    # terminates, even at full density
+    num_cells = GRID_SIZE * GRID_SIZE
+    for c in range(num_cells):
+        cells[c] = c
+    for k in range(count):
+        r = k + rng.random_raw() % (num_cells - k)
+        cell = cells[r]
+        cells[r] = cells[k]
+        cells[k] = cell
+        grid[cell // GRID_SIZE][cell % GRID_SIZE] = state
+        energy_grid[cell // GRID_SIZE][cell % GRID_SIZE] = energy
+
 # GPU kernel for running the simulation
 @cuda.jit
 def run_simulation_kernel(prey_counts, predator_counts, grid_size, max_steps, results):
@@ -37,24 +52,10 @@ def run_simulation_kernel(prey_counts, predator_counts, grid_size, max_steps, re
     num_prey = prey_counts[idx]
     num_predators = predator_counts[idx]
 
-    # Place prey
-    for _ in range(num_prey):
-        while True:
-            x = rng.random_raw() % GRID_SIZE
-            y = rng.random_raw() % GRID_SIZE
-            if grid[y][x] == EMPTY:
-                grid[y][x] = PREY
-                break
-
-    # Place predators
-    for _ in range(num_predators):
-        while True:
-            x = rng.random_raw() % GRID_SIZE
-            y = rng.random_raw() % GRID_SIZE
-            if grid[y][x] == EMPTY:
-                grid[y][x] = PREDATOR
-                energy_grid[y][x] = 5  # Initial energy
-                break
+    # Place prey, then predators; a predator placed on a prey cell replaces it
+    cells = cuda.local.array(GRID_SIZE * GRID_SIZE, numba.int16)
+    place_agents(grid, energy_grid, cells, num_prey, PREY, 0, rng)
+    place_agents(grid, energy_grid, cells, num_predators, PREDATOR, 5, rng)
 
     step_count = 0
     while step_count < max_steps:
@@ -1,21 +1,80 @@
 import pygame
 import random
+import threading
+import time
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from engine import PHASE_DIAGRAM_RULES, random_placement
+from ensemble import Ensemble, ENSEMBLE_LABELS, OUTCOME_COLORS
+from frames import GREEN_BACKGROUND, GRID_LINE_COLOR, PREY_COLOR, PREDATOR_COLOR
 
 # Agent classes
 class Prey:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
 class Predator:
+    __slots__ = ('x', 'y', 'energy')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
         self.energy = 5  # Predators lose energy each turn
-        self.display_energy_gain = False  # Display "+Energy Gained"
-        self.energy_gain_timer = 0  # Timer for displaying energy gain
+
+# Top of the speed slider: step as fast as possible instead of at a fixed rate
+MAX_SPEED = 100
+FRAME_INTERVAL = 1 / 60  # Seconds between snapshots when running unthrottled
+GRAPH_INTERVAL = 0.25  # Seconds between redraws of the ensemble graph
+
+class SimulationSnapshot:
+    """Copy of the state the render loop draws, taken between two steps."""
+    __slots__ = ('prey', 'predators', 'history_length', 'step_count', 'state')
+
+    def __init__(self, prey, predators, history_length, step_count, state):
+        self.prey = prey  # [(x, y)]
+        self.predators = predators  # [(x, y, energy, gained energy this step)]
+        self.history_length = history_length  # Valid prefix of the history lists
+        self.step_count = step_count
+        self.state = state
+
+class EnsembleSnapshot:
+    """What the render loop draws of an ensemble, taken between two steps."""
+    __slots__ = ('ensemble', 'length', 'outcome_counts', 'mosaic', 'done')
+
+    def __init__(self, ensemble, length, outcome_counts, mosaic, done):
+        self.ensemble = ensemble  # Histories are read up to length
+        self.length = length
+        self.outcome_counts = outcome_counts
+        self.mosaic = mosaic  # RGB array of the replicate thumbnails
+        self.done = done
+
+class SnapshotBuffer:
+    """Double buffer: the worker fills the back slot, then swaps it to the front."""
+    def __init__(self):
+        self._slots = [None, None]
+        self._front = 0
+        self._lock = threading.Lock()
+
+    def publish(self, snapshot):
+        back = 1 - self._front
+        self._slots[back] = snapshot
+        with self._lock:
+            self._front = back
+
+    def latest(self):
+        with self._lock:
+            return self._slots[self._front]
+
+def _doubling(value, start):
+    """Smallest start * 2**k that is at least value (axis limits that rarely change)."""
+    limit = start
+    while limit < value:
+        limit *= 2
+    return limit
 
 # UIButton class
 class UIButton:
@@ -81,7 +140,7 @@ class PredatorPreySimulation:
         self.screen_height = self.grid_size * self.cell_size
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
         pygame.display.set_caption("Predator-Prey Simulation")
-        self.GREEN_BACKGROUND = (100, 200, 100)
+        self.GREEN_BACKGROUND = GREEN_BACKGROUND  # Board colors are shared with frames.py
         self.MENU_BACKGROUND = (230, 230, 230)
         self._create_ui_elements()
         self.is_running = False
@@ -89,6 +148,7 @@ class PredatorPreySimulation:
         self.grid = None
         self.prey_list = []
         self.predator_list = []
+        self.energy_gain_timers = {}  # Predators that ate this step (shows "+Energy Gained")
         self.simulation_speed = 5
         self.prey_population_history = []
         self.predator_population_history = []
@@ -105,6 +165,26 @@ class PredatorPreySimulation:
         self.font = pygame.font.Font(None, 20)
         self.fig, self.ax = plt.subplots(figsize=(4, 4))
         self.canvas = FigureCanvas(self.fig)
+        self.graph_surface = None
+        self.graph_length = -1  # History length the cached graph was drawn for
+        # Ensemble view: many bitboard replicates of the slider settings at once
+        self.ensemble = None
+        self.ensemble_fig, (self.population_ax, self.outcome_ax) = plt.subplots(
+            2, 1, figsize=(4, 4), gridspec_kw={'height_ratios': [2, 1]})
+        # Fixed margins: tight_layout on every redraw would cost more than the drawing
+        self.ensemble_fig.subplots_adjust(left=0.3, right=0.95, top=0.93, bottom=0.08, hspace=0.45)
+        self.ensemble_canvas = FigureCanvas(self.ensemble_fig)
+        self.ensemble_graph_surface = None
+        self.ensemble_graph_length = -1
+        self.ensemble_graph_time = 0.0
+        self.mosaic_surface = None
+        self.mosaic_id = None
+        # Stepping runs in a background thread; the render loop draws the
+        # latest snapshot it published, so the UI never waits for a step
+        self.lock = threading.Lock()  # Guards the simulation state
+        self.snapshots = SnapshotBuffer()
+        self.stop_event = threading.Event()
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
             
     def _create_ui_elements(self):
         # Adjusted positions for UI elements
@@ -113,37 +193,38 @@ class PredatorPreySimulation:
         
         self.prey_slider = UISlider(10, start_y, 230, 20, 0, 100, 50, "Initial Prey")
         self.predator_slider = UISlider(10, start_y + vertical_spacing, 230, 20, 0, 50, 20, "Initial Predators")
-        self.speed_slider = UISlider(10, start_y + 2 * vertical_spacing, 230, 20, 1, 20, 5, "Sim Speed")
+        self.speed_slider = UISlider(10, start_y + 2 * vertical_spacing, 230, 20, 1, MAX_SPEED, 5, "Sim Speed")
         self.setup_button = UIButton(10, start_y + 3 * vertical_spacing, 230, 50, "Setup Simulation", (150, 255, 150))
         self.run_button = UIButton(10, start_y + 3 * vertical_spacing + 70, 230, 50, "Run Simulation", (100, 200, 100))
         self.pause_button = UIButton(10, start_y + 3 * vertical_spacing + 140, 230, 50, "Pause/Resume", (255, 200, 100))
         self.reset_button = UIButton(10, start_y + 3 * vertical_spacing + 210, 230, 50, "Reset", (200, 150, 150))
+        # Ensemble controls sit under the population graph
+        graph_start_x = self.menu_width + self.grid_size * self.cell_size
+        self.replicates_slider = UISlider(graph_start_x + 10, 470, 230, 20, 10, 400, 100, "Replicates")
+        self.ensemble_button = UIButton(graph_start_x + 10, 520, 230, 50, "Run Ensemble", (150, 200, 255))
         
     def _initialize_population(self, num_prey, num_predators):
         self.grid = [[None for _ in range(self.grid_size)] for _ in range(self.grid_size)]
         self.prey_list = []
         self.predator_list = []
+        self.energy_gain_timers = {}
         self.prey_population_history = []
         self.predator_population_history = []
         self.time_steps = []
         self.step_count = 0
         self.simulation_state = ""
-        for _ in range(int(num_prey)):
-            while True:
-                x, y = random.randint(0, self.grid_size-1), random.randint(0, self.grid_size-1)
-                if self.grid[y][x] is None:
-                    prey = Prey(x, y)
-                    self.grid[y][x] = prey
-                    self.prey_list.append(prey)
-                    break
-        for _ in range(int(num_predators)):
-            while True:
-                x, y = random.randint(0, self.grid_size-1), random.randint(0, self.grid_size-1)
-                if self.grid[y][x] is None or isinstance(self.grid[y][x], Prey):
-                    predator = Predator(x, y)
-                    self.grid[y][x] = predator
-                    self.predator_list.append(predator)
-                    break
+        # A predator placed on a prey cell replaces that prey
+        prey_cells, predator_cells = random_placement(int(num_prey), int(num_predators), self.grid_size)
+        for cell in prey_cells:
+            y, x = divmod(int(cell), self.grid_size)
+            prey = Prey(x, y)
+            self.grid[y][x] = prey
+            self.prey_list.append(prey)
+        for cell in predator_cells:
+            y, x = divmod(int(cell), self.grid_size)
+            predator = Predator(x, y)
+            self.grid[y][x] = predator
+            self.predator_list.append(predator)
         
     def draw_menu(self):
         menu_rect = pygame.Rect(0, 0, self.menu_width, self.screen_height)
@@ -160,13 +241,14 @@ class PredatorPreySimulation:
         self.run_button.draw(self.screen)
         self.pause_button.draw(self.screen)
         self.reset_button.draw(self.screen)
+        self.replicates_slider.draw(self.screen)
+        self.ensemble_button.draw(self.screen)
         
     def run(self):
         clock = pygame.time.Clock()
+        self.worker.start()
         running = True
         while running:
-            if self.is_running and not self.is_paused:
-                self.simulation_logic()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
@@ -174,105 +256,250 @@ class PredatorPreySimulation:
                     self.prey_slider.handle_event(event)
                     self.predator_slider.handle_event(event)
                     self.speed_slider.handle_event(event)
+                    self.replicates_slider.handle_event(event)
                     self.simulation_speed = int(self.speed_slider.current_val)
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         mouse_pos = event.pos
                         if self.setup_button.is_clicked(mouse_pos):
-                            self._initialize_population(self.prey_slider.current_val, self.predator_slider.current_val)
-                            self.is_running = False
-                            self.is_paused = False
-                        if self.run_button.is_clicked(mouse_pos) and self.grid:
+                            with self.lock:
+                                self.is_running = False
+                                self.is_paused = False
+                                self.ensemble = None
+                                self._initialize_population(self.prey_slider.current_val, self.predator_slider.current_val)
+                                self._publish()
+                        if self.ensemble_button.is_clicked(mouse_pos):
+                            with self.lock:
+                                self.ensemble = Ensemble(
+                                    int(self.prey_slider.current_val), int(self.predator_slider.current_val),
+                                    int(self.replicates_slider.current_val),
+                                    PHASE_DIAGRAM_RULES._replace(grid_size=self.grid_size, max_steps=self.max_steps))
+                                self.ensemble_graph_length = -1
+                                self._publish()
+                                self.is_running = True
+                                self.is_paused = False
+                        if self.run_button.is_clicked(mouse_pos) and self.grid and self.ensemble is None:
                             self.is_running = True
                             self.is_paused = False
                         if self.pause_button.is_clicked(mouse_pos) and self.is_running:
                             self.is_paused = not self.is_paused
                         if self.reset_button.is_clicked(mouse_pos):
-                            self.is_running = False
-                            self.is_paused = False
-                            self.grid = None
-                            self.prey_list = []
-                            self.predator_list = []
-                            self.prey_population_history = []
-                            self.predator_population_history = []
-                            self.time_steps = []
-                            self.step_count = 0
-                            self.simulation_state = ""
+                            with self.lock:
+                                self.is_running = False
+                                self.is_paused = False
+                                self.ensemble = None
+                                self.grid = None
+                                self.prey_list = []
+                                self.predator_list = []
+                                self.energy_gain_timers = {}
+                                self.prey_population_history = []
+                                self.predator_population_history = []
+                                self.time_steps = []
+                                self.step_count = 0
+                                self.simulation_state = ""
+                                self.snapshots.publish(None)
             self.screen.fill((255, 255, 255))
             self.draw_menu()
-            if self.grid:
-                self._draw_grid()
-                self._draw_population_graph()
-                self._draw_simulation_state()
+            snapshot = self.snapshots.latest()
+            if isinstance(snapshot, EnsembleSnapshot):
+                self._draw_ensemble(snapshot)
+            elif snapshot is not None:
+                self._draw_grid(snapshot)
+                self._draw_population_graph(snapshot)
+                self._draw_simulation_state(snapshot)
             pygame.display.flip()
             clock.tick(60)
+        self.stop_event.set()
+        self.worker.join()
         pygame.quit()
-        
-    def _draw_grid(self):
+
+    def _worker_loop(self):
+        """Step the simulation at simulation_speed steps per second (unthrottled at MAX_SPEED)."""
+        next_step = time.perf_counter()
+        last_publish = 0.0
+        while not self.stop_event.is_set():
+            if not self.is_running or self.is_paused:
+                time.sleep(0.01)
+                next_step = time.perf_counter()
+                continue
+            speed = self.simulation_speed
+            now = time.perf_counter()
+            if speed < MAX_SPEED:
+                if now < next_step:
+                    time.sleep(min(next_step - now, 0.05))  # Short sleeps keep speed changes responsive
+                    continue
+                next_step = max(next_step + 1 / speed, now)
+            with self.lock:
+                if not self.is_running or self.is_paused:
+                    continue
+                if self.ensemble is not None:
+                    self.ensemble.step()
+                    if self.ensemble.done:
+                        self.is_running = False
+                else:
+                    self.simulation_logic()
+                # Unthrottled runs publish about once per frame
+                if speed < MAX_SPEED or not self.is_running or now - last_publish >= FRAME_INTERVAL:
+                    self._publish()
+                    last_publish = now
+            if speed >= MAX_SPEED:
+                time.sleep(0)  # Let the render thread take the GIL
+
+    def _publish(self):
+        """Publish a snapshot of the current state (call with self.lock held)."""
+        if self.ensemble is not None:
+            ensemble = self.ensemble
+            self.snapshots.publish(EnsembleSnapshot(
+                ensemble, ensemble.length, ensemble.outcome_counts(),
+                ensemble.mosaic(self.grid_size * self.cell_size), ensemble.done))
+            return
+        if self.grid is None:
+            self.snapshots.publish(None)
+            return
+        self.snapshots.publish(SimulationSnapshot(
+            [(prey.x, prey.y) for prey in self.prey_list],
+            [(p.x, p.y, p.energy, p in self.energy_gain_timers) for p in self.predator_list],
+            len(self.time_steps), self.step_count, self.simulation_state))
+
+    def _draw_grid(self, snapshot):
         grid_start_x = self.menu_width
         grid_rect = pygame.Rect(grid_start_x, 0, self.grid_size * self.cell_size, self.grid_size * self.cell_size)
         pygame.draw.rect(self.screen, self.GREEN_BACKGROUND, grid_rect)
         for x in range(grid_start_x, grid_start_x + self.grid_size * self.cell_size, self.cell_size):
-            pygame.draw.line(self.screen, (0, 0, 0), (x, 0), (x, self.grid_size * self.cell_size))
+            pygame.draw.line(self.screen, GRID_LINE_COLOR, (x, 0), (x, self.grid_size * self.cell_size))
         for y in range(0, self.grid_size * self.cell_size, self.cell_size):
-            pygame.draw.line(self.screen, (0, 0, 0), (grid_start_x, y), (grid_start_x + self.grid_size * self.cell_size, y))
-        for prey in self.prey_list:
-            x = prey.x * self.cell_size + grid_start_x
-            y = prey.y * self.cell_size
+            pygame.draw.line(self.screen, GRID_LINE_COLOR, (grid_start_x, y), (grid_start_x + self.grid_size * self.cell_size, y))
+        for prey_x, prey_y in snapshot.prey:
+            x = prey_x * self.cell_size + grid_start_x
+            y = prey_y * self.cell_size
             agent_rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
             if self.prey_image:
                 scaled_image = pygame.transform.scale(self.prey_image, (self.cell_size, self.cell_size))
                 self.screen.blit(scaled_image, agent_rect)
             else:
-                pygame.draw.rect(self.screen, (255, 255, 255), agent_rect)
-        for predator in self.predator_list:
-            x = predator.x * self.cell_size + grid_start_x
-            y = predator.y * self.cell_size
+                pygame.draw.rect(self.screen, PREY_COLOR, agent_rect)
+        for predator_x, predator_y, energy, gained in snapshot.predators:
+            x = predator_x * self.cell_size + grid_start_x
+            y = predator_y * self.cell_size
             agent_rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
             if self.predator_image:
                 scaled_image = pygame.transform.scale(self.predator_image, (self.cell_size, self.cell_size))
                 self.screen.blit(scaled_image, agent_rect)
             else:
-                pygame.draw.rect(self.screen, (255, 0, 0), agent_rect)
-            energy_text = self.font.render(f"E:{predator.energy}", True, (0, 0, 0))
+                pygame.draw.rect(self.screen, PREDATOR_COLOR, agent_rect)
+            energy_text = self.font.render(f"E:{energy}", True, (0, 0, 0))
             self.screen.blit(energy_text, (x, y - 15))
-            if predator.display_energy_gain:
+            if gained:
                 gain_text = self.font.render("+Energy Gained", True, (0, 255, 0))
                 self.screen.blit(gain_text, (x, y - 30))
-                predator.energy_gain_timer -= 1
-                if predator.energy_gain_timer <= 0:
-                    predator.display_energy_gain = False
         
-    def _draw_population_graph(self):
+    def _draw_population_graph(self, snapshot):
         graph_start_x = self.menu_width + self.grid_size * self.cell_size
-        self.ax.clear()
-        self.ax.plot(self.time_steps, self.prey_population_history, label='Prey', color='blue')
-        self.ax.plot(self.time_steps, self.predator_population_history, label='Predators', color='red')
-        self.ax.set_title('Population over Time')
-        self.ax.set_xlabel('Time Steps')
-        self.ax.set_ylabel('Population')
-        self.ax.legend()
-        self.canvas.draw()
-        renderer = self.canvas.get_renderer()
-        raw_data = renderer.tostring_rgb()
-        size = self.canvas.get_width_height()
-        surf = pygame.image.fromstring(raw_data, size, "RGB")
-        self.screen.blit(surf, (graph_start_x, 10))
+        n = snapshot.history_length
+        if n != self.graph_length:
+            # Redraw only when the snapshot has new steps; the lists are append-only
+            self.ax.clear()
+            self.ax.plot(self.time_steps[:n], self.prey_population_history[:n], label='Prey', color='blue')
+            self.ax.plot(self.time_steps[:n], self.predator_population_history[:n], label='Predators', color='red')
+            self.ax.set_title('Population over Time')
+            self.ax.set_xlabel('Time Steps')
+            self.ax.set_ylabel('Population')
+            self.ax.legend()
+            self.canvas.draw()
+            size = self.canvas.get_width_height()
+            self.graph_surface = pygame.image.frombuffer(bytes(self.canvas.buffer_rgba()), size, "RGBA")
+            self.graph_length = n
+        self.screen.blit(self.graph_surface, (graph_start_x, 10))
         
-    def _draw_simulation_state(self):
+    def _setup_ensemble_graph(self, ensemble):
+        """Create the ensemble graph's artists; redraws only update their data.
+
+        The data artists are animated: a full figure draw (axes, ticks, text)
+        only happens when the axis limits change, and limits grow by doubling.
+        Other redraws paste the cached background and draw the data on it.
+        """
+        self.population_ax.clear()
+        self.prey_mean_line, = self.population_ax.plot(
+            [], [], color='blue', label='Prey (mean, 10-90%)', animated=True)
+        self.predator_mean_line, = self.population_ax.plot(
+            [], [], color='red', label='Predators (mean, 10-90%)', animated=True)
+        self.bands = [self.population_ax.fill_between([], [], [], animated=True) for _ in range(2)]
+        self.population_ax.set_title(f'{ensemble.num_replicates} Replicates')
+        self.population_ax.set_xlabel('Time Steps')
+        self.population_ax.set_ylabel('Population')
+        self.population_ax.legend(fontsize='small', loc='upper right')
+        self.outcome_ax.clear()
+        self.outcome_bars = self.outcome_ax.barh(
+            range(len(ENSEMBLE_LABELS)), np.zeros(len(ENSEMBLE_LABELS)),
+            color=[tuple(c / 255 for c in color) for color in OUTCOME_COLORS], animated=True)
+        self.outcome_ax.set_yticks(range(len(ENSEMBLE_LABELS)), ENSEMBLE_LABELS, fontsize='small')
+        self.outcome_ax.set_xlim(0, ensemble.num_replicates)
+        self.ensemble_limits = None
+        self.ensemble_background = None
+
+    def _draw_ensemble(self, snapshot):
+        """Replicate thumbnails in place of the grid; population band and outcomes in place of the graph."""
+        if snapshot.mosaic is not self.mosaic_id:
+            height, width = snapshot.mosaic.shape[:2]
+            surface = pygame.image.frombuffer(snapshot.mosaic.tobytes(), (width, height), "RGB")
+            # Thumbnails use whole pixels per cell; stretch them to fill the board
+            scale = self.grid_size * self.cell_size / max(width, height)
+            self.mosaic_surface = pygame.transform.scale(surface, (int(width * scale), int(height * scale)))
+            self.mosaic_id = snapshot.mosaic
+        self.screen.blit(self.mosaic_surface, (self.menu_width, 0))
+        graph_start_x = self.menu_width + self.grid_size * self.cell_size
+        now = time.perf_counter()
+        n = snapshot.length
+        if n != self.ensemble_graph_length and (snapshot.done or self.ensemble_graph_length < 0
+                                                or now - self.ensemble_graph_time >= GRAPH_INTERVAL):
+            ensemble = snapshot.ensemble
+            if self.ensemble_graph_length < 0:
+                self._setup_ensemble_graph(ensemble)
+            steps = np.arange(n)
+            top = 1
+            for history, line in ((ensemble.prey, self.prey_mean_line),
+                                  (ensemble.predators, self.predator_mean_line)):
+                mean, low, high = ensemble.band(history, n)
+                line.set_data(steps, mean)
+                self.bands.pop(0).remove()
+                self.bands.append(self.population_ax.fill_between(
+                    steps, low, high, color=line.get_color(), alpha=0.2, linewidth=0, animated=True))
+                top = max(top, high.max())
+            limits = (_doubling(n - 1, 50), _doubling(top, 10))
+            if limits != self.ensemble_limits:
+                self.population_ax.set_xlim(0, limits[0])
+                self.population_ax.set_ylim(0, limits[1])
+                self.ensemble_canvas.draw()
+                self.ensemble_background = self.ensemble_canvas.copy_from_bbox(self.ensemble_fig.bbox)
+                self.ensemble_limits = limits
+            else:
+                self.ensemble_canvas.restore_region(self.ensemble_background)
+            for bar, count in zip(self.outcome_bars, snapshot.outcome_counts):
+                bar.set_width(count)
+                self.outcome_ax.draw_artist(bar)
+            for artist in self.bands + [self.prey_mean_line, self.predator_mean_line]:
+                self.population_ax.draw_artist(artist)
+            size = self.ensemble_canvas.get_width_height()
+            self.ensemble_graph_surface = pygame.image.frombuffer(
+                bytes(self.ensemble_canvas.buffer_rgba()), size, "RGBA")
+            self.ensemble_graph_length = n
+            self.ensemble_graph_time = now
+        self.screen.blit(self.ensemble_graph_surface, (graph_start_x, 10))
+
+    def _draw_simulation_state(self, snapshot):
         """Display the state of the simulation under the graph."""
-        if self.simulation_state:
+        if snapshot.state:
             graph_start_x = self.menu_width + self.grid_size * self.cell_size
-            state_text_surface = self.font.render(f"Simulation State: {self.simulation_state}", True, (0, 0, 0))
+            state_text_surface = self.font.render(f"Simulation State: {snapshot.state}", True, (0, 0, 0))
             self.screen.blit(state_text_surface, (graph_start_x, 320))
         
     def simulation_logic(self):
         self.step_count += 1
+        self.energy_gain_timers = {}  # "+Energy Gained" shows for the step a predator ate
         self.move_prey()
         self.move_predators()
         self.prey_population_history.append(len(self.prey_list))
         self.predator_population_history.append(len(self.predator_list))
         self.time_steps.append(self.step_count)
-        pygame.time.delay(int(1000 / self.simulation_speed))
         if len(self.prey_list) == 0:
             self.is_paused = True
             self.is_running = False
@@ -319,8 +546,7 @@ class PredatorPreySimulation:
                 self.grid[ny][nx] = predator
                 predator.x, predator.y = nx, ny
                 predator.energy += 5
-                predator.display_energy_gain = True
-                predator.energy_gain_timer = 1  # Display for 1 step
+                self.energy_gain_timers[predator] = 1  # Display for 1 step
                 moved = True
             elif empty_neighbors:
                 nx, ny = random.choice(empty_neighbors)
@@ -337,6 +563,7 @@ class PredatorPreySimulation:
             if predator.energy <= 0:
                 self.grid[predator.y][predator.x] = None
                 self.predator_list.remove(predator)
+                self.energy_gain_timers.pop(predator, None)
         
     def get_neighbors(self, x, y):
         neighbors = []
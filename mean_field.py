@@ -0,0 +1,164 @@
+"""Mean-field and pair-approximation previews of the phase diagram.
+
+Both models iterate the per-step rules of engine.py on densities instead
+of agents: u is the fraction of cells holding prey and v[e] the fraction
+holding a predator with energy e. Every step:
+
+* prey reproduce with probability ``prey_reproduce`` if they have an
+  empty neighbor;
+* each predator eats if any of its 8 neighbors is prey (+gain_from_food),
+  otherwise moves to an empty neighbor (-move_cost), otherwise stays
+  (-2 * move_cost); predators at energy <= 0 die and every meal removes
+  one prey.
+
+The mean-field model assumes a predator's neighbors hold prey with the
+global density u. The pair approximation instead tracks a, the prey
+density seen by predators. After eating, a predator has its old, now
+empty cell next to it plus the eaten prey's other neighbors. After a
+move, it has the old cell plus the neighbors of an empty cell (prey
+density from pair balance u = u*u + a*v + q0*w). Stuck predators see no
+prey. Prey movement then relaxes a towards u. This captures the local
+prey depletion that makes the mean field too optimistic for predators.
+
+A population is extinct once it falls below half an agent. The outcome
+of a cell is the first extinction, or coexistence after max_steps. The
+whole (ratio, density) grid is integrated at once, one vector per unique
+(num_prey, num_predators) pair.
+
+    python mean_field.py [abm_map.npy]   # preview, optionally overlaid on an ABM map
+"""
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+import engine
+from engine import ALL_PREY_DIED, ALL_PREDATORS_DIED, COEXISTENCE
+from sweep import plan_sweep
+
+MEAN_FIELD = "mean_field"
+PAIR = "pair"
+# One-cell moves keep part of the neighborhood: of the 8 new neighbors, on
+# average SHARED were neighbors before, FRESH are new and one is the old cell
+SHARED = 3 / 8
+FRESH = 4 / 8
+PREY_MIXING = 3 / 8  # Share of prey moves that cross a neighborhood boundary
+
+
+def integrate(num_prey, num_predators, rules=engine.PHASE_DIAGRAM_RULES, method=PAIR,
+              max_energy=None, tol=1e-7):
+    """Integrate the density model for arrays of initial agent counts.
+
+    Returns (outcome, extinction_step, u, v) per element; extinction_step
+    is max_steps for coexistence, and u, v are the final densities.
+    """
+    cells = rules.grid_size ** 2
+    num_prey = np.asarray(num_prey, dtype=np.float64)
+    num_predators = np.asarray(num_predators, dtype=np.float64)
+    shape = np.broadcast(num_prey, num_predators).shape
+    # Predators placed on prey cells replace them (engine.random_placement)
+    u = np.broadcast_to(num_prey * (1 - num_predators / cells) / cells, shape).ravel().copy()
+    if max_energy is None:
+        max_energy = rules.initial_energy + 8 * rules.gain_from_food
+    v = np.zeros((max_energy + 1, u.size))  # v[e]: predators with energy e (top row lumps >= max)
+    v[min(rules.initial_energy, max_energy)] = np.broadcast_to(num_predators / cells, shape).ravel()
+    a = u.copy()  # Prey density seen by predators (pair approximation)
+    extinct = 0.5 / cells
+    outcome = np.full(u.size, COEXISTENCE, dtype=np.int8)
+    step_of = np.full(u.size, rules.max_steps, dtype=np.int64)
+    decided = np.zeros(u.size, dtype=bool)
+    gain, cost = rules.gain_from_food, rules.move_cost
+
+    for step in range(1, rules.max_steps + 1):
+        total_v = v.sum(axis=0)
+        w = np.clip(1 - u - total_v, 0, 1)
+        # Prey move, then reproduce next to themselves
+        p_empty = 1 - (1 - w) ** 8
+        if rules.prey_reproduce:
+            births = np.minimum(u * rules.prey_reproduce * p_empty, w)
+            u = u + births
+            w = w - births
+        if method == PAIR:
+            a = a + PREY_MIXING * p_empty * (u - a)  # Prey moves mix the neighborhood
+            seen = np.clip(a, 0, 1)
+        else:
+            seen = u
+        # Predators: eat, else move, else stay
+        p_eat = 1 - (1 - seen) ** 8
+        p_free = np.clip(w / np.maximum(1 - seen, 1e-12), 0, 1)  # Empty share of non-prey neighbors
+        p_move = (1 - p_eat) * (1 - (1 - p_free) ** 8)
+        p_stuck = 1 - p_eat - p_move
+        eaten = (v * p_eat).sum(axis=0)
+        new_v = np.zeros_like(v)
+        new_v[gain:] += v[:-gain] * p_eat if gain else v * p_eat
+        new_v[-1] += v[-gain:].sum(axis=0) * p_eat if gain else 0
+        if cost:
+            new_v[:-cost] += v[cost:] * p_move
+            new_v[:-2 * cost] += v[2 * cost:] * p_stuck
+        else:
+            new_v += v * (p_move + p_stuck)
+        new_v[0] = 0  # Energy <= 0: starved
+        if method == PAIR:
+            # Neighborhoods after the move (see module docstring)
+            q0 = np.clip((u - u * u - seen * total_v) / np.maximum(w, 1e-12), 0, 1)
+            depleted = np.maximum(seen - 1 / 8, 0)  # One neighbor eaten
+            a = (p_eat * (SHARED * depleted + FRESH * q0)
+                 + p_move * (SHARED * seen + FRESH * q0))
+        u = np.maximum(u - eaten, 0)
+        v = new_v
+
+        # First extinction decides the outcome
+        prey_gone = ~decided & (u < extinct)
+        predators_gone = ~decided & ~prey_gone & (v.sum(axis=0) < extinct)
+        outcome[prey_gone] = ALL_PREY_DIED
+        outcome[predators_gone] = ALL_PREDATORS_DIED
+        step_of[prey_gone | predators_gone] = step
+        decided |= prey_gone | predators_gone
+        if decided.all():
+            break
+        if step > 1 and np.abs(u - previous_u).max() < tol:
+            break  # Every undecided cell is at its fixed point
+        previous_u = u.copy()
+
+    reshape = lambda x: x.reshape(shape)
+    return reshape(outcome), reshape(step_of), reshape(u), reshape(v.sum(axis=0))
+
+
+def phase_map(ratio_values, density_values, rules=engine.PHASE_DIAGRAM_RULES, method=PAIR):
+    """Preview outcome map Z[j, i] for the sweep grid (NaN where density is 0)."""
+    plan = plan_sweep(ratio_values, density_values, rules.grid_size ** 2)
+    pairs = np.array(plan.pairs, dtype=np.float64).reshape(-1, 2)
+    outcome, _, _, _ = integrate(pairs[:, 0], pairs[:, 1], rules, method)
+    return plan.fan_out(outcome.astype(np.float64), np.full(plan.shape, np.nan))
+
+
+def main():
+    # Same grid as phase_diagram_ratio.py, so its live map can be overlaid
+    ratio_values = np.arange(0.1, 10, 0.02)
+    density_values = np.arange(0.01, 1, 0.01)
+    rules = engine.PHASE_DIAGRAM_RULES
+    extent = [ratio_values.min(), ratio_values.max(), density_values.min(), density_values.max()]
+    Z = phase_map(ratio_values, density_values, rules)
+
+    plt.figure(figsize=(10, 8))
+    if len(sys.argv) > 1:
+        # Overlay: ABM majority map (e.g. a LivePhaseMap .npy) with preview boundaries
+        abm = np.load(sys.argv[1])
+        plt.imshow(np.ma.masked_invalid(abm), extent=extent, origin='lower', aspect='auto',
+                   cmap='viridis', vmin=0, vmax=2)
+        plt.contour(ratio_values, density_values, Z, levels=[0.5, 1.5], colors='white')
+        valid = ~np.isnan(abm) & ~np.isnan(Z)
+        print(f"Preview agrees with the ABM map on {np.mean(abm[valid] == Z[valid]):.1%} of cells")
+        plt.title('ABM Phase Diagram with Pair-Approximation Boundaries')
+    else:
+        plt.imshow(np.ma.masked_invalid(Z), extent=extent, origin='lower', aspect='auto',
+                   cmap='viridis', vmin=0, vmax=2)
+        plt.title('Pair-Approximation Phase Diagram (Preview)')
+    cbar = plt.colorbar(ticks=[0, 1, 2])
+    cbar.ax.set_yticklabels(engine.OUTCOME_LABELS)
+    plt.xlabel('Ratio (Prey / Predator)')
+    plt.ylabel('Density (Agents per Grid Cell)')
+    plt.grid(False)
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,26 @@
-import random
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import Counter
 from tqdm import tqdm  # For progress bars
+import engine
+from engine import Rules
 
 # Simulation parameters
 GRID_SIZE = 20
 MAX_STEPS = 1000
 NUM_SIMULATIONS = 1000  # Number of simulations per initial condition
 
-# Agent classes
-class Prey:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
+# Update scheme: True runs the synchronous variant of the rules (every agent
+# moves at once, see synchronous.py), a different model that is much faster
+SYNCHRONOUS = False
 
-class Predator:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.energy = 5
+# Model rules (the update rules themselves live in engine.py)
+RULES = Rules(grid_size=GRID_SIZE, max_steps=MAX_STEPS, initial_energy=5,
+              gain_from_food=5, move_cost=1, synchronous=SYNCHRONOUS)
 
 def run_simulation(initial_prey, initial_predators):
-    grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    prey_list = []
-    predator_list = []
-    step_count = 0
-
-    # Initialize prey
-    for _ in range(initial_prey):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None:
-                prey = Prey(x, y)
-                grid[y][x] = prey
-                prey_list.append(prey)
-                break
-
-    # Initialize predators
-    for _ in range(initial_predators):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None or isinstance(grid[y][x], Prey):
-                predator = Predator(x, y)
-                grid[y][x] = predator
-                predator_list.append(predator)
-                break
-
-    while step_count < MAX_STEPS and prey_list and predator_list:
-        step_count += 1
-        move_prey(grid, prey_list)
-        move_predators(grid, prey_list, predator_list)
-
-    # Determine the outcome
-    if not prey_list:
-        return 0  # All Prey Died
-    elif not predator_list:
-        return 1  # All Predators Died
-    else:
-        return 2  # Coexistence
-
-def move_prey(grid, prey_list):
-    for prey in prey_list[:]:
-        x, y = prey.x, prey.y
-        neighbors = get_neighbors(x, y)
-        random.shuffle(neighbors)
-        for nx, ny in neighbors:
-            if grid[ny][nx] is None:
-                grid[y][x] = None
-                prey.x, prey.y = nx, ny
-                grid[ny][nx] = prey
-                break
-
-def move_predators(grid, prey_list, predator_list):
-    random.shuffle(predator_list)
-    for predator in predator_list[:]:
-        x, y = predator.x, predator.y
-        neighbors = get_neighbors(x, y)
-        prey_neighbors = []
-        empty_neighbors = []
-        for nx, ny in neighbors:
-            if isinstance(grid[ny][nx], Prey):
-                prey_neighbors.append((nx, ny))
-            elif grid[ny][nx] is None:
-                empty_neighbors.append((nx, ny))
-        moved = False
-        if prey_neighbors:
-            nx, ny = random.choice(prey_neighbors)
-            grid[y][x] = None
-            prey = grid[ny][nx]
-            prey_list.remove(prey)
-            grid[ny][nx] = predator
-            predator.x, predator.y = nx, ny
-            predator.energy += 5
-            moved = True
-        elif empty_neighbors:
-            nx, ny = random.choice(empty_neighbors)
-            if grid[ny][nx] is None:
-                grid[y][x] = None
-                grid[ny][nx] = predator
-                predator.x, predator.y = nx, ny
-                predator.energy -= 1
-                moved = True
-        else:
-            predator.energy -= 1
-        if not moved:
-            predator.energy -= 1
-        if predator.energy <= 0:
-            grid[predator.y][predator.x] = None
-            predator_list.remove(predator)
-
-def get_neighbors(x, y):
-    neighbors = []
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx == 0 and dy == 0:
-                continue
-            nx = (x + dx) % GRID_SIZE
-            ny = (y + dy) % GRID_SIZE
-            neighbors.append((nx, ny))
-    return neighbors
+    # 0: All Prey Died, 1: All Predators Died, 2: Coexistence
+    return engine.run_simulation((initial_prey, initial_predators), RULES)
 
 # Define the range of initial prey and predator populations
 prey_range = np.arange(10, 101, 10)
@@ -1,15 +1,40 @@
-import random
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import Counter
-from tqdm import tqdm  # For progress bars
-import multiprocessing as mp  # For parallel processing
+from sweep import (plan_sweep, LivePhaseMap, stream_sweep, batch_sweep, CommonRandomNumbers,
+                   ExtinctionTimes)
+import engine
+from engine import Rules
+from spatial import SpatialAccumulator
+from warm_pool import get_pool, Simulator
+from backends import dispatch_sweep, save_metadata, BatchSimulator, AUTO, REFERENCE
 
 # Simulation parameters
 GRID_SIZE = 20
 MAX_STEPS = 300
 NUM_SIMULATIONS = 50  # Reduced to manage computational load
 
+# Live output: memory-mapped .npy files and a PNG preview refreshed while running
+LIVE_MAP_PATH = f"plots2/ratio_density_{NUM_SIMULATIONS}_with_reproduction_live"
+LIVE_REFRESH_SECONDS = 60  # Minimum seconds between preview refreshes
+
+# Extinction times: per-cell histograms of the step each run ended at, and
+# Kaplan-Meier survival curves exported to <LIVE_MAP_PATH>_survival.npz
+EXTINCTION_BINS = 50
+
+# Spatial statistics (prey cluster sizes, prey-predator pair correlation)
+# sampled every SPATIAL_INTERVAL steps, saved to <LIVE_MAP_PATH>_spatial.npz
+SPATIAL_INTERVAL = 50  # 0 disables sampling
+
+# Common random numbers: replicate r of every cell shares one RNG stream, so
+# neighboring cells are positively correlated and the boundary is less noisy
+COMMON_RANDOM_NUMBERS = False
+CRN_SEED = None  # Fixed seed for a reproducible CRN sweep (None: fresh entropy)
+
+# Simulation engine: AUTO picks the faster of "reference" and "bitboard" per pair
+# from whole-batch timings under these rules (see backends.py); common random numbers
+# need the reference engine. The choices are saved to <LIVE_MAP_PATH>_meta.json
+BACKEND = AUTO
+
 # Reproduction probabilities
 SHEEP_REPRODUCE = 0.15  # Probability of sheep reproducing each step
 
@@ -18,130 +43,33 @@ WOLF_GAIN_FROM_FOOD = 5  # Energy gained by wolves from eating prey
 WOLF_INITIAL_ENERGY = 10  # Initial energy for wolves
 WOLF_MOVE_COST = 1        # Energy cost per move for wolves
 
-# Agent classes
-class Prey:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        # Sheep do not have energy in this model
-
-class Predator:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.energy = WOLF_INITIAL_ENERGY  # Initial energy
-
-def run_simulation(args):
-    num_prey, num_predators = args
-    grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    prey_list = []
-    predator_list = []
-    step_count = 0
-
-    # Initialize prey
-    for _ in range(num_prey):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None:
-                prey = Prey(x, y)
-                grid[y][x] = prey
-                prey_list.append(prey)
-                break
-
-    # Initialize predators
-    for _ in range(num_predators):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None or isinstance(grid[y][x], Prey):
-                predator = Predator(x, y)
-                grid[y][x] = predator
-                predator_list.append(predator)
-                break
-
-    while step_count < MAX_STEPS and prey_list and predator_list:
-        step_count += 1
-        move_prey(grid, prey_list)
-        move_predators(grid, prey_list, predator_list)
-
-    # Determine the outcome
-    if not prey_list:
-        return 0  # All Prey Died
-    elif not predator_list:
-        return 2  # All Predators Died
-    else:
-        return 1  # Coexistence
-
-def move_prey(grid, prey_list):
-    for prey in prey_list[:]:
-        x, y = prey.x, prey.y
-        neighbors = get_neighbors(x, y)
-        random.shuffle(neighbors)
-        moved = False
-        for nx, ny in neighbors:
-            if grid[ny][nx] is None:
-                grid[y][x] = None
-                prey.x, prey.y = nx, ny
-                grid[ny][nx] = prey
-                moved = True
-                break
-        # Reproduction logic for prey
-        if random.random() < SHEEP_REPRODUCE:
-            # Reproduce
-            random.shuffle(neighbors)
-            for nx, ny in neighbors:
-                if grid[ny][nx] is None:
-                    new_prey = Prey(nx, ny)
-                    prey_list.append(new_prey)
-                    grid[ny][nx] = new_prey
-                    break
-
-def move_predators(grid, prey_list, predator_list):
-    random.shuffle(predator_list)
-    for predator in predator_list[:]:
-        x, y = predator.x, predator.y
-        neighbors = get_neighbors(x, y)
-        prey_neighbors = []
-        empty_neighbors = []
-        for nx, ny in neighbors:
-            if isinstance(grid[ny][nx], Prey):
-                prey_neighbors.append((nx, ny))
-            elif grid[ny][nx] is None:
-                empty_neighbors.append((nx, ny))
-        moved = False
-        if prey_neighbors:
-            nx, ny = random.choice(prey_neighbors)
-            grid[y][x] = None
-            prey = grid[ny][nx]
-            prey_list.remove(prey)
-            grid[ny][nx] = predator
-            predator.x, predator.y = nx, ny
-            predator.energy += WOLF_GAIN_FROM_FOOD
-            moved = True
-        elif empty_neighbors:
-            nx, ny = random.choice(empty_neighbors)
-            grid[y][x] = None
-            grid[ny][nx] = predator
-            predator.x, predator.y = nx, ny
-            predator.energy -= WOLF_MOVE_COST
-            moved = True
-        else:
-            predator.energy -= WOLF_MOVE_COST
-        if not moved:
-            predator.energy -= WOLF_MOVE_COST
-        if predator.energy <= 0:
-            grid[predator.y][predator.x] = None
-            predator_list.remove(predator)
-
-def get_neighbors(x, y):
-    neighbors = []
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx == 0 and dy == 0:
-                continue
-            nx = (x + dx) % GRID_SIZE
-            ny = (y + dy) % GRID_SIZE
-            neighbors.append((nx, ny))
-    return neighbors
+# Grass layer: sheep must eat grass, which regrows GRASS_REGROWTH steps after
+# being eaten (0: no grass, sheep need no food). Not run by the bitboard engine
+GRASS_REGROWTH = 0
+SHEEP_INITIAL_ENERGY = 4  # Initial energy for sheep
+SHEEP_GAIN_FROM_FOOD = 4  # Energy gained by sheep from eating grass
+SHEEP_MOVE_COST = 1       # Energy cost per move for sheep
+
+# Update scheme: True runs the synchronous variant of the rules (every agent
+# moves at once, see synchronous.py), a different model that is much faster
+SYNCHRONOUS = False
+
+# Model rules (the update rules themselves live in engine.py)
+RULES = Rules(grid_size=GRID_SIZE, max_steps=MAX_STEPS, initial_energy=WOLF_INITIAL_ENERGY,
+              gain_from_food=WOLF_GAIN_FROM_FOOD, move_cost=WOLF_MOVE_COST,
+              prey_reproduce=SHEEP_REPRODUCE, synchronous=SYNCHRONOUS,
+              grass_regrowth=GRASS_REGROWTH, prey_initial_energy=SHEEP_INITIAL_ENERGY,
+              prey_gain_from_food=SHEEP_GAIN_FROM_FOOD, prey_move_cost=SHEEP_MOVE_COST)
+
+# Outcome codes of these plots: 0: All Prey Died, 1: Coexistence, 2: All Predators Died
+OUTCOME_CODES = {engine.ALL_PREY_DIED: 0, engine.COEXISTENCE: 1, engine.ALL_PREDATORS_DIED: 2}
+
+# (outcome code, step the run ended at[, spatial summary]) of one run; a picklable
+# object rather than a function, so the warm pool's workers can run it
+run_simulation = Simulator(RULES, COMMON_RANDOM_NUMBERS, timed=True,
+                           spatial_interval=SPATIAL_INTERVAL, outcome_codes=OUTCOME_CODES)
+# Up to dispatch.batch_size replicates of one pair per call, on a chosen engine
+run_batch = BatchSimulator(RULES, SPATIAL_INTERVAL, OUTCOME_CODES)
 
 # Define the ranges for ratio and density
 ratio_values = np.arange(0.1, 10, 0.02)  # Adjusted for computational efficiency
@@ -155,61 +83,42 @@ total_conditions = len(ratio_values) * len(density_values)
 # Calculate total grid cells
 total_grid_cells = GRID_SIZE * GRID_SIZE
 
-# Prepare arguments for parallel processing
-simulation_args = []
-positions = []
-
-for i, ratio in enumerate(ratio_values):
-    for j, density in enumerate(density_values):
-        # Skip simulations where density is 0 (no agents)
-        if density == 0:
-            Z[j, i] = np.nan  # Mark as invalid
-            continue
-
-        # Calculate total number of agents
-        N = int(density * total_grid_cells)
-        if N < 2:
-            N = 2  # Ensure at least one prey and one predator
-
-        num_prey = int((ratio / (ratio + 1)) * N)
-        num_predators = N - num_prey
-
-        # Ensure at least one prey and one predator
-        if num_prey == 0:
-            num_prey = 1
-            num_predators = N - 1
-        if num_predators == 0:
-            num_predators = 1
-            num_prey = N - 1
-
-        # Prepare arguments for simulations
-        for _ in range(NUM_SIMULATIONS):
-            simulation_args.append((num_prey, num_predators))
-            positions.append((j, i))  # To map results back to Z
-
-# Run simulations in parallel
-def worker(args):
-    num_prey, num_predators = args
-    outcome = run_simulation((num_prey, num_predators))
-    return outcome
-
-with mp.Pool() as pool:
-    # Use tqdm with map for progress bar
-    results = list(tqdm(pool.imap(worker, simulation_args), total=len(simulation_args), desc="Running simulations"))
-
-# Aggregate results
-outcomes_dict = {}
-for idx, outcome in enumerate(results):
-    position = positions[idx]
-    if position not in outcomes_dict:
-        outcomes_dict[position] = []
-    outcomes_dict[position].append(outcome)
-
-# Determine the most common outcome for each initial condition
-for position, outcomes in outcomes_dict.items():
-    most_common_outcome = Counter(outcomes).most_common(1)[0][0]
-    j, i = position
-    Z[j, i] = most_common_outcome
+# Collapse cells that share the same integer agent counts so that each
+# unique (num_prey, num_predators) pair is simulated only once
+plan = plan_sweep(ratio_values, density_values, total_grid_cells)
+print(plan.report(NUM_SIMULATIONS))
+
+# Partial phase map that is refreshed on disk while the sweep runs
+live_map = LivePhaseMap(plan, ratio_values, density_values,
+                        ['All Prey Died', 'Coexistence', 'All Predators Died'],
+                        path=LIVE_MAP_PATH, refresh_interval=LIVE_REFRESH_SECONDS)
+
+# Extinction-time histograms, same fixed size as the live map's counts
+extinction = ExtinctionTimes(plan, MAX_STEPS, len(live_map.labels), OUTCOME_CODES[engine.COEXISTENCE],
+                             EXTINCTION_BINS, path=f"{LIVE_MAP_PATH}_extinction")
+spatial = SpatialAccumulator(plan, GRID_SIZE) if SPATIAL_INTERVAL else None
+
+# Run simulations in parallel, consuming outcomes as they complete
+crn = CommonRandomNumbers(plan, NUM_SIMULATIONS, CRN_SEED) if COMMON_RANDOM_NUMBERS else None
+if COMMON_RANDOM_NUMBERS:
+    dispatch = dispatch_sweep(RULES, plan, NUM_SIMULATIONS, REFERENCE,
+                              reason="common random numbers")
+else:
+    dispatch = dispatch_sweep(RULES, plan, NUM_SIMULATIONS, BACKEND)
+save_metadata(f"{LIVE_MAP_PATH}_meta.json", RULES, NUM_SIMULATIONS, dispatch)
+print(f"Engines: {dispatch.metadata['pairs_per_backend']}")
+pool = get_pool()  # Kept warm for later sweeps in this interpreter (see warm_pool.py)
+if COMMON_RANDOM_NUMBERS:
+    Z = stream_sweep(pool, run_simulation, plan, NUM_SIMULATIONS, live_map, crn=crn,
+                     extinction=extinction, spatial=spatial)
+else:
+    Z = batch_sweep(pool, run_batch, plan, NUM_SIMULATIONS, live_map, dispatch.backends,
+                    dispatch.batch_size, extinction=extinction, spatial=spatial)
+extinction.export_survival(f"{LIVE_MAP_PATH}_survival")
+if spatial is not None:
+    spatial.save(f"{LIVE_MAP_PATH}_spatial")
+if crn is not None:
+    print(crn.report(len(live_map.labels)))
 
 # Create a smooth plot using imshow
 plt.figure(figsize=(10, 8))
@@ -1,4 +1,3 @@
-import random
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import Counter
@@ -6,6 +5,8 @@ from tqdm import tqdm  # For progress bars
 import multiprocessing as mp  # For parallel processing
 import os  # For checking file existence
 import pickle  # For saving and loading data
+import engine
+from engine import Rules
 
 # Simulation parameters
 GRID_SIZE = 20
@@ -20,130 +21,35 @@ WOLF_GAIN_FROM_FOOD = 5  # Energy gained by wolves from eating prey
 WOLF_INITIAL_ENERGY = 10  # Initial energy for wolves
 WOLF_MOVE_COST = 1        # Energy cost per move for wolves
 
-# Agent classes
-class Prey:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        # Sheep do not have energy in this model
-
-class Predator:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.energy = WOLF_INITIAL_ENERGY  # Initial energy
-
-def run_simulation(args):
-    num_prey, num_predators = args
-    grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    prey_list = []
-    predator_list = []
-    step_count = 0
-
-    # Initialize prey
-    for _ in range(num_prey):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None:
-                prey = Prey(x, y)
-                grid[y][x] = prey
-                prey_list.append(prey)
-                break
-
-    # Initialize predators
-    for _ in range(num_predators):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] is None or isinstance(grid[y][x], Prey):
-                predator = Predator(x, y)
-                grid[y][x] = predator
-                predator_list.append(predator)
-                break
-
-    while step_count < MAX_STEPS and prey_list and predator_list:
-        step_count += 1
-        move_prey(grid, prey_list)
-        move_predators(grid, prey_list, predator_list)
-
-    # Determine the outcome
-    if not prey_list:
-        return 0  # All Prey Died
-    elif not predator_list:
-        return 2  # All Predators Died
-    else:
-        return 1  # Coexistence
-
-def move_prey(grid, prey_list):
-    for prey in prey_list[:]:
-        x, y = prey.x, prey.y
-        neighbors = get_neighbors(x, y)
-        random.shuffle(neighbors)
-        moved = False
-        for nx, ny in neighbors:
-            if grid[ny][nx] is None:
-                grid[y][x] = None
-                prey.x, prey.y = nx, ny
-                grid[ny][nx] = prey
-                moved = True
-                break
-        # Reproduction logic for prey
-        if random.random() < SHEEP_REPRODUCE:
-            # Reproduce
-            random.shuffle(neighbors)
-            for nx, ny in neighbors:
-                if grid[ny][nx] is None:
-                    new_prey = Prey(nx, ny)
-                    prey_list.append(new_prey)
-                    grid[ny][nx] = new_prey
-                    break
-
-def move_predators(grid, prey_list, predator_list):
-    random.shuffle(predator_list)
-    for predator in predator_list[:]:
-        x, y = predator.x, predator.y
-        neighbors = get_neighbors(x, y)
-        prey_neighbors = []
-        empty_neighbors = []
-        for nx, ny in neighbors:
-            if isinstance(grid[ny][nx], Prey):
-                prey_neighbors.append((nx, ny))
-            elif grid[ny][nx] is None:
-                empty_neighbors.append((nx, ny))
-        moved = False
-        if prey_neighbors:
-            nx, ny = random.choice(prey_neighbors)
-            grid[y][x] = None
-            prey = grid[ny][nx]
-            prey_list.remove(prey)
-            grid[ny][nx] = predator
-            predator.x, predator.y = nx, ny
-            predator.energy += WOLF_GAIN_FROM_FOOD
-            moved = True
-        elif empty_neighbors:
-            nx, ny = random.choice(empty_neighbors)
-            grid[y][x] = None
-            grid[ny][nx] = predator
-            predator.x, predator.y = nx, ny
-            predator.energy -= WOLF_MOVE_COST
-            moved = True
-        else:
-            predator.energy -= WOLF_MOVE_COST
-        if not moved:
-            predator.energy -= WOLF_MOVE_COST
-        if predator.energy <= 0:
-            grid[predator.y][predator.x] = None
-            predator_list.remove(predator)
-
-def get_neighbors(x, y):
-    neighbors = []
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx == 0 and dy == 0:
-                continue
-            nx = (x + dx) % GRID_SIZE
-            ny = (y + dy) % GRID_SIZE
-            neighbors.append((nx, ny))
-    return neighbors
+# Grass layer: sheep must eat grass, which regrows GRASS_REGROWTH steps after
+# being eaten (0: no grass, sheep need no food). Not run by the bitboard engine
+GRASS_REGROWTH = 0
+SHEEP_INITIAL_ENERGY = 4  # Initial energy for sheep
+SHEEP_GAIN_FROM_FOOD = 4  # Energy gained by sheep from eating grass
+SHEEP_MOVE_COST = 1       # Energy cost per move for sheep
+
+# Update scheme: True runs the synchronous variant of the rules (every agent
+# moves at once, see synchronous.py), a different model that is much faster
+SYNCHRONOUS = False
+
+# Model rules (the update rules themselves live in engine.py)
+RULES = Rules(grid_size=GRID_SIZE, max_steps=MAX_STEPS, initial_energy=WOLF_INITIAL_ENERGY,
+              gain_from_food=WOLF_GAIN_FROM_FOOD, move_cost=WOLF_MOVE_COST,
+              prey_reproduce=SHEEP_REPRODUCE, synchronous=SYNCHRONOUS,
+              grass_regrowth=GRASS_REGROWTH, prey_initial_energy=SHEEP_INITIAL_ENERGY,
+              prey_gain_from_food=SHEEP_GAIN_FROM_FOOD, prey_move_cost=SHEEP_MOVE_COST)
+
+# Mid-run snapshots: every in-flight run is saved every SNAPSHOT_EVERY steps,
+# so a killed sweep restarts each interrupted run from where it stopped
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_EVERY = 100
+
+# Outcome codes of these plots: 0: All Prey Died, 1: Coexistence, 2: All Predators Died
+OUTCOME_CODES = {engine.ALL_PREY_DIED: 0, engine.COEXISTENCE: 1, engine.ALL_PREDATORS_DIED: 2}
+
+def run_simulation(args, snapshot_path=None):
+    return OUTCOME_CODES[engine.run_simulation_resumable(args, RULES, path=snapshot_path,
+                                                         snapshot_every=SNAPSHOT_EVERY)]
 
 # Define the ranges for ratio and density
 ratio_values = np.arange(0.1, 10, 0.02)  # Adjusted for computational efficiency
@@ -199,17 +105,20 @@ for i, ratio in enumerate(ratio_values):
         if simulations_remaining <= 0:
             continue  # Skip if we have already done enough simulations
 
-        for _ in range(simulations_remaining):
-            simulation_args.append((num_prey, num_predators))
+        for r in range(simulations_done, NUM_SIMULATIONS):
+            # Replicate r of this cell keeps its snapshot file across restarts
+            snapshot_path = os.path.join(SNAPSHOT_DIR, f"{j}_{i}_{r}.npz")
+            simulation_args.append(((num_prey, num_predators), snapshot_path))
             positions.append(position)  # To map results back to Z
 
 # Run simulations in parallel
 def worker(args):
-    num_prey, num_predators = args
-    outcome = run_simulation((num_prey, num_predators))
+    (num_prey, num_predators), snapshot_path = args
+    outcome = run_simulation((num_prey, num_predators), snapshot_path)
     return outcome
 
 if simulation_args:  # Only proceed if there are simulations to run
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
     with mp.Pool() as pool:
         # Use tqdm with map for progress bar
         results = list(tqdm(pool.imap(worker, simulation_args), total=len(simulation_args), desc="Running simulations"))
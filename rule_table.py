@@ -0,0 +1,293 @@
+"""Multi-species engine whose species and rules are declared in a table.
+
+A RuleTable lists Species in update order. Each species declares what it
+eats, its energy budget, whether it moves and how often it reproduces.
+compile_table() turns the table into integer state codes (0 is empty, then
+1, 2, ... in table order) and lookup arrays indexed by code: who eats whom,
+energy gain and cost, mortality, mobility and reproduction. TableBatch
+steps a batch of replicates with the synchronous kernels of
+synchronous.py, reading every rule from those arrays. A step runs one
+phase per species, in table order:
+
+1. Species that move pick a random neighbor holding something they eat if
+   there is one, otherwise a random empty neighbor, as seen at the start
+   of the phase. Conflicts over a cell are resolved by random priority.
+   Winners eat (+gain_from_food) or move (-move_cost). Agents that lose a
+   conflict or have no free neighbor stay and pay 2 * move_cost. Species
+   with initial_energy > 0 die at energy <= 0; the others never starve.
+2. Survivors reproduce with probability ``reproduce`` into a random empty
+   neighbor of the cell they started the phase in. Species with energy
+   breed only with at least 2 energy, and offspring take half of it.
+
+The cost of a phase is a few array operations over the grid and the agents
+of its species, so a step costs about the same per agent whatever the
+table. The two-species table of a Rules, two_species(rules), gives exactly
+the runs of synchronous.SynchronousBatch.
+
+A run ends when a species dies out or at max_steps. Its outcome is the
+index of the species that died out (the lowest if several did at once), or
+len(species) for coexistence; for two_species() these are engine's outcome
+codes. Sweeps vary the counts of the two ``swept`` species along their
+ratio and density axes and place every other species at its ``density``.
+
+    python rule_table.py [num_replicates]   # time the built-in tables
+"""
+import functools
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+import engine
+from bitboard import EMPTY
+from synchronous import SynchronousBatch
+
+
+class Species(NamedTuple):
+    name: str
+    eats: tuple = ()  # Names of the species it eats
+    initial_energy: int = 0  # 0: no energy budget, the species never starves
+    gain_from_food: int = 0  # Energy gained per meal
+    move_cost: int = 0  # Energy cost per move
+    reproduce: float = 0.0  # Probability of reproducing each step
+    moves: bool = True
+    density: float = 0.0  # Initial fraction of cells, for species that are not swept
+
+
+class RuleTable(NamedTuple):
+    species: tuple  # Species in update order
+    grid_size: int = 20
+    max_steps: int = 300
+    swept: tuple = (0, 1)  # Species whose counts are a sweep's (num_prey, num_predators)
+
+
+class CompiledTable(NamedTuple):
+    """Lookup arrays of a RuleTable, indexed by state code (EMPTY is code 0)."""
+    eats: np.ndarray  # eats[a, b]: species code a eats code b
+    gain: np.ndarray
+    move_cost: np.ndarray
+    initial_energy: np.ndarray
+    mortal: np.ndarray
+    moves: np.ndarray
+    reproduce: np.ndarray
+
+
+def two_species(rules):
+    """The prey-predator model of rules as a table (no grass layer)."""
+    if rules.grass_regrowth:
+        raise ValueError("two_species() has no grass layer")
+    prey = Species('Prey', reproduce=rules.prey_reproduce)
+    predators = Species('Predators', eats=('Prey',), initial_energy=rules.initial_energy,
+                        gain_from_food=rules.gain_from_food, move_cost=rules.move_cost)
+    return RuleTable((prey, predators), rules.grid_size, rules.max_steps)
+
+
+# Built-in tables, by the name sweep_controller.py job specs use
+FOOD_CHAIN = RuleTable((
+    Species('Grass', reproduce=0.5, moves=False, density=0.4),
+    Species('Sheep', eats=('Grass',), initial_energy=4, gain_from_food=4, move_cost=1,
+            reproduce=0.15),
+    Species('Wolves', eats=('Sheep',), initial_energy=10, gain_from_food=5, move_cost=1,
+            reproduce=0.05),
+), swept=(1, 2))
+COMPETING_PREDATORS = RuleTable((
+    Species('Rabbits', reproduce=0.15),
+    Species('Foxes', eats=('Rabbits',), initial_energy=10, gain_from_food=5, move_cost=1),
+    Species('Wolves', eats=('Rabbits',), initial_energy=15, gain_from_food=4, move_cost=1,
+            density=0.02),
+))
+TABLES = {'food_chain': FOOD_CHAIN, 'competing_predators': COMPETING_PREDATORS}
+
+
+@functools.lru_cache(maxsize=None)
+def compile_table(table):
+    """Integer state codes and lookup arrays of table (cached per table)."""
+    names = [s.name for s in table.species]
+    if not names or len(set(names)) != len(names) or len(names) > 126:
+        raise ValueError("a rule table needs 1 to 126 species with distinct names")
+    if len(set(table.swept)) != 2 or not all(0 <= i < len(names) for i in table.swept):
+        raise ValueError(f"swept must name two species of {names}")
+    n = len(names) + 1
+    eats = np.zeros((n, n), dtype=bool)
+    for code, species in enumerate(table.species, 1):
+        for food in species.eats:
+            if food not in names:
+                raise ValueError(f"{species.name} eats unknown species {food!r}")
+            eats[code, names.index(food) + 1] = True
+
+    def column(field, dtype):
+        return np.array([0] + [getattr(s, field) for s in table.species], dtype=dtype)
+
+    initial_energy = column('initial_energy', np.int64)
+    return CompiledTable(eats, column('gain_from_food', np.int64), column('move_cost', np.int64),
+                         initial_energy, initial_energy > 0, column('moves', bool),
+                         column('reproduce', np.float64))
+
+
+def outcome_labels(table):
+    return [f"All {s.name} Died" for s in table.species] + ['Coexistence']
+
+
+def initial_counts(table, pair):
+    """Initial count per species: pair for the swept species, density for the others."""
+    cells = table.grid_size ** 2
+    counts = [int(round(s.density * cells)) for s in table.species]
+    for i, count in zip(table.swept, pair):
+        counts[i] = count
+    return counts
+
+
+def as_dict(rules):
+    """JSON-ready description of a RuleTable or an engine.Rules."""
+    description = rules._asdict()
+    if isinstance(rules, RuleTable):
+        description['species'] = [s._asdict() for s in rules.species]
+    return description
+
+
+def from_dict(description):
+    """The RuleTable described by as_dict()."""
+    species = tuple(Species(**{**s, 'eats': tuple(s['eats'])}) for s in description['species'])
+    return RuleTable(species, description['grid_size'], description['max_steps'],
+                     tuple(description['swept']))
+
+
+class TableBatch(SynchronousBatch):
+    """A batch of independent runs of a RuleTable, with SynchronousBatch's interface.
+
+    ``counts`` holds one initial count per species, each a scalar or one
+    value per replicate (see initial_counts()).
+    """
+
+    def __init__(self, counts, table=FOOD_CHAIN, rng=None, num_replicates=None):
+        self.rules = table
+        self.compiled = compile_table(table)
+        self.rng = np.random.default_rng(rng)
+        G = self.G = table.grid_size
+        counts = [np.asarray(c, dtype=np.int64) for c in counts]
+        if len(counts) != len(table.species):
+            raise ValueError(f"need {len(table.species)} initial counts, got {len(counts)}")
+        if num_replicates is None:
+            num_replicates = int(np.broadcast(*counts).size)
+        counts = [np.broadcast_to(c, (num_replicates,)) for c in counts]
+        cells = G * G
+        if any((c > cells).any() or (c < 0).any() for c in counts):
+            raise ValueError(f"agent counts must be between 0 and {cells}")
+
+        # Prefixes of one random permutation of the cells per species, placed in
+        # table order; a later species replaces an earlier one on the same cell
+        R = num_replicates
+        rank = np.arange(cells)
+        perms = [np.argsort(self.rng.random((R, cells)), axis=1) for _ in counts]
+        self.cells = np.zeros((R, cells), dtype=np.int8)
+        for code, (perm, count) in enumerate(zip(perms, counts), 1):
+            placed = np.zeros((R, cells), dtype=bool)
+            np.put_along_axis(placed, perm, rank < count[:, None], axis=1)
+            self.cells[placed] = code
+        self.energy = self.compiled.initial_energy[self.cells]
+
+        self.step_count = np.zeros(R, dtype=np.int64)
+        self.done = np.zeros(R, dtype=bool)
+        self._count()
+
+    def _count(self):
+        # counts[r, i]: agents of species i (code i + 1) in replicate r
+        self.counts = np.stack([(self.cells == code).sum(axis=1)
+                                for code in range(1, len(self.rules.species) + 1)], axis=1)
+        self.done |= (self.step_count >= self.rules.max_steps) | (self.counts == 0).any(axis=1)
+
+    def step(self):
+        """Advance every unfinished replicate by one step, one phase per species."""
+        if self.done.all():
+            return
+        table = self.compiled
+        running = np.flatnonzero(~self.done)
+        cells, energy = self.cells[running], self.energy[running]
+        flat_cells, flat_energy = cells.reshape(-1), energy.reshape(-1)
+
+        for code in range(1, len(self.rules.species) + 1):
+            agents = np.flatnonzero(cells == code)
+            positions, gained = agents, flat_energy[agents]
+            if table.moves[code]:
+                # Food first, else an empty cell, as seen at the start of the phase
+                empty = self._neighbor_masks(cells, EMPTY)[agents]
+                food = self._masks_of(table.eats[code][cells])[agents] \
+                    if table.eats[code].any() else np.zeros_like(empty)
+                eats = food > 0
+                targets = self._pick(agents, np.where(eats, food, empty))
+                wins = self._resolve(targets, flat_cells.size)
+                cost = table.move_cost[code]
+                gained = gained + np.where(
+                    wins, np.where(eats, table.gain[code], -cost), -2 * cost)
+                flat_cells[agents[wins]] = EMPTY
+                flat_energy[agents[wins]] = 0
+                positions = np.where(wins, targets, agents)
+            alive = gained > 0 if table.mortal[code] else np.ones(len(agents), dtype=bool)
+            # Parents with energy need enough to give a newborn at least 1
+            fertile = gained >= 2 if table.mortal[code] else alive
+            flat_cells[positions] = np.where(alive, code, EMPTY)
+            flat_energy[positions] = np.where(alive, gained, 0)
+
+            if table.reproduce[code]:
+                # Offspring go to an empty neighbor of the cell the parent started in
+                breeds = np.flatnonzero((self.rng.random(len(agents)) < table.reproduce[code])
+                                        & fertile)
+                targets = self._pick(agents[breeds],
+                                     self._neighbor_masks(cells, EMPTY)[agents[breeds]])
+                born = self._resolve(targets, flat_cells.size)
+                flat_cells[targets[born]] = code
+                if table.mortal[code]:  # The offspring takes half the parent's energy
+                    parents = positions[breeds[born]]
+                    flat_energy[targets[born]] = flat_energy[parents] // 2
+                    flat_energy[parents] -= flat_energy[targets[born]]
+
+        self.cells[running], self.energy[running] = cells, energy
+        self.step_count[running] += 1
+        self._count()
+
+    def outcomes(self):
+        extinct = self.counts == 0
+        return np.where(extinct.any(axis=1), extinct.argmax(axis=1), len(self.rules.species))
+
+    def save_snapshot(self, path):
+        """Write the batch state to path with engine.write_snapshot."""
+        arrays = {name: value for name, value in vars(self).items()
+                  if isinstance(value, np.ndarray) and name != 'counts'}
+        engine.write_snapshot(path, {'table': as_dict(self.rules)}, self.rng, **arrays)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Rebuild a batch saved with save_snapshot; it continues bit for bit."""
+        meta, rng, arrays = engine.read_snapshot(path)
+        batch = cls.__new__(cls)
+        batch.__dict__.update(arrays)
+        batch.rules = from_dict(meta['table'])
+        batch.compiled = compile_table(batch.rules)
+        batch.rng = rng
+        batch.G = batch.rules.grid_size
+        batch._count()
+        return batch
+
+
+def main():
+    """Time a step of each built-in table against the two-species model."""
+    num_replicates = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    tables = {'two_species': two_species(engine.REPRODUCTION_RULES), **TABLES}
+    print(f"{num_replicates} replicates, 20% of cells per swept species")
+    for name, table in tables.items():
+        cells = table.grid_size ** 2
+        batch = TableBatch(initial_counts(table, (cells // 5, cells // 5)), table, 0,
+                           num_replicates)
+        agent_steps, seconds = 0, 0.0
+        while not batch.done.all():
+            agent_steps += batch.counts[~batch.done].sum()
+            start = time.perf_counter()
+            batch.step()
+            seconds += time.perf_counter() - start
+        outcomes = np.bincount(batch.outcomes(), minlength=len(table.species) + 1)
+        print(f"  {name:>20}: {seconds / batch.step_count.sum() * 1e6:7.1f} us per "
+              f"replicate-step, about {seconds / agent_steps * 1e9:6.0f} ns per "
+              f"agent-step; outcomes {dict(zip(outcome_labels(table), outcomes.tolist()))}")
+
+
+if __name__ == "__main__":
+    main()
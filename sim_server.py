@@ -0,0 +1,476 @@
+"""Local HTTP/WebSocket server streaming simulation sessions to remote viewers.
+
+The pygame window needs a display; this server does not. Every WebSocket
+connection to /ws gets its own session of the reference engine, stepped at
+the requested speed. Open http://localhost:8766/ in a browser for a
+minimal canvas viewer, or script the protocol (``python sim_server.py client``).
+
+Server to client, binary messages (little-endian):
+
+    KEYFRAME  <B I H H H>  0, step, num_prey, num_predators, grid_size,
+              then grid_size**2 uint8 cell codes (EMPTY, PREY, PREDATOR), row-major
+    DELTA     <B I H H H>  1, step, num_prey, num_predators, num_changed,
+              then num_changed uint16 cell indices and num_changed uint8 new codes
+
+A delta carries only the cells that changed since the previous frame: 11
+bytes plus 3 per changed cell. Text messages are JSON events:
+{"event": "params", ...} after every accepted change, {"event": "done",
+"outcome": ...} when the run ends, and {"error": ...}.
+
+Client to server, JSON text messages (keys may be combined):
+
+    {"num_prey": 50, "num_predators": 20, "seed": 1}   restart with these counts
+    {"rules": {"gain_from_food": 3}}   live for LIVE_RULES fields, otherwise restart
+    {"speed": 30}                      steps per second
+    {"command": "pause" | "resume" | "restart" | "keyframe"}
+
+The WebSocket framing (RFC 6455) is implemented on asyncio streams, so the
+server needs nothing beyond the standard library and the engine.
+
+    python sim_server.py [port]            # serve on localhost
+    python sim_server.py client [port]     # scripted client against a running server
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+import time
+import numpy as np
+import engine
+from spatial import PREY, PREDATOR, occupancy
+
+HOST = "127.0.0.1"  # Local only: sessions are not authenticated
+PORT = 8766  # The sweep controller defaults to 8765
+DEFAULT_SPEED = 10  # Steps per second
+MAX_SPEED = 1000
+LIVE_RULES = {'gain_from_food', 'move_cost', 'prey_reproduce', 'max_steps'}  # Changeable mid-run
+
+# Binary message types and header
+KEYFRAME = 0
+DELTA = 1
+HEADER = struct.Struct('<BIHHH')
+
+# WebSocket opcodes
+CONTINUATION, TEXT, BINARY, CLOSE, PING, PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# Grid encoding
+
+def encode_keyframe(step, num_prey, num_predators, grid):
+    return HEADER.pack(KEYFRAME, step, num_prey, num_predators, grid.shape[0]) + \
+        grid.astype(np.uint8).tobytes()
+
+
+def encode_delta(step, num_prey, num_predators, previous, grid):
+    """Cells of grid that differ from previous, as a DELTA message."""
+    cells = np.flatnonzero(grid != previous)
+    return HEADER.pack(DELTA, step, num_prey, num_predators, len(cells)) + \
+        cells.astype('<u2').tobytes() + grid.ravel()[cells].astype(np.uint8).tobytes()
+
+
+def decode_frame(data, grid=None):
+    """Apply a binary message to grid; returns (kind, step, num_prey, num_predators, grid).
+
+    A keyframe replaces the grid. A delta updates a copy of it, or is
+    skipped (grid None) when no keyframe has been seen yet.
+    """
+    kind, step, num_prey, num_predators, n = HEADER.unpack_from(data)
+    body = memoryview(data)[HEADER.size:]
+    if kind == KEYFRAME:
+        grid = np.frombuffer(body, dtype=np.uint8).reshape(n, n).copy()
+    elif kind == DELTA:
+        if grid is not None:
+            grid = grid.copy()
+            cells = np.frombuffer(body[:2 * n], dtype='<u2')
+            grid.ravel()[cells] = np.frombuffer(body[2 * n:3 * n], dtype=np.uint8)
+    else:
+        raise ValueError(f"unknown message type {kind}")
+    return kind, step, num_prey, num_predators, grid
+
+
+# WebSocket framing
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+
+
+def _mask(payload, key):
+    data = np.frombuffer(payload, dtype=np.uint8)
+    return (data ^ np.resize(np.frombuffer(key, dtype=np.uint8), len(data))).tobytes()
+
+
+class WebSocket:
+    """Minimal RFC 6455 endpoint on asyncio streams; clients mask what they send."""
+
+    def __init__(self, reader, writer, client=False):
+        self.reader = reader
+        self.writer = writer
+        self.client = client
+        self.closed = False
+
+    async def send(self, payload, opcode=None):
+        """Send str as a text message and bytes as a binary one."""
+        if opcode is None:
+            opcode = TEXT if isinstance(payload, str) else BINARY
+        if isinstance(payload, str):
+            payload = payload.encode()
+        n = len(payload)
+        mask_bit = 0x80 if self.client else 0
+        if n < 126:
+            header = struct.pack('>BB', 0x80 | opcode, mask_bit | n)
+        elif n < 1 << 16:
+            header = struct.pack('>BBH', 0x80 | opcode, mask_bit | 126, n)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, mask_bit | 127, n)
+        if self.client:
+            key = os.urandom(4)
+            header += key
+            payload = _mask(payload, key)
+        # One write per frame, so frames from concurrent tasks never interleave
+        self.writer.write(header + payload)
+        await self.writer.drain()
+
+    async def _read_frame(self):
+        first, second = await self.reader.readexactly(2)
+        n = second & 0x7F
+        if n == 126:
+            n, = struct.unpack('>H', await self.reader.readexactly(2))
+        elif n == 127:
+            n, = struct.unpack('>Q', await self.reader.readexactly(8))
+        key = await self.reader.readexactly(4) if second & 0x80 else None
+        payload = await self.reader.readexactly(n)
+        if key is not None:
+            payload = _mask(payload, key)
+        return bool(first & 0x80), first & 0x0F, payload
+
+    async def receive(self):
+        """Next message (str or bytes), or None once the connection is closed."""
+        parts, kind = [], None
+        while not self.closed:
+            try:
+                fin, opcode, payload = await self._read_frame()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                break
+            if opcode == PING:
+                await self.send(payload, PONG)
+            elif opcode == CLOSE:
+                if not self.closed:
+                    self.closed = True
+                    await self.send(payload[:2], CLOSE)
+            elif opcode in (TEXT, BINARY, CONTINUATION):
+                if opcode != CONTINUATION:
+                    parts, kind = [], opcode
+                parts.append(payload)
+                if fin:
+                    message = b''.join(parts)
+                    return message.decode() if kind == TEXT else message
+        return None
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            await self.send(struct.pack('>H', 1000), CLOSE)
+        self.writer.close()
+
+
+# Sessions
+
+def rule_value(name, value):
+    """value checked against the type of Rules field name (JSON gives no coercion)."""
+    kind = engine.Rules.__annotations__[name]
+    if kind is bool:
+        valid = isinstance(value, bool)
+    elif kind is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if not valid:
+        raise ValueError(f"rule {name} must be a JSON {kind.__name__}, got {value!r}")
+    return kind(value)
+
+
+class Session:
+    """One client's run: stepped at ``speed`` steps per second and streamed as deltas."""
+
+    def __init__(self, ws, num_prey=50, num_predators=20, rules=engine.PHASE_DIAGRAM_RULES,
+                 seed=None):
+        self.ws = ws
+        self.num_prey = num_prey
+        self.num_predators = num_predators
+        self.rules = rules
+        self.seed = seed
+        self.speed = DEFAULT_SPEED
+        self.paused = False
+        self.wake = asyncio.Event()  # Set on every accepted change
+        self.restart()
+
+    def restart(self, sim=None):
+        """Start a new run from the session's settings, or switch to the given one."""
+        self.sim = sim or engine.Simulation(self.num_prey, self.num_predators, self.rules,
+                                            self.seed)
+        self.grid = occupancy(self.sim)
+        self.needs_keyframe = True
+        self.reported = False  # Whether the "done" event was sent
+
+    def params(self):
+        return {'num_prey': self.num_prey, 'num_predators': self.num_predators,
+                'seed': self.seed, 'speed': self.speed, 'paused': self.paused,
+                'rules': self.rules._asdict()}
+
+    def update(self, params):
+        """Validate and apply one client message."""
+        if not isinstance(params, dict):
+            raise ValueError("expected a JSON object")
+        unknown = set(params) - {'num_prey', 'num_predators', 'seed', 'rules', 'speed', 'command'}
+        if unknown:
+            raise ValueError(f"unknown keys {sorted(unknown)}")
+        changes = params.get('rules', {})
+        if not isinstance(changes, dict):
+            raise ValueError("rules must be a JSON object")
+        unknown = set(changes) - set(engine.Rules._fields)
+        if unknown:
+            raise ValueError(f"unknown rule fields {sorted(unknown)}")
+        rules = self.rules._replace(**{name: rule_value(name, value)
+                                       for name, value in changes.items()})
+        if not 3 <= rules.grid_size <= 255:
+            raise ValueError("grid_size must be between 3 and 255")
+        if rules.synchronous:
+            raise ValueError("sessions run the sequential reference engine")
+        if rules.grass_regrowth < 0:
+            raise ValueError("grass_regrowth must be >= 0")
+        num_prey = int(params.get('num_prey', self.num_prey))
+        num_predators = int(params.get('num_predators', self.num_predators))
+        cells = rules.grid_size ** 2
+        if not (0 <= num_prey <= cells and 0 <= num_predators <= cells):
+            raise ValueError(f"agent counts must be between 0 and {cells}")
+        seed = params.get('seed', self.seed)
+        seed = None if seed is None else int(seed)
+        speed = float(params.get('speed', self.speed))
+        if not math.isfinite(speed):
+            raise ValueError(f"speed must be a finite number, got {speed}")
+        speed = min(max(speed, 0.1), MAX_SPEED)
+        command = params.get('command')
+        if command not in (None, 'pause', 'resume', 'restart', 'keyframe'):
+            raise ValueError(f"unknown command {command!r}")
+
+        restart = command == 'restart' or any(name not in LIVE_RULES for name in changes) \
+            or any(name in params for name in ('num_prey', 'num_predators', 'seed'))
+        # Build the new run before touching the session, so a failure leaves it as it was
+        sim = engine.Simulation(num_prey, num_predators, rules, seed) if restart else None
+        self.rules, self.num_prey, self.num_predators = rules, num_prey, num_predators
+        self.seed, self.speed = seed, speed
+        self.sim.rules = rules  # The engine reads its rules every step
+        if command in ('pause', 'resume'):
+            self.paused = command == 'pause'
+        if command == 'keyframe':
+            self.needs_keyframe = True
+        if restart:
+            self.restart(sim)
+
+    async def serve(self):
+        stepper = asyncio.create_task(self.run())
+        try:
+            while (message := await self.ws.receive()) is not None:
+                try:
+                    self.update(json.loads(message))
+                except (TypeError, ValueError) as error:
+                    await self.ws.send(json.dumps({'error': str(error)}))
+                    continue
+                await self.ws.send(json.dumps({'event': 'params', **self.params()}))
+                self.wake.set()
+        finally:
+            stepper.cancel()
+
+    async def run(self):
+        while True:
+            self.wake.clear()
+            sim = self.sim
+            if self.needs_keyframe:
+                self.needs_keyframe = False
+                await self.ws.send(encode_keyframe(sim.step_count, len(sim.prey_list),
+                                                   len(sim.predator_list), self.grid))
+            if sim.done and not self.reported:
+                self.reported = True
+                await self.ws.send(json.dumps({'event': 'done', 'step': sim.step_count,
+                                               'outcome': engine.OUTCOME_LABELS[sim.outcome()]}))
+            if self.paused or sim.done:
+                await self.wake.wait()
+                continue
+            sim.step()
+            # The grid is swapped before the send, so a restart while it awaits is kept
+            previous, self.grid = self.grid, occupancy(sim)
+            await self.ws.send(encode_delta(sim.step_count, len(sim.prey_list),
+                                            len(sim.predator_list), previous, self.grid))
+            try:
+                await asyncio.wait_for(self.wake.wait(), 1 / self.speed)
+            except asyncio.TimeoutError:
+                pass
+
+
+# HTTP
+
+async def handle_connection(reader, writer):
+    try:
+        request = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return
+    lines = request.decode('latin-1').split('\r\n')
+    path = lines[0].split(' ')[1] if len(lines[0].split(' ')) > 1 else ''
+    headers = {name.strip().lower(): value.strip()
+               for name, value in (line.split(':', 1) for line in lines[1:] if ':' in line)}
+    if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}"
+                      "\r\n\r\n").encode())
+        ws = WebSocket(reader, writer)
+        try:
+            await Session(ws).serve()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+        return
+    if path == '/':
+        status, body = "200 OK", VIEWER_PAGE.encode()
+    else:
+        status, body = "404 Not Found", b"Not found"
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/html; charset=utf-8\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+async def serve(host=HOST, port=PORT):
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Serving on http://{host}:{port}/ (WebSocket at /ws)")
+    async with server:
+        await server.serve_forever()
+
+
+# Scripted client
+
+async def run_client(params, host=HOST, port=PORT, speed=MAX_SPEED):
+    """Run one session to the end and check the delta stream; returns a summary dict.
+
+    Every frame's population counts are checked against the reconstructed
+    grid, and the final grid against a fresh keyframe.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                  "Sec-WebSocket-Version: 13\r\n\r\n").encode())
+    response = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    if " 101 " not in response.split('\r\n')[0] or accept_key(key) not in response:
+        raise ConnectionError(f"handshake failed: {response.splitlines()[0]}")
+    ws = WebSocket(reader, writer, client=True)
+
+    # Frames before the acknowledgement belong to the default session
+    await ws.send(json.dumps({**params, 'speed': speed}))
+    while not (isinstance(message := await ws.receive(), str)
+               and json.loads(message).get('event') == 'params'):
+        pass
+    grid, frames, delta_bytes, outcome = None, 0, 0, None
+    start = time.perf_counter()
+    while outcome is None:
+        message = await ws.receive()
+        if message is None:
+            raise ConnectionError("server closed the connection")
+        if isinstance(message, str):
+            event = json.loads(message)
+            if 'error' in event:
+                raise ValueError(event['error'])
+            outcome = event.get('outcome')
+            continue
+        kind, step, num_prey, num_predators, grid = decode_frame(message, grid)
+        if (grid == PREY).sum() != num_prey or (grid == PREDATOR).sum() != num_predators:
+            raise AssertionError(f"step {step}: grid does not match the population counts")
+        frames += 1
+        delta_bytes += len(message) if kind == DELTA else 0
+    elapsed = time.perf_counter() - start
+
+    await ws.send(json.dumps({'command': 'keyframe'}))
+    while not isinstance(message := await ws.receive(), bytes):
+        pass
+    _, _, _, _, keyframe = decode_frame(message)
+    if not np.array_equal(keyframe, grid):
+        raise AssertionError("reconstructed grid differs from the server's keyframe")
+    await ws.close()
+    return {'frames': frames, 'steps': step, 'outcome': outcome, 'delta_bytes': delta_bytes,
+            'keyframe_bytes': HEADER.size + grid.size, 'seconds': elapsed}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'client':
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+        summary = asyncio.run(run_client({'num_prey': 50, 'num_predators': 20, 'seed': 1}, port=port))
+        deltas = max(summary['frames'] - 1, 1)
+        print(f"{summary['frames']} frames over {summary['steps']} steps in {summary['seconds']:.2f} s: "
+              f"{summary['outcome']}; reconstruction matches the server")
+        print(f"{summary['delta_bytes'] / deltas:.0f} bytes per delta on average "
+              f"(keyframe: {summary['keyframe_bytes']} bytes)")
+    else:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+        asyncio.run(serve(port=port))
+
+
+VIEWER_PAGE = """<!doctype html>
+<meta charset="utf-8">
+<title>Predator-Prey Simulation</title>
+<canvas id="board" width="600" height="600" style="float:left;margin-right:1em"></canvas>
+<p><label>Initial Prey <input id="prey" type="number" value="50" min="0"></label></p>
+<p><label>Initial Predators <input id="predators" type="number" value="20" min="0"></label></p>
+<p><label>Sim Speed <input id="speed" type="range" min="1" max="100" value="10"></label></p>
+<p><button id="setup">Setup Simulation</button> <button id="pause">Pause/Resume</button></p>
+<p id="status"></p>
+<script>
+const colors = ['rgb(100,200,100)', 'rgb(255,255,255)', 'rgb(255,0,0)'];
+const board = document.getElementById('board').getContext('2d');
+const status = document.getElementById('status');
+const ws = new WebSocket(`ws://${location.host}/ws`);
+ws.binaryType = 'arraybuffer';
+let grid = null, size = 0, paused = false;
+const $ = id => document.getElementById(id);
+function drawCell(i) {
+  const cell = 600 / size;
+  board.fillStyle = colors[grid[i]];
+  board.fillRect((i % size) * cell, Math.floor(i / size) * cell, cell, cell);
+}
+ws.onmessage = event => {
+  if (typeof event.data === 'string') {
+    const message = JSON.parse(event.data);
+    if (message.event === 'done') status.textContent += ` - ${message.outcome}`;
+    if (message.error) status.textContent = message.error;
+    return;
+  }
+  const view = new DataView(event.data);
+  const kind = view.getUint8(0), step = view.getUint32(1, true), n = view.getUint16(9, true);
+  if (kind === 0) {
+    size = n;
+    grid = new Uint8Array(event.data.slice(11));
+    for (let i = 0; i < grid.length; i++) drawCell(i);
+  } else if (grid) {
+    const cells = new Uint16Array(event.data.slice(11, 11 + 2 * n));
+    const codes = new Uint8Array(event.data, 11 + 2 * n, n);
+    for (let k = 0; k < n; k++) { grid[cells[k]] = codes[k]; drawCell(cells[k]); }
+  }
+  status.textContent = `Step ${step}: ${view.getUint16(5, true)} prey, ${view.getUint16(7, true)} predators`;
+};
+const send = message => ws.send(JSON.stringify(message));
+$('setup').onclick = () => send({num_prey: +$('prey').value, num_predators: +$('predators').value});
+$('pause').onclick = () => { paused = !paused; send({command: paused ? 'pause' : 'resume'}); };
+$('speed').oninput = () => send({speed: +$('speed').value});
+</script>
+"""
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Spatial statistics sampled during runs: prey clusters and pair correlations.
+
+Every ``interval`` steps the grid is summarized by:
+
+* prey clusters: connected components of prey cells under the 8-cell
+  neighborhood the agents move in, with periodic boundaries. Adjacent
+  cells are found with array rolls and merged by vectorized hooking and
+  pointer jumping. Cluster sizes are histogrammed in power-of-two bins
+  (1, 2-3, 4-7, ...).
+* prey-predator pair correlation g(r): the density of predators at
+  Chebyshev distance r from a prey, relative to a uniform arrangement. It
+  is computed for all offsets at once by FFT cross-correlation on the
+  torus. g(1) < 1 means predators have emptied their surroundings.
+
+A run's SpatialSummary holds sums over its samples, so summaries of many
+runs can simply be added; SpatialAccumulator does that per sweep pair with
+fixed memory.
+"""
+from typing import NamedTuple
+import numpy as np
+import engine
+from synchronous import SynchronousBatch
+
+EMPTY, PREY, PREDATOR = 0, 1, 2  # Grid codes, as in bitboard.py
+
+
+class SpatialSummary(NamedTuple):
+    """Sums over the sampled steps of one or more runs."""
+    samples: int
+    num_clusters: float  # Prey clusters, summed over samples
+    size_hist: np.ndarray  # Clusters per power-of-two size bin
+    pair_correlation: np.ndarray  # g(r) for r = 0 .. grid_size // 2, summed over samples
+
+
+def occupancy(sim):
+    """Int-coded grid (EMPTY, PREY, PREDATOR) of a reference engine Simulation."""
+    size = sim.rules.grid_size
+    grid = np.zeros((size, size), dtype=np.int8)
+    if sim.prey_list:
+        xy = np.array([(prey.x, prey.y) for prey in sim.prey_list])
+        grid[xy[:, 1], xy[:, 0]] = PREY
+    if sim.predator_list:
+        xy = np.array([(predator.x, predator.y) for predator in sim.predator_list])
+        grid[xy[:, 1], xy[:, 0]] = PREDATOR
+    return grid
+
+
+def label_clusters(mask):
+    """Periodic 8-connected component labels (-1 outside the mask)."""
+    index = np.arange(mask.size).reshape(mask.shape)
+    # Each adjacent pair of masked cells once: right, and the three cells below
+    a, b = [], []
+    for shift in ((0, 1), (1, -1), (1, 0), (1, 1)):
+        both = mask & np.roll(mask, shift, axis=(0, 1))
+        a.append(index[both])
+        b.append(np.roll(index, shift, axis=(0, 1))[both])
+    a, b = np.concatenate(a), np.concatenate(b)
+    labels = index.ravel().copy()
+    while True:
+        previous = labels.copy()
+        # Hook the root of each edge's larger label onto the smaller one
+        low = np.minimum(labels[a], labels[b])
+        np.minimum.at(labels, labels[a], low)
+        np.minimum.at(labels, labels[b], low)
+        # Pointer jumping until every cell points at its root
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            return np.where(mask, labels.reshape(mask.shape), -1)
+
+
+def cluster_sizes(grid):
+    """Sizes of the prey clusters of an int-coded grid."""
+    labels = label_clusters(grid == PREY)
+    sizes = np.bincount(labels[labels >= 0])
+    return sizes[sizes > 0]
+
+
+def pair_correlation(grid):
+    """Prey-predator g(r) for Chebyshev distances r = 0 .. grid_size // 2."""
+    size = grid.shape[0]
+    prey = (grid == PREY).astype(np.float64)
+    predators = (grid == PREDATOR).astype(np.float64)
+    radius = size // 2
+    num_prey, num_predators = prey.sum(), predators.sum()
+    if num_prey == 0 or num_predators == 0:
+        return np.zeros(radius + 1)
+    # counts[d] = number of (prey, predator) pairs at offset d, on the torus
+    counts = np.rint(np.fft.ifft2(np.conj(np.fft.fft2(prey)) * np.fft.fft2(predators)).real)
+    offsets = np.minimum(np.arange(size), size - np.arange(size))
+    distance = np.maximum(offsets[:, None], offsets[None, :])
+    pairs = np.bincount(distance.ravel(), weights=counts.ravel(), minlength=radius + 1)
+    shell = np.bincount(distance.ravel(), minlength=radius + 1)
+    # Expected pairs per offset when predators sit on the other cells uniformly
+    expected = num_prey * num_predators / (size * size - 1)
+    return pairs / (shell * expected)
+
+
+class SpatialStats:
+    """Samples a run's grid every ``interval`` steps."""
+
+    def __init__(self, grid_size, interval=50):
+        self.interval = interval
+        self.num_bins = int(grid_size * grid_size).bit_length()
+        self.radius = grid_size // 2
+        self.samples = 0
+        self.num_clusters = 0
+        self.size_hist = np.zeros(self.num_bins, dtype=np.int64)
+        self.pair_correlation = np.zeros(self.radius + 1)
+
+    def sample(self, grid):
+        sizes = cluster_sizes(grid)
+        self.samples += 1
+        self.num_clusters += len(sizes)
+        self.size_hist += np.bincount(np.log2(sizes).astype(np.int64) if len(sizes) else sizes,
+                                      minlength=self.num_bins)
+        self.pair_correlation += pair_correlation(grid)
+
+    def summary(self):
+        return SpatialSummary(self.samples, float(self.num_clusters), self.size_hist.copy(),
+                              self.pair_correlation.copy())
+
+
+def run_simulation_spatial(args, rules=engine.PHASE_DIAGRAM_RULES, rng=None, aligned=False,
+                           interval=50):
+    """engine.run_simulation_timed plus the run's SpatialSummary.
+
+    The grid is sampled at step 0 and every ``interval`` steps after it.
+    """
+    num_prey, num_predators = args
+    if rules.synchronous:
+        outcomes, steps, summaries = run_batch_spatial(
+            SynchronousBatch(num_prey, num_predators, rules, rng, 1), interval)
+        return int(outcomes[0]), int(steps[0]), summaries[0]
+    sim = engine.Simulation(num_prey, num_predators, rules, rng, aligned)
+    stats = SpatialStats(rules.grid_size, interval)
+    while not sim.done:
+        if sim.step_count % interval == 0:
+            stats.sample(occupancy(sim))
+        sim.step()
+    return sim.outcome(), sim.step_count, stats.summary()
+
+
+def run_batch_spatial(batch, interval=50):
+    """Run a BitboardBatch or SynchronousBatch to the end, sampling every replicate.
+
+    Returns (outcomes, steps, [SpatialSummary per replicate]), sampled like
+    run_simulation_spatial: at step 0 and every ``interval`` steps after it.
+    """
+    stats = [SpatialStats(batch.rules.grid_size, interval) for _ in range(len(batch.done))]
+    step = 0
+    while not batch.done.all():
+        if step % interval == 0:
+            for r in np.flatnonzero(~batch.done):
+                stats[r].sample(batch.grid(r))
+        batch.step()
+        step += 1
+    return batch.outcomes(), batch.step_count.copy(), [s.summary() for s in stats]
+
+
+class SpatialAccumulator:
+    """Per-pair sums of SpatialSummary over a sweep, in fixed memory."""
+
+    def __init__(self, plan, grid_size):
+        self.plan = plan
+        num_pairs = len(plan.pairs)
+        stats = SpatialStats(grid_size)
+        self.samples = np.zeros(num_pairs, dtype=np.int64)
+        self.num_clusters = np.zeros(num_pairs)
+        self.size_hist = np.zeros((num_pairs, stats.num_bins), dtype=np.int64)
+        self.pair_correlation = np.zeros((num_pairs, stats.radius + 1))
+
+    def record(self, k, summary):
+        self.samples[k] += summary.samples
+        self.num_clusters[k] += summary.num_clusters
+        self.size_hist[k] += summary.size_hist
+        self.pair_correlation[k] += summary.pair_correlation
+
+    def mean_clusters_map(self):
+        """Mean number of prey clusters per sample, per diagram cell."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = self.num_clusters / self.samples
+        return self.plan.fan_out(values, np.full(self.plan.shape, np.nan))
+
+    def contact_map(self):
+        """Mean prey-predator g(1) per diagram cell (< 1: predators deplete prey)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = self.pair_correlation[:, 1] / self.samples
+        return self.plan.fan_out(values, np.full(self.plan.shape, np.nan))
+
+    def save(self, path):
+        """Write the per-pair sums to <path>.npz."""
+        np.savez(f"{path}.npz", pairs=np.array(self.plan.pairs), samples=self.samples,
+                 num_clusters=self.num_clusters, size_hist=self.size_hist,
+                 pair_correlation=self.pair_correlation)
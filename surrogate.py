@@ -0,0 +1,117 @@
+"""Surrogate-model pre-screening of phase-diagram cells.
+
+A sweep first simulates a random training subset of the unique pairs
+with the full replicate budget. A k-nearest-neighbor classifier fitted to
+their majority outcomes then predicts every other pair from its prey
+fraction and density. Pairs predicted with high confidence get only a
+small validation sample. If that sample contradicts the prediction, the
+pair is escalated to the full budget, as are all uncertain pairs. The
+surrogate's accuracy is measured on training pairs held out of the fit.
+"""
+import numpy as np
+from sweep import stream_sweep
+
+
+def pair_features(pairs, total_grid_cells):
+    """(prey fraction, density) of each (num_prey, num_predators) pair."""
+    pairs = np.asarray(pairs, dtype=np.float64).reshape(-1, 2)
+    agents = pairs.sum(axis=1)
+    return np.stack([pairs[:, 0] / agents, agents / total_grid_cells], axis=1)
+
+
+class KNNSurrogate:
+    """Distance-weighted k-nearest-neighbor classifier on NumPy arrays."""
+
+    def __init__(self, k=15):
+        self.k = k
+
+    def fit(self, features, labels, num_classes):
+        self.features = np.asarray(features, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.num_classes = num_classes
+        return self
+
+    def predict_proba(self, features, chunk=512):
+        """Weighted vote share of every class, shape (n, num_classes)."""
+        features = np.asarray(features, dtype=np.float64)
+        k = min(self.k, len(self.features))
+        proba = np.zeros((len(features), self.num_classes))
+        for start in range(0, len(features), chunk):
+            block = features[start:start + chunk]
+            distances = np.sqrt(((block[:, None, :] - self.features[None, :, :]) ** 2).sum(axis=2))
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            weights = 1.0 / (np.take_along_axis(distances, nearest, axis=1) + 1e-9)
+            votes = proba[start:start + chunk]
+            for c in range(self.num_classes):
+                votes[:, c] = (weights * (self.labels[nearest] == c)).sum(axis=1)
+            votes /= votes.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, features):
+        """Predicted class and its confidence (vote share) for each row."""
+        proba = self.predict_proba(features)
+        return np.argmax(proba, axis=1), proba.max(axis=1)
+
+
+def surrogate_sweep(pool, simulate, plan, num_simulations, live_map, total_grid_cells,
+                    training_pairs=2000, holdout=0.2, validation_simulations=10,
+                    confidence=0.9, k=15, crn=None, rng=None, extinction=None,
+                    spatial=None):
+    """Sweep with surrogate pre-screening; returns the majority map Z.
+
+    A summary of the surrogate's accuracy and the simulations saved is
+    printed when the sweep completes.
+    """
+    rng = np.random.default_rng(rng)
+    num_pairs = len(plan.pairs)
+    num_classes = live_map.counts.shape[1]
+    features = pair_features(plan.pairs, total_grid_cells)
+
+    # 1. Full simulations of a random training subset
+    order = rng.permutation(num_pairs)
+    training = np.sort(order[:min(training_pairs, num_pairs)])
+    rest = np.sort(order[len(training):])
+    stream_sweep(pool, simulate, plan, num_simulations, live_map, crn=crn, pairs=training,
+                 extinction=extinction, spatial=spatial)
+    labels = np.argmax(live_map.counts[training], axis=1)
+
+    # 2. Accuracy against training pairs held out of the fit
+    held_out = rng.random(len(training)) < holdout
+    surrogate = KNNSurrogate(k)
+    accuracy = None
+    if held_out.any() and (~held_out).any():
+        surrogate.fit(features[training[~held_out]], labels[~held_out], num_classes)
+        predicted, _ = surrogate.predict(features[training[held_out]])
+        accuracy = float(np.mean(predicted == labels[held_out]))
+
+    # 3. Screen the remaining pairs with a surrogate fitted to all training pairs
+    surrogate.fit(features[training], labels, num_classes)
+    predicted, certainty = surrogate.predict(features[rest])
+    confident = certainty >= confidence
+    screened = rest[confident]
+    if len(screened):
+        stream_sweep(pool, simulate, plan, validation_simulations, live_map, crn=crn,
+                     pairs=screened, extinction=extinction, spatial=spatial)
+    validated = np.argmax(live_map.counts[screened], axis=1) == predicted[confident]
+
+    # 4. Full budget for uncertain pairs and contradicted predictions
+    escalated = np.sort(np.concatenate([rest[~confident], screened[~validated]]))
+    if len(escalated):
+        done = live_map.counts[escalated].sum(axis=1)
+        # Contradicted pairs already have their validation sample
+        for extra in np.unique(num_simulations - done):
+            if extra <= 0:
+                continue
+            group = escalated[num_simulations - done == extra]
+            stream_sweep(pool, simulate, plan, int(extra), live_map, crn=crn, pairs=group,
+                         first_replicate=num_simulations - int(extra), extinction=extinction,
+                         spatial=spatial)
+
+    used = int(live_map.counts.sum())
+    full = num_pairs * num_simulations
+    print(f"Surrogate: {len(training)} training pairs, "
+          + (f"held-out accuracy {accuracy:.1%}; " if accuracy is not None else "no held-out pairs; ")
+          + f"{len(screened)} pairs screened at confidence >= {confidence:.0%}, "
+          f"{int((~validated).sum())} contradicted by validation; "
+          f"{used} simulations instead of {full} ({1 - used / full:.1%} saved)")
+    return live_map.refresh()
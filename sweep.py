@@ -0,0 +1,388 @@
+import functools
+import time
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from tqdm import tqdm  # For progress bars
+
+
+def agent_counts(ratio, density, total_grid_cells):
+    """Map a (ratio, density) point to integer (num_prey, num_predators)."""
+    # Skip points where density is 0 (no agents)
+    if density == 0:
+        return None
+
+    # Calculate total number of agents
+    N = int(density * total_grid_cells)
+    if N < 2:
+        N = 2  # Ensure at least one prey and one predator
+
+    # Handle ratio = 0 separately to avoid division by zero
+    if ratio == 0:
+        num_prey = 0
+        num_predators = N
+    else:
+        num_prey = int((ratio / (ratio + 1)) * N)
+        num_predators = N - num_prey
+
+    # Ensure at least one prey and one predator
+    if num_prey == 0:
+        num_prey = 1
+        num_predators = N - 1
+    if num_predators == 0:
+        num_predators = 1
+        num_prey = N - 1
+    return num_prey, num_predators
+
+
+class SweepPlan:
+    """Unique (num_prey, num_predators) pairs and the diagram cells they cover."""
+
+    def __init__(self, shape):
+        self.shape = shape  # (len(density_values), len(ratio_values))
+        self.pairs = []  # Unique (num_prey, num_predators), in first-seen order
+        self.cells = []  # cells[k] lists the (j, i) positions sharing pairs[k]
+        self.invalid = []  # Positions with no agents (density == 0)
+        self._index = {}
+
+    def add(self, position, pair):
+        if pair is None:
+            self.invalid.append(position)
+            return
+        k = self._index.get(pair)
+        if k is None:
+            k = self._index[pair] = len(self.pairs)
+            self.pairs.append(pair)
+            self.cells.append([])
+        self.cells[k].append(position)
+
+    @property
+    def num_cells(self):
+        return sum(len(c) for c in self.cells)
+
+    def fan_out(self, values, Z):
+        """Write values[k] into every cell of Z covered by pairs[k]."""
+        for value, positions in zip(values, self.cells):
+            for j, i in positions:
+                Z[j, i] = value
+        for j, i in self.invalid:
+            Z[j, i] = np.nan
+        return Z
+
+    def pair_map(self):
+        """Index into pairs for every cell of the diagram, -1 where invalid."""
+        index = np.full(self.shape, -1, dtype=np.int64)
+        for k, positions in enumerate(self.cells):
+            for j, i in positions:
+                index[j, i] = k
+        return index
+
+    def report(self, num_simulations=1):
+        cells = self.num_cells
+        unique = len(self.pairs)
+        saved = (cells - unique) * num_simulations
+        fraction = saved / (cells * num_simulations) if cells else 0.0
+        return (f"{cells} cells map to {unique} unique (prey, predator) pairs: "
+                f"{unique * num_simulations} simulations instead of {cells * num_simulations} "
+                f"({saved} saved, {fraction:.1%})")
+
+
+def plan_sweep(ratio_values, density_values, total_grid_cells):
+    """Collapse the (ratio, density) grid by integer agent counts."""
+    plan = SweepPlan((len(density_values), len(ratio_values)))
+    for i, ratio in enumerate(ratio_values):
+        for j, density in enumerate(density_values):
+            plan.add((j, i), agent_counts(ratio, density, total_grid_cells))
+    return plan
+
+
+class LivePhaseMap:
+    """Partially filled phase map that is updated while a sweep is running.
+
+    Outcome counts are kept per unique pair, so memory is bounded by the
+    size of the plan rather than the number of simulations. When ``path`` is
+    given, the counts and the majority map are memory-mapped ``.npy`` files
+    (``<path>_counts.npy`` and ``<path>.npy``) and a PNG preview
+    (``<path>.png``) is refreshed at most every ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, plan, ratio_values, density_values, labels, path=None,
+                 refresh_interval=60.0, title="Phase Diagram (Partial)"):
+        self.plan = plan
+        self.ratio_values = ratio_values
+        self.density_values = density_values
+        self.labels = labels
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.title = title
+        counts_shape = (len(plan.pairs), len(labels))
+        if path is None:
+            self.counts = np.zeros(counts_shape, dtype=np.int32)
+            self.Z = np.full(plan.shape, np.nan)
+        else:
+            self.counts = np.lib.format.open_memmap(f"{path}_counts.npy", mode="w+",
+                                                    dtype=np.int32, shape=counts_shape)
+            self.Z = np.lib.format.open_memmap(f"{path}.npy", mode="w+",
+                                               dtype=np.float64, shape=plan.shape)
+            self.Z[:] = np.nan
+        self.completed = 0
+        self._last_refresh = time.monotonic()
+
+    def record(self, k, outcome):
+        self.counts[k, outcome] += 1
+        self.completed += 1
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def record_counts(self, k, counts):
+        """Add a batch of outcome counts for pair k."""
+        self.counts[k] += counts
+        self.completed += int(sum(counts))
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def majority(self):
+        """Majority outcome per pair, NaN for pairs without results yet."""
+        values = np.argmax(self.counts, axis=1).astype(np.float64)
+        values[self.counts.sum(axis=1) == 0] = np.nan
+        return values
+
+    def refresh(self):
+        self.plan.fan_out(self.majority(), self.Z)
+        if self.path is not None:
+            self.counts.flush()
+            self.Z.flush()
+            self._save_png()
+        self._last_refresh = time.monotonic()
+        return self.Z
+
+    def _save_png(self):
+        # Use a standalone Agg figure so the preview never touches pyplot state
+        fig = Figure(figsize=(10, 8))
+        FigureCanvas(fig)
+        ax = fig.add_subplot()
+        extent = [self.ratio_values.min(), self.ratio_values.max(),
+                  self.density_values.min(), self.density_values.max()]
+        image = ax.imshow(np.ma.masked_invalid(self.Z), extent=extent, origin='lower',
+                          aspect='auto', cmap='viridis', vmin=0, vmax=len(self.labels) - 1)
+        cbar = fig.colorbar(image, ticks=range(len(self.labels)))
+        cbar.ax.set_yticklabels(self.labels)
+        ax.set_xlabel('Ratio (Prey / Predator)')
+        ax.set_ylabel('Density (Agents per Grid Cell)')
+        ax.set_title(f"{self.title}: {self.completed} simulations")
+        fig.savefig(f"{self.path}.png")
+
+
+class ExtinctionTimes:
+    """Streaming histograms of the step at which each run ended.
+
+    ``hist[k, outcome, b]`` counts the runs of pair k with that outcome whose
+    final step falls in bin b of ``num_bins`` equal bins over [0, max_steps].
+    Runs ending in the ``censored`` outcome (coexistence) are censored at
+    max_steps. Memory is fixed by the plan, whatever the number of
+    replicates. With ``path`` the histograms are a memory-mapped ``.npy``
+    file.
+    """
+
+    def __init__(self, plan, max_steps, num_outcomes, censored, num_bins=50, path=None):
+        self.plan = plan
+        self.max_steps = max_steps
+        self.censored = censored
+        self.num_bins = num_bins
+        self.path = path
+        self.edges = np.linspace(0, max_steps, num_bins + 1)
+        shape = (len(plan.pairs), num_outcomes, num_bins)
+        if path is None:
+            self.hist = np.zeros(shape, dtype=np.int32)
+        else:
+            self.hist = np.lib.format.open_memmap(f"{path}.npy", mode="w+", dtype=np.int32,
+                                                  shape=shape)
+
+    def record(self, k, outcome, step):
+        self.hist[k, outcome, min(step * self.num_bins // max(self.max_steps, 1),
+                                  self.num_bins - 1)] += 1
+
+    def survival(self):
+        """Kaplan-Meier curves, shape (pairs, num_bins).
+
+        survival[k, b] is the estimated probability that both species are
+        still present at the end of bin b (at time edges[b + 1]).
+        """
+        censored = self.hist[:, self.censored].astype(np.float64)
+        events = self.hist.sum(axis=1) - censored
+        total = events.sum(axis=1) + censored.sum(axis=1)
+        leaving = np.cumsum(events + censored, axis=1)
+        at_risk = total[:, None] - np.concatenate(
+            [np.zeros((len(total), 1)), leaving[:, :-1]], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factors = np.where(at_risk > 0, 1 - events / at_risk, 1.0)
+        survival = np.cumprod(factors, axis=1)
+        survival[total == 0] = np.nan
+        return survival
+
+    def cell_survival(self, j, i):
+        """(times, survival) for diagram cell (j, i)."""
+        k = self.plan.pair_map()[j, i]
+        if k < 0:
+            raise ValueError(f"cell ({j}, {i}) has no agents")
+        return self.edges[1:], self.survival()[k]
+
+    def median_map(self):
+        """Median extinction step per diagram cell (NaN when S stays above 1/2)."""
+        survival = self.survival()
+        below = survival <= 0.5
+        medians = np.where(below.any(axis=1), self.edges[1:][np.argmax(below, axis=1)], np.nan)
+        return self.plan.fan_out(medians, np.full(self.plan.shape, np.nan))
+
+    def export_survival(self, path):
+        """Write every pair's Kaplan-Meier curve to <path>.npz."""
+        if self.path is not None:
+            self.hist.flush()
+        np.savez(f"{path}.npz", times=self.edges[1:], pairs=np.array(self.plan.pairs),
+                 survival=self.survival(), hist=np.asarray(self.hist))
+
+
+class CommonRandomNumbers:
+    """Common random numbers across the cells of a sweep.
+
+    Replicate r of every pair is seeded with ``[seed, r]``, so neighboring
+    cells share their random streams and their difference reflects the
+    parameters rather than independent noise. Per-replicate outcomes are
+    kept (one byte each) to measure the variance reduction achieved.
+    """
+
+    def __init__(self, plan, num_simulations, seed=None):
+        self.plan = plan
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+        self.outcomes = np.full((len(plan.pairs), num_simulations), -1, dtype=np.int8)
+
+    def record(self, k, r, outcome):
+        self.outcomes[k, r] = outcome
+
+    def _edges(self):
+        # Distinct pairs on horizontally or vertically adjacent cells
+        index = self.plan.pair_map()
+        a = np.concatenate([index[1:, :].ravel(), index[:, 1:].ravel()])
+        b = np.concatenate([index[:-1, :].ravel(), index[:, :-1].ravel()])
+        keep = (a >= 0) & (b >= 0) & (a != b)
+        return np.unique(np.sort(np.stack([a[keep], b[keep]], axis=1), axis=1), axis=0)
+
+    def variance_reduction(self, num_outcomes, chunk=4096):
+        """Mean variance of adjacent-cell outcome differences, with and without CRN.
+
+        Returns (crn_variance, independent_variance) averaged over adjacent
+        pairs and outcome classes; the independent variance is what the same
+        cells would give with unrelated streams (the sum of both variances).
+        Only replicates that ran count: a difference uses the replicates run
+        in both cells, and pairs sharing none (e.g. screened out) are skipped.
+        """
+        edges = self._edges()
+        ran = self.outcomes >= 0
+        runs = np.maximum(ran.sum(axis=1), 1)
+        crn_total = independent_total = 0.0
+        count = 0
+        for c in range(num_outcomes):
+            indicator = (self.outcomes == c).astype(np.float32)
+            mean = indicator.sum(axis=1) / runs
+            variance = (ran * (indicator - mean[:, None]) ** 2).sum(axis=1) / runs
+            for start in range(0, len(edges), chunk):
+                a, b = edges[start:start + chunk].T
+                both = ran[a] & ran[b]
+                shared = both.sum(axis=1)
+                keep = shared > 0
+                difference = indicator[a] - indicator[b]
+                centered = difference - (both * difference).sum(axis=1)[:, None] \
+                    / np.maximum(shared, 1)[:, None]
+                crn_total += ((both * centered ** 2).sum(axis=1)[keep] / shared[keep]).sum()
+                independent_total += (variance[a] + variance[b])[keep].sum()
+                count += int(keep.sum())
+        count = max(count, 1)
+        return crn_total / count, independent_total / count
+
+    def report(self, num_outcomes):
+        crn, independent = self.variance_reduction(num_outcomes)
+        if independent == 0:
+            return "Common random numbers: no outcome variance between adjacent cells"
+        return (f"Common random numbers: adjacent-cell difference variance {crn:.4f} vs "
+                f"{independent:.4f} with independent streams "
+                f"({1 - crn / independent:.1%} reduction, worth "
+                f"{independent / crn if crn else float('inf'):.2f}x the replicates)")
+
+
+def _run_indexed(simulate, task):
+    k, pair = task
+    return k, simulate(pair)
+
+
+def _run_common(simulate, seed, task):
+    k, pair, r = task
+    return k, r, simulate(pair, [seed, r])
+
+
+def stream_sweep(pool, simulate, plan, num_simulations, live_map, chunksize=16, crn=None,
+                 pairs=None, first_replicate=0, extinction=None, spatial=None):
+    """Run num_simulations per unique pair, streaming outcomes into live_map.
+
+    ``simulate`` takes a ``(num_prey, num_predators)`` tuple and returns an
+    outcome code; it must be picklable (a module-level function). With a
+    CommonRandomNumbers ``crn``, it is also passed the replicate's seed.
+    ``pairs`` restricts the run to some pair indices, and replicates are
+    numbered from ``first_replicate`` so that later rounds on the same
+    pairs continue the common random number streams. With ExtinctionTimes
+    ``extinction``, ``simulate`` returns ``(outcome, step)`` instead, and
+    with a spatial.SpatialAccumulator ``spatial`` it returns
+    ``(outcome, step, summary)``.
+    """
+    pairs = range(len(plan.pairs)) if pairs is None else pairs
+    replicates = range(first_replicate, first_replicate + num_simulations)
+    total = len(pairs) * num_simulations
+    if crn is None:
+        worker = functools.partial(_run_indexed, simulate)
+        tasks = ((k, plan.pairs[k]) for k in pairs for _ in replicates)
+    else:
+        worker = functools.partial(_run_common, simulate, crn.seed)
+        tasks = ((k, plan.pairs[k], r) for k in pairs for r in replicates)
+    results = pool.imap_unordered(worker, tasks, chunksize=chunksize)
+    for result in tqdm(results, total=total, desc="Running simulations"):
+        k, outcome = result[0], result[-1]
+        if extinction is not None or spatial is not None:
+            outcome, step, *summary = outcome
+            if extinction is not None:
+                extinction.record(k, outcome, step)
+            if spatial is not None:
+                spatial.record(k, summary[0])
+        if crn is not None:
+            crn.record(k, result[1], outcome)
+        live_map.record(k, outcome)
+    return live_map.refresh()
+
+
+def _run_batch(simulate_batch, task):
+    k, pair, n, backend = task
+    return k, simulate_batch(pair, n, backend=backend)
+
+
+def batch_sweep(pool, simulate_batch, plan, num_simulations, live_map, backends, batch_size,
+                pairs=None, extinction=None, spatial=None):
+    """Like stream_sweep, with up to batch_size replicates of a pair per pool task.
+
+    ``simulate_batch(pair, n, backend=...)`` runs n replicates on the engine
+    backends[k] chosen for pair k (see backends.dispatch_sweep) and returns
+    (outcomes, steps, summaries or None) as arrays over the replicates.
+    """
+    pairs = range(len(plan.pairs)) if pairs is None else pairs
+    worker = functools.partial(_run_batch, simulate_batch)
+    tasks = ((k, plan.pairs[k], min(batch_size, num_simulations - start), backends[k])
+             for k in pairs for start in range(0, num_simulations, batch_size))
+    num_labels = len(live_map.labels)
+    with tqdm(total=len(pairs) * num_simulations, desc="Running simulations") as progress:
+        for k, (outcomes, steps, summaries) in pool.imap_unordered(worker, tasks):
+            if extinction is not None:
+                for outcome, step in zip(outcomes, steps):
+                    extinction.record(k, outcome, step)
+            if spatial is not None:
+                for summary in summaries:
+                    spatial.record(k, summary)
+            live_map.record_counts(k, np.bincount(outcomes, minlength=num_labels))
+            progress.update(len(outcomes))
+    return live_map.refresh()
@@ -0,0 +1,335 @@
+"""Asynchronous sweep controller shared by several users on one node.
+
+Sweep jobs are submitted over a small local HTTP endpoint (TCP or Unix
+socket) and scheduled onto one process pool. Jobs with a lower priority
+number run first; jobs with equal priority share the pool. Within a job,
+unseen cells run first, then cells on the current phase boundary, then
+the cells whose majority outcome is least certain.
+
+    python sweep_controller.py --port 8765 --workers 32
+    curl -X POST localhost:8765/jobs -d '{"ratio": [0.1, 10, 0.02], "density": [0.01, 1, 0.01], "num_simulations": 500, "rules": "reproduction", "output": "plots2/shared"}'
+    # "synchronous": true runs the synchronous-update rules (synchronous.py)
+    # "rules": "food_chain" or "competing_predators" runs a rule table (rule_table.py)
+    curl localhost:8765/jobs
+    curl -X POST localhost:8765/jobs/1/pause    # also: resume, cancel
+"""
+import argparse
+import asyncio
+import collections
+import functools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import engine
+from sweep import plan_sweep, LivePhaseMap
+from rule_table import RuleTable, TableBatch, TABLES, initial_counts, outcome_labels, as_dict
+from warm_pool import warm_up
+
+BATCH_SIZE = 10  # Replicates of one pair per pool task
+REPRIORITIZE_EVERY = 64  # Tasks dispatched from a job between re-ranking its cells
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+FAILED = "failed"
+DONE = "done"
+
+
+def simulate_batch(pair, num_simulations, rules, seed):
+    """Run num_simulations replicates of one pair and return outcome counts."""
+    rng = np.random.default_rng(seed)
+    if isinstance(rules, RuleTable):
+        outcomes = TableBatch(initial_counts(rules, pair), rules, rng, num_simulations).run()
+        return np.bincount(outcomes, minlength=len(outcome_labels(rules)))
+    outcomes = [engine.run_simulation(pair, rules, rng) for _ in range(num_simulations)]
+    return np.bincount(outcomes, minlength=len(engine.OUTCOME_LABELS))
+
+
+class SweepJob:
+    def __init__(self, job_id, ratio_values, density_values, num_simulations,
+                 rules=engine.PHASE_DIAGRAM_RULES, priority=0, owner=None,
+                 output=None, refresh_interval=60.0, seed=None):
+        self.id = job_id
+        self.rules = rules
+        self.priority = priority
+        self.owner = owner
+        self.output = output
+        self.num_simulations = num_simulations
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.plan = plan_sweep(ratio_values, density_values, rules.grid_size ** 2)
+        labels = outcome_labels(rules) if isinstance(rules, RuleTable) else engine.OUTCOME_LABELS
+        self.live_map = LivePhaseMap(self.plan, ratio_values, density_values,
+                                     labels, path=output,
+                                     refresh_interval=refresh_interval,
+                                     title=f"Sweep job {job_id}")
+        self.remaining = np.full(len(self.plan.pairs), num_simulations, dtype=np.int64)
+        self.in_flight = 0
+        self.dispatched = 0
+        self.state = QUEUED
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._pair_map = self.plan.pair_map()
+        self._queue = collections.deque()
+
+    @property
+    def runnable(self):
+        return self.state in (QUEUED, RUNNING) and self.remaining.any()
+
+    def cell_scores(self):
+        """Scheduling score per pair: higher runs sooner."""
+        counts = self.live_map.counts
+        total = counts.sum(axis=1)
+        top_two = np.sort(counts, axis=1)[:, -2:]
+        margin = (top_two[:, 1] - top_two[:, 0]) / np.maximum(total, 1)
+        scores = 1.0 - margin  # Uncertainty of the current majority
+
+        # Boundary cells: majority differs from a horizontal or vertical neighbor
+        majority = np.where(total > 0, np.argmax(counts, axis=1), -1)
+        Z = np.where(self._pair_map >= 0, majority[self._pair_map], -1)
+        seen = Z >= 0
+        vertical = (Z[1:, :] != Z[:-1, :]) & seen[1:, :] & seen[:-1, :]
+        horizontal = (Z[:, 1:] != Z[:, :-1]) & seen[:, 1:] & seen[:, :-1]
+        boundary = np.zeros(Z.shape, dtype=bool)
+        boundary[1:, :] |= vertical
+        boundary[:-1, :] |= vertical
+        boundary[:, 1:] |= horizontal
+        boundary[:, :-1] |= horizontal
+        on_boundary = np.unique(self._pair_map[boundary & (self._pair_map >= 0)])
+        scores[on_boundary] += 1.0
+        scores[total == 0] += 2.0  # Every pair gets a first batch before refinement
+        return scores
+
+    def next_task(self):
+        """Return (k, n) for the next batch of this job, or None."""
+        while True:
+            if not self._queue:
+                order = np.argsort(-self.cell_scores(), kind="stable")
+                order = order[self.remaining[order] > 0]
+                self._queue.extend(order[:REPRIORITIZE_EVERY].tolist())
+            if not self._queue:
+                return None
+            k = self._queue.popleft()
+            if self.remaining[k] > 0:
+                n = int(min(BATCH_SIZE, self.remaining[k]))
+                self.remaining[k] -= n
+                return k, n
+
+    def task_seed(self, k):
+        self.dispatched += 1
+        return int(np.random.SeedSequence([self.seed, k, self.dispatched]).generate_state(1)[0])
+
+    def status(self):
+        total = len(self.plan.pairs) * self.num_simulations
+        return {
+            "id": self.id,
+            "owner": self.owner,
+            "state": self.state,
+            "priority": self.priority,
+            "rules": as_dict(self.rules),
+            "cells": self.plan.num_cells,
+            "pairs": len(self.plan.pairs),
+            "completed": self.live_map.completed,
+            "total": total,
+            "progress": self.live_map.completed / total if total else 1.0,
+            "in_flight": self.in_flight,
+            "output": self.output,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SweepController:
+    """Schedules batches from all submitted jobs onto one process pool."""
+
+    def __init__(self, max_workers=None, max_in_flight=None, max_tasks_per_child=None):
+        self.max_workers = max_workers or os.cpu_count()
+        # Workers are warmed up once; with max_tasks_per_child they are replaced
+        # after that many batches to bound memory over a long-lived daemon
+        self.executor = ProcessPoolExecutor(self.max_workers, initializer=warm_up,
+                                            max_tasks_per_child=max_tasks_per_child)
+        self.jobs = {}
+        self._next_id = 1
+        self._slots = asyncio.Semaphore(max_in_flight or 2 * self.max_workers)
+        self._wakeup = asyncio.Event()
+
+    def submit(self, ratio_values, density_values, num_simulations, **kwargs):
+        job = SweepJob(self._next_id, ratio_values, density_values, num_simulations, **kwargs)
+        self.jobs[job.id] = job
+        self._next_id += 1
+        self._wakeup.set()
+        return job
+
+    def pause(self, job_id):
+        job = self.jobs[job_id]
+        if job.state in (QUEUED, RUNNING):
+            job.state = PAUSED
+        return job
+
+    def resume(self, job_id):
+        job = self.jobs[job_id]
+        if job.state == PAUSED:
+            job.state = RUNNING if job.dispatched else QUEUED
+            self._wakeup.set()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs[job_id]
+        if job.state not in (DONE, FAILED):
+            job.state = CANCELLED
+            job.finished_at = time.time()
+        return job
+
+    def _next_task(self):
+        # Lowest priority number first; equal priorities share the pool
+        candidates = [job for job in self.jobs.values() if job.runnable]
+        for job in sorted(candidates, key=lambda job: (job.priority, job.in_flight, job.id)):
+            task = job.next_task()
+            if task is not None:
+                return job, task
+        return None
+
+    async def run(self):
+        """Dispatch batches forever; run as a task next to the HTTP server."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            task = self._next_task()
+            while task is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                task = self._next_task()
+            job, (k, n) = task
+            job.state = RUNNING
+            job.in_flight += 1
+            future = loop.run_in_executor(self.executor, simulate_batch, job.plan.pairs[k],
+                                          n, job.rules, job.task_seed(k))
+            future.add_done_callback(functools.partial(self._finished, job, k))
+
+    def _finished(self, job, k, future):
+        self._slots.release()
+        job.in_flight -= 1
+        self._wakeup.set()
+        if job.state == CANCELLED:
+            return
+        if future.exception() is not None:
+            job.state = FAILED
+            job.error = repr(future.exception())
+            job.finished_at = time.time()
+            return
+        job.live_map.record_counts(k, future.result())
+        if not job.remaining.any() and job.in_flight == 0 and job.state in (RUNNING, PAUSED):
+            job.live_map.refresh()
+            job.state = DONE
+            job.finished_at = time.time()
+
+    # Local HTTP endpoint
+
+    def _route(self, method, path, body):
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if parts == ["jobs"] and method == "GET":
+            return 200, [job.status() for job in self.jobs.values()]
+        if parts == ["jobs"] and method == "POST":
+            spec = json.loads(body or "{}")
+            return 201, self.submit_spec(spec).status()
+        if len(parts) >= 2 and parts[0] == "jobs":
+            try:
+                job_id = int(parts[1])
+            except ValueError:
+                return 404, {"error": f"unknown job {parts[1]}"}
+            if job_id not in self.jobs:
+                return 404, {"error": f"unknown job {job_id}"}
+            if len(parts) == 2 and method == "GET":
+                return 200, self.jobs[job_id].status()
+            actions = {"pause": self.pause, "resume": self.resume, "cancel": self.cancel}
+            if len(parts) == 3 and method == "POST" and parts[2] in actions:
+                return 200, actions[parts[2]](job_id).status()
+        return 404, {"error": f"no route for {method} {path}"}
+
+    def submit_spec(self, spec):
+        """Submit a job from its JSON description (see module docstring)."""
+        rules = spec.get("rules", "phase_diagram")
+        if rules == "phase_diagram":
+            rules = engine.PHASE_DIAGRAM_RULES
+        elif rules == "reproduction":
+            rules = engine.REPRODUCTION_RULES
+        elif rules in TABLES:
+            if spec.get("synchronous"):
+                raise ValueError("rule tables always update synchronously")
+            rules = TABLES[rules]
+        else:
+            rules = engine.PHASE_DIAGRAM_RULES._replace(**rules)
+        if spec.get("synchronous"):
+            rules = rules._replace(synchronous=True)
+        return self.submit(np.arange(*spec["ratio"]), np.arange(*spec["density"]),
+                           int(spec.get("num_simulations", 50)), rules=rules,
+                           priority=int(spec.get("priority", 0)), owner=spec.get("owner"),
+                           output=spec.get("output"), seed=spec.get("seed"),
+                           refresh_interval=float(spec.get("refresh_interval", 60.0)))
+
+    async def handle_http(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if len(request_line) < 2:
+                status, payload = 400, {"error": "malformed request"}
+            else:
+                try:
+                    status, payload = self._route(request_line[0], request_line[1], body.decode())
+                except (KeyError, TypeError, ValueError) as exc:
+                    status, payload = 400, {"error": repr(exc)}
+            data = json.dumps(payload).encode()
+            reason = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found"}[status]
+            writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(controller, host="127.0.0.1", port=8765, unix_path=None):
+    if unix_path:
+        server = await asyncio.start_unix_server(controller.handle_http, path=unix_path)
+        print(f"Sweep controller listening on {unix_path}")
+    else:
+        server = await asyncio.start_server(controller.handle_http, host, port)
+        print(f"Sweep controller listening on http://{host}:{port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), controller.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: all CPUs)")
+    parser.add_argument("--max-tasks-per-child", type=int, default=None,
+                        help="Replace a worker after this many batches (default: never)")
+    args = parser.parse_args()
+
+    async def _main():
+        controller = SweepController(args.workers, max_tasks_per_child=args.max_tasks_per_child)
+        try:
+            await serve(controller, args.host, args.port, args.unix)
+        finally:
+            controller.executor.shutdown(cancel_futures=True)
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Synchronous-update variant of the rules, vectorized over cells and replicates.
+
+The reference rules (engine.py) update agents one at a time. Each prey or
+predator sees the moves of everyone who went before it in the step, which
+makes every step a serial loop over agents. With ``Rules(synchronous=True)``
+each phase of a step is instead one simultaneous update:
+
+1. Prey phase. Every prey picks a uniformly random neighbor cell among
+   those empty at the start of the phase. When several prey pick the same
+   cell, a random priority decides: the highest moves there and the others
+   stay where they are. Prey never move into a cell vacated in the same
+   phase. Then every prey reproduces with probability ``prey_reproduce``
+   into a uniformly random neighbor of the cell it started the step in,
+   among the cells empty after the moves. Conflicts are again resolved by
+   random priority, and newborns do not move until the next step.
+2. Predator phase. Every predator picks a random neighboring prey if it
+   has one, otherwise a random empty neighbor, as seen at the start of the
+   phase. Conflicts over a target cell are resolved by random priority.
+   Winners eat (+gain_from_food) or move (-move_cost). Predators that lose
+   a conflict or have no free neighbor stay and pay 2 * move_cost, like a
+   stuck predator in the reference rules. Predators with energy <= 0 die.
+
+With a grass layer (``grass_regrowth > 0``) every prey pays prey_move_cost
+after the moves, eats the grass of the cell it ended on if grown, and dies
+at energy <= 0 before breeding. Only prey with at least 2 energy breed, and
+offspring take half the parent's energy.
+
+Initial placement, the toroidal 8-neighborhood, energies and outcomes are
+those of the reference rules. Every phase is a handful of array operations
+over all agents of all replicates, with no loop over agents.
+Synchronous updating is a different model, not a faster implementation of
+the sequential one, so its results need checking before they stand in for
+it. ``python synchronous.py`` sweeps a coarse phase diagram under both
+update schemes and reports where and how much their outcomes differ.
+
+    python synchronous.py [num_simulations] [phase|reproduction]
+"""
+import functools
+import os
+import sys
+import time
+import numpy as np
+import engine
+from engine import PHASE_DIAGRAM_RULES, ALL_PREY_DIED, ALL_PREDATORS_DIED, COEXISTENCE
+from bitboard import BitboardBatch, EMPTY, PREY, PREDATOR, DX, DY, POPCOUNT, SELECT
+from sweep import plan_sweep
+
+DIRECTION_BITS = 1 << np.arange(8)
+
+# Coarse (ratio, density) grid and output of the comparison
+COMPARISON_RATIOS = np.arange(0.5, 10, 0.5)
+COMPARISON_DENSITIES = np.arange(0.05, 1, 0.05)
+COMPARISON_PATH = "plots/synchronous_vs_sequential.png"
+
+
+@functools.lru_cache(maxsize=None)
+def neighbor_cells(grid_size):
+    """neighbor_cells(G)[c, b] is the flat index of neighbor b (bitboard order) of cell c."""
+    y, x = np.divmod(np.arange(grid_size * grid_size), grid_size)
+    return ((y[:, None] + DY) % grid_size) * grid_size + (x[:, None] + DX) % grid_size
+
+
+class SynchronousBatch:
+    """A batch of independent synchronous-update runs, with BitboardBatch's interface."""
+
+    def __init__(self, num_prey, num_predators, rules=PHASE_DIAGRAM_RULES._replace(synchronous=True),
+                 rng=None, num_replicates=None):
+        if not rules.synchronous:
+            raise ValueError("SynchronousBatch runs Rules(synchronous=True)")
+        self.rules = rules
+        self.rng = np.random.default_rng(rng)
+        G = self.G = rules.grid_size
+        num_prey = np.asarray(num_prey, dtype=np.int64)
+        num_predators = np.asarray(num_predators, dtype=np.int64)
+        if num_replicates is None:
+            num_replicates = int(np.broadcast(num_prey, num_predators).size)
+        num_prey = np.broadcast_to(num_prey, (num_replicates,))
+        num_predators = np.broadcast_to(num_predators, (num_replicates,))
+        cells = G * G
+        if (num_prey > cells).any() or (num_predators > cells).any() or (num_prey < 0).any() \
+                or (num_predators < 0).any():
+            raise ValueError(f"agent counts must be between 0 and {cells}")
+
+        # Same placement as the other engines: prefixes of one random permutation
+        # of the cells per species; a predator placed on a prey cell replaces it
+        R = num_replicates
+        rank = np.arange(cells)
+        prey_perm = np.argsort(self.rng.random((R, cells)), axis=1)
+        predator_perm = np.argsort(self.rng.random((R, cells)), axis=1)
+        self.cells = np.zeros((R, cells), dtype=np.int8)
+        np.put_along_axis(self.cells, prey_perm,
+                          np.where(rank < num_prey[:, None], PREY, EMPTY).astype(np.int8), axis=1)
+        predators = np.zeros((R, cells), dtype=bool)
+        np.put_along_axis(predators, predator_perm, rank < num_predators[:, None], axis=1)
+        self.cells[predators] = PREDATOR
+        self.energy = np.where(predators, rules.initial_energy, 0).astype(np.int64)
+        self.grass = None
+        if rules.grass_regrowth:
+            self.energy[self.cells == PREY] = rules.prey_initial_energy
+            grown = self.rng.random((R, cells)) < 0.5
+            countdown = self.rng.integers(1, rules.grass_regrowth + 1, (R, cells))
+            self.grass = np.where(grown, 0, countdown).astype(np.int32)
+
+        self.step_count = np.zeros(R, dtype=np.int64)
+        self.done = np.zeros(R, dtype=bool)
+        self._count()
+
+    def _count(self):
+        self.num_prey = (self.cells == PREY).sum(axis=1)
+        self.num_predators = (self.cells == PREDATOR).sum(axis=1)
+        self.done |= ((self.step_count >= self.rules.max_steps)
+                      | (self.num_prey == 0) | (self.num_predators == 0))
+
+    def _neighbor_masks(self, cells, code):
+        """8-bit mask per cell of the neighbors (bitboard bit order) holding code."""
+        return self._masks_of(cells == code)
+
+    def _masks_of(self, holds):
+        """8-bit mask per cell of the neighbors where the (R, G*G) bool array holds is set."""
+        G = self.G
+        holds = np.pad(holds.view(np.uint8).reshape(-1, G, G),
+                       ((0, 0), (1, 1), (1, 1)), mode='wrap')
+        masks = np.zeros((len(holds), G, G), dtype=np.uint8)
+        for b, (dx, dy) in enumerate(zip(DX, DY)):
+            masks |= holds[:, 1 + dy:1 + dy + G, 1 + dx:1 + dx + G] << b
+        return masks.reshape(-1)
+
+    def _pick(self, agents, mask):
+        """Flat target index of a uniformly chosen set bit of each agent's mask, -1 if none."""
+        mask = mask.astype(np.int64)
+        u = self.rng.random(len(agents))
+        b = SELECT.ravel()[8 * mask + (u * POPCOUNT[mask]).astype(np.int64)]
+        cell = agents % (self.G * self.G)
+        return np.where(mask > 0, agents - cell + neighbor_cells(self.G).ravel()[8 * cell + b], -1)
+
+    def _resolve(self, targets, num_cells):
+        """Which proposals win: per target, the one with the highest random priority."""
+        priority = self.rng.permutation(len(targets))
+        best = np.full(num_cells, -1)
+        proposing = targets >= 0
+        np.maximum.at(best, targets[proposing], priority[proposing])
+        return proposing & (priority == best[targets])
+
+    def step(self):
+        """Advance every unfinished replicate by one synchronous step."""
+        if self.done.all():
+            return
+        rules = self.rules
+        # Work on copies of the unfinished replicates; finished ones are left as they are
+        running = np.flatnonzero(~self.done)
+        cells, energy = self.cells[running], self.energy[running]
+        flat_cells, flat_energy = cells.reshape(-1), energy.reshape(-1)
+
+        # Prey phase: simultaneous moves into cells empty at the start of the phase
+        agents = np.flatnonzero(cells == PREY)
+        targets = self._pick(agents, self._neighbor_masks(cells, EMPTY)[agents])
+        wins = self._resolve(targets, flat_cells.size)
+        flat_cells[agents[wins]] = EMPTY
+        flat_cells[targets[wins]] = PREY
+        positions = np.where(wins, targets, agents)
+        fertile = np.ones(len(agents), dtype=bool)
+        if self.grass is not None:
+            # Pay for the step, eat the grass of the cell reached, starve at energy <= 0
+            grass = self.grass[running]
+            flat_grass = grass.reshape(-1)
+            fed = flat_grass[positions] == 0
+            gained = flat_energy[agents] - rules.prey_move_cost + fed * rules.prey_gain_from_food
+            flat_grass[positions[fed]] = rules.grass_regrowth
+            flat_energy[agents[wins]] = 0
+            alive = gained > 0
+            flat_cells[positions] = np.where(alive, PREY, EMPTY)
+            flat_energy[positions] = np.where(alive, gained, 0)
+            fertile = gained >= 2  # Enough to give a newborn at least 1
+        if rules.prey_reproduce:
+            # Offspring go to an empty neighbor of the cell the parent started in
+            breeds = np.flatnonzero((self.rng.random(len(agents)) < rules.prey_reproduce) & fertile)
+            targets = self._pick(agents[breeds], self._neighbor_masks(cells, EMPTY)[agents[breeds]])
+            born = self._resolve(targets, flat_cells.size)
+            flat_cells[targets[born]] = PREY
+            if self.grass is not None:  # The offspring takes half the parent's energy
+                parents = positions[breeds[born]]
+                flat_energy[targets[born]] = flat_energy[parents] // 2
+                flat_energy[parents] -= flat_energy[targets[born]]
+
+        # Predator phase: prey first, else an empty cell, as seen at the start of the phase
+        agents = np.flatnonzero(cells == PREDATOR)
+        prey = self._neighbor_masks(cells, PREY)[agents]
+        eats = prey > 0
+        targets = self._pick(agents, np.where(eats, prey,
+                                              self._neighbor_masks(cells, EMPTY)[agents]))
+        wins = self._resolve(targets, flat_cells.size)
+        gained = flat_energy[agents] + np.where(
+            wins, np.where(eats, rules.gain_from_food, -rules.move_cost), -2 * rules.move_cost)
+        flat_cells[agents[wins]] = EMPTY
+        flat_energy[agents[wins]] = 0
+        destinations = np.where(wins, targets, agents)
+        alive = gained > 0
+        flat_cells[destinations] = np.where(alive, PREDATOR, EMPTY)
+        flat_energy[destinations] = np.where(alive, gained, 0)
+
+        self.cells[running], self.energy[running] = cells, energy
+        if self.grass is not None:
+            engine.regrow(grass)
+            self.grass[running] = grass
+        self.step_count[running] += 1
+        self._count()
+
+    def run(self):
+        while not self.done.all():
+            self.step()
+        return self.outcomes()
+
+    def outcomes(self):
+        return np.where(self.num_prey == 0, ALL_PREY_DIED,
+                        np.where(self.num_predators == 0, ALL_PREDATORS_DIED, COEXISTENCE))
+
+    def grid(self, r):
+        """Int-coded grid (EMPTY, PREY, PREDATOR) of replicate r."""
+        return self.cells[r].reshape(self.G, self.G)
+
+    def save_snapshot(self, path):
+        """Write the batch state to path with engine.write_snapshot."""
+        arrays = {name: value for name, value in vars(self).items() if isinstance(value, np.ndarray)}
+        engine.write_snapshot(path, {'rules': self.rules._asdict()}, self.rng, **arrays)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Rebuild a batch saved with save_snapshot; it continues bit for bit."""
+        meta, rng, arrays = engine.read_snapshot(path)
+        batch = cls.__new__(cls)
+        batch.grass = None  # Only saved with a grass layer
+        batch.__dict__.update(arrays)
+        batch.rules = engine.Rules(**meta['rules'])
+        batch.rng = rng
+        batch.G = batch.rules.grid_size
+        return batch
+
+
+def run_simulation_timed(args, rules, rng=None):
+    """engine.run_simulation_timed for synchronous rules."""
+    batch = SynchronousBatch(*args, rules, rng, 1)
+    batch.run()
+    return int(batch.outcomes()[0]), int(batch.step_count[0])
+
+
+def run_simulation_resumable(args, rules, rng=None, path=None, snapshot_every=100):
+    """engine.run_simulation_resumable for synchronous rules."""
+    batch = SynchronousBatch.load_snapshot(path) if path is not None and os.path.exists(path) \
+        else SynchronousBatch(*args, rules, rng, 1)
+    while not batch.done[0]:
+        batch.step()
+        if path is not None and batch.step_count[0] % snapshot_every == 0 and not batch.done[0]:
+            batch.save_snapshot(path)
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+    return int(batch.outcomes()[0])
+
+
+def _sweep(batch_class, rules, pairs, num_simulations, seed):
+    """Outcome counts per pair, one batch per pair, and the seconds taken."""
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((len(pairs), len(engine.OUTCOME_LABELS)), dtype=np.int64)
+    start = time.perf_counter()
+    for k, pair in enumerate(pairs):
+        outcomes = batch_class(*pair, rules, rng, num_simulations).run()
+        counts[k] = np.bincount(outcomes, minlength=counts.shape[1])
+    return counts, time.perf_counter() - start
+
+
+def compare(rules, num_simulations=50, ratio_values=COMPARISON_RATIOS,
+            density_values=COMPARISON_DENSITIES, seed=0):
+    """Phase diagram of rules under both update schemes.
+
+    Returns (plan, sequential_counts, synchronous_counts, seconds), where the
+    counts are outcome counts per unique pair and seconds maps each scheme
+    to its run time (sequential on the bitboard engine).
+    """
+    plan = plan_sweep(ratio_values, density_values, rules.grid_size ** 2)
+    sequential, sequential_seconds = _sweep(BitboardBatch, rules._replace(synchronous=False),
+                                            plan.pairs, num_simulations, [seed, 0])
+    synchronous, synchronous_seconds = _sweep(SynchronousBatch, rules._replace(synchronous=True),
+                                              plan.pairs, num_simulations, [seed, 1])
+    return plan, sequential, synchronous, {'sequential': sequential_seconds,
+                                           'synchronous': synchronous_seconds}
+
+
+def main():
+    import matplotlib.pyplot as plt
+    num_simulations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    name = sys.argv[2] if len(sys.argv) > 2 else "phase"
+    rules = engine.REPRODUCTION_RULES if name == "reproduction" else engine.PHASE_DIAGRAM_RULES
+    plan, sequential, synchronous, seconds = compare(rules, num_simulations)
+
+    # Per pair: majority outcomes, total variation distance between the outcome
+    # distributions, and whether it exceeds sampling noise (~3 standard errors)
+    fractions = sequential / num_simulations, synchronous / num_simulations
+    distance = 0.5 * np.abs(fractions[0] - fractions[1]).sum(axis=1)
+    noise = 3 * np.sqrt((fractions[0] * (1 - fractions[0]) + fractions[1] * (1 - fractions[1]))
+                        / num_simulations).max(axis=1)
+    significant = np.abs(fractions[0] - fractions[1]).max(axis=1) > np.maximum(noise, 1 / num_simulations)
+    agree = fractions[0].argmax(axis=1) == fractions[1].argmax(axis=1)
+    print(f"{name} rules, {len(plan.pairs)} pairs x {num_simulations} replicates")
+    print(f"  sequential (bitboard) {seconds['sequential']:7.2f} s")
+    print(f"  synchronous           {seconds['synchronous']:7.2f} s "
+          f"({seconds['sequential'] / seconds['synchronous']:.1f}x faster)")
+    print(f"  same majority outcome on {agree.mean():.1%} of pairs")
+    print(f"  mean total variation distance {distance.mean():.3f}, max {distance.max():.3f}")
+    print(f"  outcome frequencies differ beyond noise on {significant.mean():.1%} of pairs")
+
+    maps = [np.full(len(COMPARISON_DENSITIES) * len(COMPARISON_RATIOS), np.nan).reshape(
+        len(COMPARISON_DENSITIES), len(COMPARISON_RATIOS)) for _ in range(3)]
+    for values, Z in zip([fractions[0].argmax(axis=1), fractions[1].argmax(axis=1), distance], maps):
+        plan.fan_out(values.astype(np.float64), Z)
+    extent = [COMPARISON_RATIOS.min(), COMPARISON_RATIOS.max(),
+              COMPARISON_DENSITIES.min(), COMPARISON_DENSITIES.max()]
+    fig, axes = plt.subplots(1, 3, figsize=(16, 5))
+    titles = ['Sequential (majority)', 'Synchronous (majority)', 'Total variation distance']
+    for ax, Z, title in zip(axes, maps, titles):
+        image = ax.imshow(Z, extent=extent, origin='lower', aspect='auto',
+                          cmap='magma' if title.startswith('Total') else 'viridis',
+                          vmin=0, vmax=1 if title.startswith('Total') else 2)
+        ax.set_title(title)
+        ax.set_xlabel('Ratio (Prey / Predator)')
+    axes[0].set_ylabel('Density (Agents per Grid Cell)')
+    fig.colorbar(image, ax=axes[2])
+    fig.savefig(COMPARISON_PATH)
+    print(f"  saved {COMPARISON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Two-sample tests used to compare simulation back ends, in NumPy only.
+
+chi_square_homogeneity() tests whether two samples of outcome codes come
+from the same categorical distribution; ks_2samp() tests whether two
+samples of extinction steps come from the same distribution. Both return
+(statistic, p_value).
+"""
+import math
+import numpy as np
+
+MIN_EXPECTED = 5  # Categories expected less often than this are pooled
+
+
+def chi2_sf(x, df):
+    """P(X >= x) for a chi-square variable with integer df degrees of freedom."""
+    if x <= 0:
+        return 1.0
+    half = x / 2
+    if df % 2 == 0:
+        terms = range(df // 2)
+        return min(math.exp(-half) * sum(half ** i / math.factorial(i) for i in terms), 1.0)
+    tail = math.erfc(math.sqrt(half))
+    for i in range(1, (df + 1) // 2):
+        tail += math.exp((i - 0.5) * math.log(half) - half - math.lgamma(i + 0.5))
+    return min(tail, 1.0)
+
+
+def chi_square_homogeneity(a, b, num_categories):
+    """Chi-square test that samples a and b share one categorical distribution.
+
+    Categories expected fewer than MIN_EXPECTED times in either sample are
+    pooled into one; if the pool is still that sparse it is left out.
+    """
+    table = np.stack([np.bincount(a, minlength=num_categories),
+                      np.bincount(b, minlength=num_categories)]).astype(np.float64)
+    table = table[:, table.sum(axis=0) > 0]
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+    sparse = (expected < MIN_EXPECTED).any(axis=0)
+    if sparse.any():
+        pooled = table[:, sparse].sum(axis=1, keepdims=True)
+        table = table[:, ~sparse]
+        if pooled.min() >= MIN_EXPECTED:
+            table = np.concatenate([table, pooled], axis=1)
+    if table.shape[1] < 2:
+        return 0.0, 1.0
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    return statistic, chi2_sf(statistic, table.shape[1] - 1)
+
+
+def kolmogorov_sf(x, terms=100):
+    """P(K >= x) for the Kolmogorov distribution."""
+    if x < 0.2:
+        return 1.0
+    j = np.arange(1, terms + 1)
+    return float(np.clip(2 * np.sum((-1.0) ** (j - 1) * np.exp(-2 * j ** 2 * x ** 2)), 0, 1))
+
+
+def ks_2samp(a, b):
+    """Two-sample Kolmogorov-Smirnov test, asymptotic p-value.
+
+    For discrete data such as step counts the p-value is conservative.
+    """
+    a, b = np.sort(np.asarray(a)), np.sort(np.asarray(b))
+    values = np.concatenate([a, b])
+    statistic = float(np.abs(np.searchsorted(a, values, side='right') / len(a)
+                             - np.searchsorted(b, values, side='right') / len(b)).max())
+    n = math.sqrt(len(a) * len(b) / (len(a) + len(b)))
+    return statistic, kolmogorov_sf((n + 0.12 + 0.11 / n) * statistic)
@@ -0,0 +1,117 @@
+"""Every fast back end must reproduce the reference engine's statistics.
+
+Each back end runs REPLICATES replicates of every configuration of a fixed
+panel. Its outcome frequencies are compared with the reference engine's by
+a chi-square test and its extinction steps by a two-sample KS test. A test
+fails when p < ALPHA. All runs are seeded, so the verdicts are
+reproducible. A failure means the back end's rules drifted from engine.py,
+or an unlucky seed at a rate of about ALPHA per test.
+"""
+import functools
+import numpy as np
+import pytest
+import engine
+from backends import BatchSimulator, REFERENCE, BITBOARD
+from stat_tests import chi_square_homogeneity, ks_2samp
+
+REPLICATES = 300
+ALPHA = 1e-3
+
+RULESETS = {
+    'phase_diagram': engine.PHASE_DIAGRAM_RULES,
+    # A small grid keeps the long-lived reproduction runs cheap
+    'reproduction': engine.REPRODUCTION_RULES._replace(grid_size=10, max_steps=100),
+}
+# (rule set, (num_prey, num_predators)) with more than one likely outcome
+PANEL = [
+    ('phase_diagram', (60, 40)),
+    ('phase_diagram', (100, 20)),
+    ('phase_diagram', (20, 40)),
+    ('phase_diagram', (40, 10)),
+    ('reproduction', (5, 3)),
+    ('reproduction', (10, 5)),
+]
+
+
+def run_reference(pair, rules, n, seed):
+    return BatchSimulator(rules)(pair, n, seed, REFERENCE)[:2]
+
+
+def run_aligned(pair, rules, n, seed):
+    rng = np.random.default_rng(seed)
+    runs = [engine.run_simulation_timed(pair, rules, rng, aligned=True) for _ in range(n)]
+    return np.array(runs).reshape(-1, 2).T
+
+
+def run_bitboard(pair, rules, n, seed):
+    return BatchSimulator(rules)(pair, n, seed, BITBOARD)[:2]
+
+
+def run_bitboard_spatial(pair, rules, n, seed):
+    # The sweeps' spatial-sampling loop steps the batch itself
+    return BatchSimulator(rules, spatial_interval=7)(pair, n, seed, BITBOARD)[:2]
+
+
+def run_gpu(pair, rules, n, seed):
+    """Outcomes of gpu_phase_diagram's kernel (no extinction steps, seeds fixed by index)."""
+    numba = pytest.importorskip("numba")
+    if not numba.cuda.is_available():
+        pytest.skip("no CUDA device")
+    import gpu_phase_diagram as gpu
+    if rules != engine.PHASE_DIAGRAM_RULES._replace(grid_size=gpu.GRID_SIZE,
+                                                    max_steps=gpu.MAX_STEPS):
+        pytest.skip("the GPU kernel hard-codes the phase diagram rules")
+    prey, predators = (np.full(n, count, dtype=np.int32) for count in pair)
+    return gpu.run_simulations_on_gpu(prey, predators).astype(np.int64), None
+
+
+BACKENDS = {
+    'aligned': run_aligned,
+    'bitboard': run_bitboard,
+    'bitboard_spatial': run_bitboard_spatial,
+    'gpu': pytest.param(run_gpu, marks=pytest.mark.xfail(
+        reason="known drift: prey move to random offsets, int8 energy")),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def reference_sample(ruleset, pair):
+    return run_reference(pair, RULESETS[ruleset], REPLICATES, [0, *pair])
+
+
+@functools.lru_cache(maxsize=None)
+def backend_sample(run, ruleset, pair):
+    return run(pair, RULESETS[ruleset], REPLICATES, [1, *pair])
+
+
+@pytest.mark.parametrize("run", BACKENDS.values(), ids=BACKENDS.keys())
+@pytest.mark.parametrize("ruleset, pair", PANEL)
+def test_outcome_frequencies_match_reference(run, ruleset, pair):
+    outcomes, _ = backend_sample(run, ruleset, pair)
+    statistic, p = chi_square_homogeneity(reference_sample(ruleset, pair)[0], outcomes,
+                                          len(engine.OUTCOME_LABELS))
+    assert p >= ALPHA, f"outcome frequencies differ (chi2={statistic:.1f}, p={p:.2g})"
+
+
+@pytest.mark.parametrize("run", BACKENDS.values(), ids=BACKENDS.keys())
+@pytest.mark.parametrize("ruleset, pair", PANEL)
+def test_extinction_times_match_reference(run, ruleset, pair):
+    _, steps = backend_sample(run, ruleset, pair)
+    if steps is None:
+        pytest.skip("back end does not report extinction steps")
+    statistic, p = ks_2samp(reference_sample(ruleset, pair)[1], steps)
+    assert p >= ALPHA, f"extinction steps differ (D={statistic:.3f}, p={p:.2g})"
+
+
+def test_suite_detects_a_drifted_engine():
+    # A back end whose predators gain one energy unit less per meal
+    def run_drifted(pair, rules, n, seed):
+        return run_bitboard(pair, rules._replace(gain_from_food=rules.gain_from_food - 1), n, seed)
+
+    p_values = []
+    for ruleset, pair in PANEL:
+        reference = reference_sample(ruleset, pair)
+        outcomes, steps = backend_sample(run_drifted, ruleset, pair)
+        p_values.append(chi_square_homogeneity(reference[0], outcomes, 3)[1])
+        p_values.append(ks_2samp(reference[1], steps)[1])
+    assert min(p_values) < ALPHA
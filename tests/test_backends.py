@@ -0,0 +1,46 @@
+import time
+import numpy as np
+import pytest
+import engine
+from backends import dispatch_sweep, BatchSimulator, BITBOARD, REFERENCE
+from sweep import plan_sweep
+
+BATCH_SIZE = 64  # The sweeps' MAX_BATCH, where a nearest-column lookup chose badly
+SAMPLED_PAIRS = 8
+SLACK = 1.25  # Timing noise allowed between AUTO and the faster single engine
+
+
+def seconds_per_pair(rules, pairs, backend):
+    run = BatchSimulator(rules)
+    times = []
+    for k, pair in enumerate(pairs):
+        start = time.perf_counter()
+        run(pair, BATCH_SIZE, [k, *pair], backend)
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+@pytest.mark.parametrize("rules", [
+    engine.PHASE_DIAGRAM_RULES._replace(max_steps=300),
+    engine.REPRODUCTION_RULES._replace(max_steps=50),
+], ids=["phase_diagram", "reproduction"])
+def test_auto_is_not_slower_than_either_engine(rules, tmp_path):
+    plan = plan_sweep(np.arange(0.5, 10, 1.0), np.arange(0.05, 1, 0.1), rules.grid_size ** 2)
+    dispatch = dispatch_sweep(rules, plan, BATCH_SIZE, path=str(tmp_path / "backends.json"))
+    sample = np.random.default_rng(0).choice(len(plan.pairs), SAMPLED_PAIRS, replace=False)
+    pairs = [plan.pairs[k] for k in sample]
+    times = {name: seconds_per_pair(rules, pairs, name) for name in (REFERENCE, BITBOARD)}
+    auto = sum(times[dispatch.backends[k]][i] for i, k in enumerate(sample))
+    assert auto <= SLACK * min(times[REFERENCE].sum(), times[BITBOARD].sum()) + 0.05, \
+        (dispatch.metadata, {name: t.sum() for name, t in times.items()})
+
+
+def test_calibration_is_cached_per_rules_and_batch_size(tmp_path):
+    rules = engine.PHASE_DIAGRAM_RULES._replace(grid_size=8, max_steps=30)
+    path = str(tmp_path / "backends.json")
+    plan = plan_sweep(np.array([1.0, 4.0]), np.array([0.2, 0.6]), 64)
+    first = dispatch_sweep(rules, plan, 4, path=path).metadata['calibration_created']
+    assert dispatch_sweep(rules, plan, 4, path=path).metadata['calibration_created'] == first
+    assert dispatch_sweep(rules._replace(prey_reproduce=0.1), plan, 4,
+                          path=path).metadata['calibration_created'] != first
+    assert dispatch_sweep(rules, plan, 2, path=path).metadata['calibration_created'] != first
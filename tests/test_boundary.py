@@ -0,0 +1,38 @@
+import numpy as np
+from boundary import BoundaryLine, DENSITY, ABOVE, BELOW, UNDECIDED
+
+MAX_REPLICATES = 64
+TARGET, OTHER, SPLIT = [64, 0, 0], [0, 64, 0], [32, 32, 0]
+
+
+def record(line, index, counts):
+    return line.record(index, np.array(counts), MAX_REPLICATES, 1.96)
+
+
+def test_undecided_point_beyond_hi_does_not_stall_bisection():
+    line = BoundaryLine(1.0, np.arange(50) / 50, DENSITY, 400)
+    assert record(line, 0, TARGET) == ABOVE
+    assert record(line, 49, SPLIT) == UNDECIDED
+    assert record(line, 24, TARGET) == ABOVE
+    assert record(line, 36, OTHER) == BELOW
+    for _ in range(50):
+        index = line.next_index()
+        if index is None:
+            break
+        assert index not in line.probes
+        record(line, index, TARGET if index < 30 else OTHER)
+    else:
+        raise AssertionError("bisection did not terminate")
+    assert (line.lo, line.hi) == (29, 30)
+    assert line.result().monotone
+
+
+def test_non_monotone_line_stops_and_is_reported():
+    line = BoundaryLine(1.0, np.arange(50) / 50, DENSITY, 400)
+    record(line, 0, TARGET)
+    record(line, 49, OTHER)
+    record(line, 10, OTHER)
+    record(line, 20, TARGET)
+    assert line.next_index() is None
+    result = line.result()
+    assert result.estimate is None and not result.monotone
@@ -0,0 +1,48 @@
+import numpy as np
+import engine
+from backends import supports, BITBOARD, REFERENCE
+
+RULES = engine.REPRODUCTION_RULES._replace(grid_size=12, max_steps=80, grass_regrowth=10)
+
+
+def test_reference_grass_keeps_prey_fed_or_removed():
+    for seed in range(5):
+        sim = engine.Simulation(40, 10, RULES, rng=seed)
+        assert all(prey.energy == RULES.prey_initial_energy for prey in sim.prey_list)
+        while not sim.done:
+            sim.step()
+            # Starved prey leave the run, and newborns start with at least 1
+            assert all(prey.energy > 0 for prey in sim.prey_list)
+            assert all(sim.grid[p.y][p.x] is p for p in sim.prey_list)
+            assert ((sim.grass >= 0) & (sim.grass <= RULES.grass_regrowth)).all()
+
+
+def test_reference_grass_limits_prey_growth():
+    # Without predators, prey multiply until grass runs short
+    for seed in range(3):
+        with_grass = engine.Simulation(40, 0, RULES, rng=seed)
+        without = engine.Simulation(40, 0, RULES._replace(grass_regrowth=0), rng=seed)
+        for _ in range(40):
+            with_grass.step()
+            without.step()
+        assert len(with_grass.prey_list) < len(without.prey_list)
+
+
+def test_reference_grass_snapshot_continues_bit_for_bit(tmp_path):
+    sim = engine.Simulation(40, 10, RULES, rng=3)
+    for _ in range(15):
+        sim.step()
+    sim.save_snapshot(tmp_path / "sim.npz")
+    restored = engine.Simulation.load_snapshot(tmp_path / "sim.npz")
+    assert (restored.grass == sim.grass).all()
+    while not sim.done:
+        sim.step()
+        restored.step()
+        assert [(p.x, p.y, p.energy) for p in sim.prey_list] == \
+            [(p.x, p.y, p.energy) for p in restored.prey_list]
+        assert (restored.grass == sim.grass).all()
+    assert restored.done and restored.outcome() == sim.outcome()
+
+
+def test_grass_rules_are_dispatched_off_the_bitboard_engine():
+    assert not supports(BITBOARD, RULES) and supports(REFERENCE, RULES)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import engine
+from backends import BatchSimulator, dispatch_sweep, TABLE
+from rule_table import (Species, RuleTable, TableBatch, FOOD_CHAIN, compile_table, two_species,
+                        initial_counts)
+from sweep import plan_sweep
+from synchronous import SynchronousBatch
+
+
+@pytest.mark.parametrize("rules", [engine.PHASE_DIAGRAM_RULES,
+                                   engine.REPRODUCTION_RULES._replace(grid_size=12)])
+def test_two_species_table_reproduces_synchronous_engine(rules):
+    expected = SynchronousBatch(30, 10, rules._replace(synchronous=True), 3, 20)
+    table = two_species(rules)
+    batch = TableBatch(initial_counts(table, (30, 10)), table, 3, 20)
+    assert (batch.run() == expected.run()).all()
+    assert (batch.step_count == expected.step_count).all()
+    assert (batch.cells == expected.cells).all() and (batch.energy == expected.energy).all()
+
+
+def test_food_chain_invariants_and_snapshot(tmp_path):
+    table = FOOD_CHAIN._replace(grid_size=12, max_steps=60)
+    batch = TableBatch(initial_counts(table, (20, 5)), table, 0, 20)
+    mortal = compile_table(table).mortal[batch.cells]
+    assert (batch.energy[mortal] > 0).all() and (batch.energy[~mortal] == 0).all()
+    for _ in range(10):
+        batch.step()
+    batch.save_snapshot(tmp_path / "batch.npz")
+    restored = TableBatch.load_snapshot(tmp_path / "batch.npz")
+    assert (batch.run() == restored.run()).all()
+    assert (batch.cells == restored.cells).all()
+    assert set(batch.outcomes()) <= set(range(len(table.species) + 1))
+
+
+def test_compile_rejects_unknown_food():
+    with pytest.raises(ValueError):
+        compile_table(RuleTable((Species('Prey'), Species('Predators', eats=('Sheep',)))))
+
+
+def test_sweep_tooling_runs_tables():
+    table = FOOD_CHAIN._replace(grid_size=10, max_steps=30)
+    plan = plan_sweep(np.array([1.0, 3.0]), np.array([0.2, 0.4]), 100)
+    dispatch = dispatch_sweep(table, plan, 4)
+    assert dispatch.backends == [TABLE] * len(plan.pairs)
+    outcomes, steps, summaries = BatchSimulator(table)(plan.pairs[0], 4, 0, TABLE)
+    assert len(outcomes) == 4 and (steps <= 30).all() and summaries is None
@@ -0,0 +1,46 @@
+import asyncio
+import json
+from sim_server import Session
+
+
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    async def receive(self):
+        await asyncio.sleep(0)
+        return self.messages.pop(0) if self.messages else None
+
+    async def send(self, data):
+        if isinstance(data, str):
+            self.sent.append(json.loads(data))
+
+
+def test_bad_rule_payloads_are_rejected_and_the_session_stays_open():
+    ws = FakeWebSocket([json.dumps({'rules': {'synchronous': 'false'}}),
+                        json.dumps({'rules': [1, 2]}),
+                        json.dumps({'rules': {'grid_size': 12.5}}),
+                        json.dumps({'rules': {'prey_reproduce': 0.2, 'max_steps': 50}})])
+    session = Session(ws, seed=0)
+    asyncio.run(session.serve())
+    replies = [message for message in ws.sent if 'error' in message or
+               message.get('event') == 'params']
+    assert ['error' in reply for reply in replies] == [True, True, True, False]
+    assert session.rules.prey_reproduce == 0.2 and session.rules.max_steps == 50
+    assert session.rules.synchronous is False
+
+
+def test_failed_restart_and_non_finite_speed_leave_the_session_unchanged():
+    ws = FakeWebSocket([json.dumps({'rules': {'grass_regrowth': -1}}),
+                        json.dumps({'speed': 'nan'}),
+                        json.dumps({'speed': 'inf'}),
+                        json.dumps({'command': 'restart'})])
+    session = Session(ws, seed=0)
+    before = session.params()
+    asyncio.run(session.serve())
+    replies = [message for message in ws.sent if 'error' in message or
+               message.get('event') == 'params']
+    assert ['error' in reply for reply in replies] == [True, True, True, False]
+    assert session.params() == before
+    assert session.sim.rules.grass_regrowth == 0
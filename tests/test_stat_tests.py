@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from stat_tests import chi2_sf, chi_square_homogeneity, ks_2samp
+
+
+@pytest.mark.parametrize("x, df", [(3.841459, 1), (5.991465, 2), (7.814728, 3), (9.487729, 4),
+                                   (11.070498, 5)])
+def test_chi2_sf_matches_critical_values(x, df):
+    assert chi2_sf(x, df) == pytest.approx(0.05, abs=1e-5)
+
+
+def test_chi_square_detects_shifted_frequencies():
+    rng = np.random.default_rng(0)
+    a = rng.choice(3, 1000, p=[0.5, 0.3, 0.2])
+    assert chi_square_homogeneity(a, rng.choice(3, 1000, p=[0.5, 0.3, 0.2]), 3)[1] > 0.01
+    assert chi_square_homogeneity(a, rng.choice(3, 1000, p=[0.4, 0.4, 0.2]), 3)[1] < 1e-3
+
+
+def test_chi_square_pools_sparse_categories():
+    a = np.array([0] * 100 + [2])
+    b = np.array([0] * 100 + [1])
+    assert chi_square_homogeneity(a, b, 3) == (0.0, 1.0)
+
+
+def test_ks_detects_shifted_distribution():
+    rng = np.random.default_rng(0)
+    a = rng.exponential(50, 500).astype(int)
+    assert ks_2samp(a, a)[1] == 1.0
+    assert ks_2samp(a, rng.exponential(50, 500).astype(int))[1] > 0.01
+    assert ks_2samp(a, rng.exponential(80, 500).astype(int))[1] < 1e-3
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import engine
+from bitboard import BitboardBatch, EMPTY, PREY, PREDATOR
+from synchronous import SynchronousBatch
+
+RULES = engine.REPRODUCTION_RULES._replace(grid_size=12, max_steps=60, synchronous=True)
+
+
+def test_agents_keep_one_cell_and_predators_their_energy():
+    batch = SynchronousBatch(40, 15, RULES, 0, 50)
+    while not batch.done.all():
+        predators = batch.num_predators.copy()
+        batch.step()
+        assert ((batch.cells == PREDATOR) == (batch.energy > 0)).all()
+        assert (batch.num_predators <= predators).all()
+        assert (batch.num_prey + batch.num_predators <= RULES.grid_size ** 2).all()
+
+
+def test_snapshot_continues_bit_for_bit(tmp_path):
+    batch = SynchronousBatch(40, 15, RULES, 1, 20)
+    for _ in range(10):
+        batch.step()
+    batch.save_snapshot(tmp_path / "batch.npz")
+    restored = SynchronousBatch.load_snapshot(tmp_path / "batch.npz")
+    assert (batch.run() == restored.run()).all()
+    assert (batch.step_count == restored.step_count).all()
+
+
+def test_sequential_engines_reject_synchronous_rules():
+    with pytest.raises(ValueError):
+        engine.Simulation(10, 3, RULES)
+    with pytest.raises(ValueError):
+        BitboardBatch(10, 3, RULES)
+    outcome, step = engine.run_simulation_timed((10, 3), RULES, 0)
+    assert outcome in (engine.ALL_PREY_DIED, engine.ALL_PREDATORS_DIED, engine.COEXISTENCE)
+    assert 0 < step <= RULES.max_steps
+
+
+def test_grass_layer_keeps_energies_consistent():
+    rules = RULES._replace(grass_regrowth=10)
+    batch = SynchronousBatch(40, 15, rules, 2, 50)
+    while not batch.done.all():
+        batch.step()
+        assert (batch.energy[batch.cells == PREY] > 0).all()
+        assert (batch.energy[batch.cells == EMPTY] == 0).all()
+        assert ((batch.grass >= 0) & (batch.grass <= rules.grass_regrowth)).all()
+    with pytest.raises(ValueError):
+        BitboardBatch(10, 3, rules._replace(synchronous=False))
@@ -0,0 +1,91 @@
+"""A process pool that outlives one sweep, for many small studies in one session.
+
+Every ``with mp.Pool() as pool`` pays for starting the workers, importing
+NumPy and the engines in each of them, and filling the engines' lazily
+built tables (engine.direction_permutations alone is 40320 tuples). When
+dozens of small sweeps run from one notebook or interpreter, get_pool()
+hands every sweep the same warm pool instead:
+
+    from warm_pool import get_pool, Simulator
+    pool = get_pool()
+    Z = stream_sweep(pool, Simulator(rules), plan, 50, live_map)   # and again...
+
+Workers run warm_up() once when they start, and are replaced after
+``maxtasksperchild`` pool tasks (a task is one chunk of simulations) so
+memory stays bounded over a long session. The pool is shut down at exit,
+or by close_pool() (also needed after interrupting a sweep, whose queued
+tasks would otherwise keep the workers busy).
+
+Warm workers were started before a later script defines its functions, so
+they cannot unpickle functions from that script's ``__main__``. Simulator
+is a picklable replacement for the scripts' run_simulation.
+"""
+import atexit
+import multiprocessing as mp
+import engine
+from spatial import run_simulation_spatial
+
+MAX_TASKS_PER_CHILD = 2000  # Pool tasks a worker runs before it is replaced
+
+_pool = None
+_pool_config = None
+
+
+class Simulator:
+    """Picklable ``simulate(args, seed=None)`` for stream_sweep and surrogate_sweep.
+
+    Returns the outcome code; with ``timed``, (outcome, step) as the sweeps
+    expect when they collect extinction times; with ``spatial_interval``,
+    (outcome, step, SpatialSummary). ``outcome_codes`` maps engine outcome
+    codes to the caller's (e.g. reproduction.py's order).
+    """
+
+    def __init__(self, rules=engine.PHASE_DIAGRAM_RULES, aligned=False, timed=False,
+                 spatial_interval=0, outcome_codes=None):
+        self.rules = rules
+        self.aligned = aligned
+        self.timed = timed
+        self.spatial_interval = spatial_interval
+        self.outcome_codes = outcome_codes
+
+    def __call__(self, args, seed=None):
+        if self.spatial_interval:
+            result = run_simulation_spatial(args, self.rules, seed, self.aligned,
+                                            self.spatial_interval)
+        else:
+            result = engine.run_simulation_timed(args, self.rules, seed, self.aligned)
+        if self.outcome_codes is not None:
+            result = (self.outcome_codes[result[0]],) + tuple(result[1:])
+        return result if self.timed or self.spatial_interval else result[0]
+
+
+def warm_up():
+    """Pool initializer: import the engines and build their cached tables."""
+    import bitboard  # noqa: F401 (imported so later tasks find it loaded)
+    engine.direction_permutations()
+    engine.neighbor_table(engine.PHASE_DIAGRAM_RULES.grid_size)
+    engine.run_simulation((10, 3), engine.PHASE_DIAGRAM_RULES._replace(max_steps=5), 0)
+
+
+def get_pool(processes=None, maxtasksperchild=MAX_TASKS_PER_CHILD):
+    """The shared warm pool, started on first use (or when the settings change)."""
+    global _pool, _pool_config
+    config = (processes, maxtasksperchild)
+    if _pool is not None and config != _pool_config:
+        close_pool()
+    if _pool is None:
+        _pool = mp.Pool(processes, initializer=warm_up, maxtasksperchild=maxtasksperchild)
+        _pool_config = config
+    return _pool
+
+
+def close_pool():
+    """Stop the shared pool; the next get_pool() starts a fresh one."""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+
+atexit.register(close_pool)